@@ -1,6 +1,8 @@
 from backend.app.agents.base import AbstractAgent, AgentResponse, AgentRequest, AgentContext
 from backend.app.agents.factory import AgentFactory
-from backend.app.agents.pipeline import AgentPipeline, PipelineStep, execute_agent_pipeline
+from backend.app.agents.pipeline import AgentPipeline, PipelineStep, PipelineLoop, execute_agent_pipeline, execute_pipeline_fan_out, resume_pipeline
+from backend.app.agents.checkpoints import PipelineCheckpointStore
+from backend.app.agents.tools import ToolRegistry, tool_registry, run_tool_loop
 
 __all__ = [
     "AbstractAgent", 
@@ -10,5 +12,12 @@ __all__ = [
     "AgentContext",
     "AgentPipeline",
     "PipelineStep",
-    "execute_agent_pipeline"
+    "PipelineLoop",
+    "execute_agent_pipeline",
+    "execute_pipeline_fan_out",
+    "resume_pipeline",
+    "PipelineCheckpointStore",
+    "ToolRegistry",
+    "tool_registry",
+    "run_tool_loop"
 ] 
\ No newline at end of file
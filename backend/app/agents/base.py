@@ -7,6 +7,7 @@ import asyncio
 from datetime import datetime
 
 from backend.app.llm import LLMProvider, get_llm_provider
+from backend.app.llm.tracing import span
 
 # Setup logger
 logger = logging.getLogger("app.agents")
@@ -17,6 +18,7 @@ class AgentContext(BaseModel):
     trace_id: Optional[str] = None
     parent_id: Optional[str] = None
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    deadline: Optional[float] = None  # Absolute time.time() by which the request must finish
     metadata: Dict[str, Any] = Field(default_factory=dict)
     
     model_config = {"arbitrary_types_allowed": True}
@@ -120,6 +122,8 @@ class AbstractAgent(ABC):
         self.state_enabled = state_enabled
         self.config = kwargs
         self._state = {}
+        # ID the state is stored under when a request names none
+        self.state_id = agent_id
         
         logger.info(f"Initialized agent: {self.name} ({self.agent_id})")
     
@@ -137,6 +141,15 @@ class AbstractAgent(ABC):
             return f"{self.instructions}\n\n{request.system_prompt}"
         return self.instructions
     
+    def reset_state(self) -> None:
+        """
+        Clear in-memory state before the instance is reused for another request
+        
+        Per-agent caches are kept.
+        """
+        self._state = {}
+        self.state_id = self.agent_id
+    
     async def load_state(self, request: AgentRequest) -> Dict[str, Any]:
         """
         Load agent state
@@ -171,14 +184,15 @@ class AbstractAgent(ABC):
         # Default implementation saves to in-memory state
         # Subclasses should override to save to database if needed
         self._state = state
-        return self.agent_id
+        return self.state_id
     
     async def execute_with_tools(self, request: AgentRequest) -> AgentResponse:
         """
         Execute the agent using tools
         
         This method processes a request and allows the agent to use tools
-        to generate a response.
+        to generate a response. Tool calls from one model turn run
+        concurrently, for at most ``max_tool_rounds`` turns.
         
         Args:
             request: Request to process
@@ -186,22 +200,31 @@ class AbstractAgent(ABC):
         Returns:
             Agent response
         """
+        from backend.app.agents.tools import run_tool_loop
+        
+        start_time = datetime.utcnow()
+        request = request.with_context()
+        
         try:
-            start_time = datetime.utcnow()
-            
             # Prepare prompt
             system_prompt = self.format_system_prompt(request)
             
-            # Execute with LLM provider
-            result = await self.llm_provider.invoke_with_tools(
+            # Execute with LLM provider, running the tools the model calls
+            result = await run_tool_loop(
+                self.llm_provider,
+                request.prompt,
+                self.tools,
                 system_prompt=system_prompt,
-                user_prompt=request.prompt,
-                tools=self.tools,
-                model=self.config.get("model")
+                max_rounds=self.config.get("max_tool_rounds", 3),
+                **request.params
             )
             
             elapsed = (datetime.utcnow() - start_time).total_seconds()
-            logger.info(f"Executed agent {self.name} with tools in {elapsed:.2f}s")
+            logger.info(f"Executed agent {self.name} with tools in {elapsed:.2f}s ({result['tool_rounds']} tool rounds)")
+            
+            output_data = {"tool_calls": result["tool_results"]}
+            if isinstance(result.get("parsed"), dict):
+                output_data.update(result["parsed"])
             
             response = AgentResponse(
                 text=result.get("text", ""),
@@ -209,10 +232,11 @@ class AbstractAgent(ABC):
                 agent_id=self.agent_id,
                 agent_name=self.name,
                 elapsed_time=elapsed,
-                output_data={"tool_calls": result.get("tool_calls", [])},
+                output_data=output_data,
                 metadata={
                     "model": result.get("model", "unknown"),
-                    "tools_used": [t.name for t in self.tools]
+                    "tools_used": sorted({r["name"] for r in result["tool_results"]}),
+                    "tool_rounds": result["tool_rounds"]
                 },
                 success=result.get("success", False)
             )
@@ -261,42 +285,50 @@ class AbstractAgent(ABC):
         Returns:
             Agent response with state information
         """
-        # Skip state if not enabled
-        if not self.state_enabled:
-            return await self.execute(request)
-        
-        # Load state if requested
-        if request.load_state:
-            try:
-                state = await self.load_state(request)
-                logger.info(f"Loaded state for agent {self.name} ({self.agent_id})")
-                self._state = state
-            except Exception as e:
-                logger.error(f"Error loading state for agent {self.name}: {str(e)}")
-                return AgentResponse(
-                    text=f"Error loading agent state: {str(e)}",
-                    request_id=request.context.request_id,
-                    agent_id=self.agent_id,
-                    agent_name=self.name,
-                    elapsed_time=0.0,
-                    error=str(e),
-                    success=False
-                )
-        
-        # Execute the agent
-        response = await self.execute(request)
-        
-        # Save state if requested and execution was successful
-        if request.save_state and response.success:
-            try:
-                state_id = await self.save_state(request, self._state)
-                response.state_id = state_id
-                logger.info(f"Saved state for agent {self.name} ({self.agent_id})")
-            except Exception as e:
-                logger.error(f"Error saving state for agent {self.name}: {str(e)}")
-                # Don't fail the response if state saving fails
-        
-        return response
+        with span("agent", agent=self.name, agent_id=self.agent_id, agent_type=type(self).__name__) as agent_span:
+            # Skip state if not enabled
+            if not self.state_enabled:
+                response = await self.execute(request)
+                agent_span.set_attribute("success", response.success)
+                return response
+            
+            # Load state if requested
+            if request.load_state:
+                try:
+                    with span("state.load", state_id=request.state_id or self.state_id):
+                        state = await self.load_state(request)
+                    logger.info(f"Loaded state for agent {self.name} ({self.agent_id})")
+                    self._state = state
+                except Exception as e:
+                    logger.error(f"Error loading state for agent {self.name}: {str(e)}")
+                    agent_span.record_error(str(e))
+                    return AgentResponse(
+                        text=f"Error loading agent state: {str(e)}",
+                        request_id=request.context.request_id,
+                        agent_id=self.agent_id,
+                        agent_name=self.name,
+                        elapsed_time=0.0,
+                        error=str(e),
+                        success=False
+                    )
+            
+            # Execute the agent
+            with span("agent.execute"):
+                response = await self.execute(request)
+            agent_span.set_attribute("success", response.success)
+            
+            # Save state if requested and execution was successful
+            if request.save_state and response.success:
+                try:
+                    with span("state.save", state_id=request.state_id or self.state_id):
+                        state_id = await self.save_state(request, self._state)
+                    response.state_id = state_id
+                    logger.info(f"Saved state for agent {self.name} ({self.agent_id})")
+                except Exception as e:
+                    logger.error(f"Error saving state for agent {self.name}: {str(e)}")
+                    # Don't fail the response if state saving fails
+            
+            return response
 
 class LLMAgent(AbstractAgent):
     """
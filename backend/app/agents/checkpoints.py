@@ -0,0 +1,239 @@
+"""
+Step output checkpoints for resumable pipeline runs.
+
+Every successful step output is stored under the run ID (the pipeline ID)
+and a hash of the step's input: agent, model, prompt, system prompt and
+parameters. When a run is executed again, a step whose input hash matches a
+stored output returns that output instead of calling its agent, so a run
+that failed at step 7 of 8 resumes with a single LLM call. Steps whose input
+changed (because an upstream output changed) run again.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from backend.app.agents.base import AgentResponse
+from backend.app.crud.pipeline_run import pipeline_run as pipeline_run_crud
+from backend.app.db.session import SessionLocal
+from backend.app.schemas.pipeline_run import PipelineRunCreate
+
+# Setup logger
+logger = logging.getLogger("app.agents.checkpoints")
+
+
+def step_input_hash(
+    agent_type: str,
+    prompt: str,
+    system_prompt: Optional[str],
+    params: Dict[str, Any],
+    provider: Optional[str] = None,
+    model: Optional[str] = None
+) -> str:
+    """
+    Hash everything that determines a step's output
+
+    Callables in ``params`` (such as streaming callbacks) are ignored.
+
+    Args:
+        agent_type: Step agent type
+        prompt: Step prompt
+        system_prompt: Step system prompt
+        params: Step parameters
+        provider: Optional LLM backend override
+        model: Optional model override
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    key = {
+        "agent_type": agent_type,
+        "provider": provider,
+        "model": model,
+        "prompt": prompt,
+        "system_prompt": system_prompt,
+        "params": {k: v for k, v in params.items() if not callable(v)},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class PipelineCheckpointStore:
+    """
+    Database store for pipeline runs and their completed step outputs
+
+    Storage errors are logged and otherwise ignored: a run without
+    checkpoints still produces the right result, only resuming costs more.
+    Database work runs in a worker thread, off the event loop.
+    """
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        """
+        Initialize store
+
+        Args:
+            session_factory: Optional session factory, defaults to the application database
+        """
+        self.session_factory = session_factory or SessionLocal
+
+    async def start_run(
+        self,
+        run_id: str,
+        pipeline_config: Optional[Union[str, List[Dict[str, Any]]]],
+        initial_input: Union[str, Dict[str, Any]],
+        system_prompt: Optional[str] = None
+    ) -> None:
+        """
+        Record that a run is starting, counting an attempt if it already exists
+
+        Args:
+            run_id: Run ID
+            pipeline_config: Pipeline name or step configurations, needed to resume
+            initial_input: Initial input of the run
+            system_prompt: Optional system prompt for the first steps
+        """
+        await asyncio.to_thread(self._start_run, run_id, pipeline_config, initial_input, system_prompt)
+
+    def _start_run(
+        self,
+        run_id: str,
+        pipeline_config: Optional[Union[str, List[Dict[str, Any]]]],
+        initial_input: Union[str, Dict[str, Any]],
+        system_prompt: Optional[str] = None
+    ) -> None:
+        try:
+            with self.session_factory() as db:
+                db_run = pipeline_run_crud.get(db, run_id)
+                if db_run is None:
+                    pipeline_run_crud.create(db, obj_in=PipelineRunCreate(
+                        id=run_id,
+                        pipeline_config=pipeline_config,
+                        initial_input=initial_input,
+                        system_prompt=system_prompt
+                    ))
+                else:
+                    pipeline_run_crud.update(db, db_obj=db_run, obj_in={
+                        "status": "running",
+                        "error": None,
+                        "attempts": db_run.attempts + 1,
+                    })
+        except Exception as e:
+            logger.error(f"Error recording pipeline run {run_id}: {str(e)}")
+
+    async def finish_run(self, run_id: str, success: bool, error: Optional[str] = None) -> None:
+        """
+        Record the outcome of a run
+
+        Args:
+            run_id: Run ID
+            success: Whether every step succeeded
+            error: Error of the failed step
+        """
+        await asyncio.to_thread(self._finish_run, run_id, success, error)
+
+    def _finish_run(self, run_id: str, success: bool, error: Optional[str] = None) -> None:
+        try:
+            with self.session_factory() as db:
+                db_run = pipeline_run_crud.get(db, run_id)
+                if db_run is not None:
+                    pipeline_run_crud.update(db, db_obj=db_run, obj_in={
+                        "status": "completed" if success else "failed",
+                        "error": error,
+                    })
+        except Exception as e:
+            logger.error(f"Error recording outcome of pipeline run {run_id}: {str(e)}")
+
+    async def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a run and the names of its completed steps
+
+        Args:
+            run_id: Run ID
+
+        Returns:
+            Run dictionary, or None if the run does not exist
+        """
+        return await asyncio.to_thread(self._get_run, run_id)
+
+    def _get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self.session_factory() as db:
+            db_run = pipeline_run_crud.get(db, run_id)
+            if db_run is None:
+                return None
+            return {
+                "run_id": db_run.id,
+                "pipeline_config": db_run.pipeline_config,
+                "initial_input": db_run.initial_input,
+                "system_prompt": db_run.system_prompt,
+                "status": db_run.status,
+                "error": db_run.error,
+                "attempts": db_run.attempts,
+                "completed_steps": [output.step_name for output in db_run.step_outputs],
+                "created_at": db_run.created_at,
+                "updated_at": db_run.updated_at,
+            }
+
+    async def load_step(self, run_id: str, step_name: str, input_hash: str, request_id: str) -> Optional[AgentResponse]:
+        """
+        Load the stored output of a step for the given input
+
+        Args:
+            run_id: Run ID
+            step_name: Pipeline step name
+            input_hash: Hash of the step's input
+            request_id: Request ID of the current execution
+
+        Returns:
+            The stored response, marked as resumed, or None
+        """
+        return await asyncio.to_thread(self._load_step, run_id, step_name, input_hash, request_id)
+
+    def _load_step(self, run_id: str, step_name: str, input_hash: str, request_id: str) -> Optional[AgentResponse]:
+        try:
+            with self.session_factory() as db:
+                output = pipeline_run_crud.get_step_output(db, run_id, step_name, input_hash)
+                if output is None:
+                    return None
+                return AgentResponse(
+                    text=output.text,
+                    request_id=request_id,
+                    agent_id=output.agent_id,
+                    agent_name=output.agent_name,
+                    elapsed_time=output.elapsed_time,
+                    output_data=output.output_data or {},
+                    # No LLM usage is spent on this attempt
+                    metadata={
+                        **{k: v for k, v in (output.response_metadata or {}).items() if k != "usage"},
+                        "resumed": True,
+                    },
+                )
+        except Exception as e:
+            logger.error(f"Error loading checkpoint for step {step_name} of run {run_id}: {str(e)}")
+            return None
+
+    async def save_step(self, run_id: str, step_name: str, input_hash: str, response: AgentResponse) -> None:
+        """
+        Store the output of a successful step
+
+        Args:
+            run_id: Run ID
+            step_name: Pipeline step name
+            input_hash: Hash of the step's input
+            response: Step response
+        """
+        await asyncio.to_thread(self._save_step, run_id, step_name, input_hash, response)
+
+    def _save_step(self, run_id: str, step_name: str, input_hash: str, response: AgentResponse) -> None:
+        try:
+            with self.session_factory() as db:
+                pipeline_run_crud.save_step_output(db, run_id, step_name, input_hash, {
+                    "agent_id": response.agent_id,
+                    "agent_name": response.agent_name,
+                    "text": response.text,
+                    "output_data": json.loads(json.dumps(response.output_data, default=str)),
+                    "response_metadata": json.loads(json.dumps(response.metadata, default=str)),
+                    "elapsed_time": response.elapsed_time,
+                })
+        except Exception as e:
+            logger.error(f"Error saving checkpoint for step {step_name} of run {run_id}: {str(e)}")
@@ -0,0 +1,136 @@
+"""
+Declarative conditions on pipeline step outputs.
+
+Conditions are written in pipeline configurations and evaluated against the
+``output_data`` of completed steps, for example::
+
+    when:
+      step: question_review
+      path: issues
+      empty: false
+
+A condition names a step, a dotted ``path`` into its ``output_data`` (list
+items by index, e.g. ``issues.0.severity``) and one operator:
+``equals``, ``not_equals``, ``in``, ``not_in``, ``gt``, ``gte``, ``lt``,
+``lte``, ``empty`` or ``exists``. Conditions combine with ``all``, ``any``
+and ``not``. A missing step or path has the value None.
+"""
+import logging
+from typing import Any, Callable, Dict, List, Set
+
+# Setup logger
+logger = logging.getLogger("app.agents.conditions")
+
+# Step name -> output_data of completed steps
+StepOutputs = Dict[str, Dict[str, Any]]
+
+
+def _compare(op: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    """Wrap an ordering comparison so missing or incomparable values are false"""
+    def compare(value, operand):
+        try:
+            return value is not None and op(value, operand)
+        except TypeError:
+            return False
+    return compare
+
+
+def _is_empty(value: Any) -> bool:
+    if value is None:
+        return True
+    try:
+        return len(value) == 0
+    except TypeError:
+        return False
+
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "equals": lambda value, operand: value == operand,
+    "not_equals": lambda value, operand: value != operand,
+    "in": lambda value, operand: value in operand,
+    "not_in": lambda value, operand: value not in operand,
+    "gt": _compare(lambda value, operand: value > operand),
+    "gte": _compare(lambda value, operand: value >= operand),
+    "lt": _compare(lambda value, operand: value < operand),
+    "lte": _compare(lambda value, operand: value <= operand),
+    "empty": lambda value, operand: _is_empty(value) == bool(operand),
+    "exists": lambda value, operand: (value is not None) == bool(operand),
+}
+
+
+def _resolve(data: Any, path: List[str]) -> Any:
+    """Follow a dotted path through dictionaries and lists"""
+    for key in path:
+        if isinstance(data, dict):
+            data = data.get(key)
+        elif isinstance(data, list) and key.lstrip("-").isdigit():
+            index = int(key)
+            data = data[index] if -len(data) <= index < len(data) else None
+        else:
+            return None
+    return data
+
+
+class StepCondition:
+    """
+    Condition compiled once from its configuration and evaluated per run
+    """
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Compile a condition
+
+        Args:
+            config: Condition configuration
+
+        Raises:
+            ValueError: If the condition is malformed
+        """
+        self.config = config
+        self.steps: Set[str] = set()
+        self._check = self._compile(config)
+
+    def _compile(self, config: Any) -> Callable[[StepOutputs], bool]:
+        if not isinstance(config, dict):
+            raise ValueError(f"Condition must be a mapping, got: {config!r}")
+
+        if "all" in config or "any" in config:
+            combine = all if "all" in config else any
+            parts = [self._compile(part) for part in config["all" if "all" in config else "any"]]
+            return lambda outputs: combine(part(outputs) for part in parts)
+
+        if "not" in config:
+            part = self._compile(config["not"])
+            return lambda outputs: not part(outputs)
+
+        if "step" not in config:
+            raise ValueError(f"Condition must name a step: {config!r}")
+        operators = [name for name in _OPERATORS if name in config]
+        if len(operators) != 1:
+            raise ValueError(
+                f"Condition on step {config['step']} must have exactly one of {list(_OPERATORS)}"
+            )
+
+        step = config["step"]
+        path = [key for key in str(config.get("path", "")).split(".") if key]
+        operator = _OPERATORS[operators[0]]
+        operand = config[operators[0]]
+        self.steps.add(step)
+
+        def check(outputs: StepOutputs) -> bool:
+            return operator(_resolve(outputs.get(step), path), operand)
+        return check
+
+    def evaluate(self, outputs: StepOutputs) -> bool:
+        """
+        Evaluate the condition
+
+        Args:
+            outputs: output_data of completed steps by step name
+
+        Returns:
+            Whether the condition holds
+        """
+        return self._check(outputs)
+
+    def __repr__(self):
+        return f"<StepCondition {self.config}>"
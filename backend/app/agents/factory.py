@@ -1,10 +1,13 @@
 import logging
-from typing import Dict, Any, Type, List, Optional
+import threading
+import weakref
+from typing import Dict, Any, Type, List, Optional, Tuple
 import uuid
 
 from backend.app.config import get_settings
 from backend.app.agents.base import AbstractAgent, LLMAgent, ToolDefinition
-from backend.app.llm import get_llm_provider
+from backend.app.llm import get_llm_provider, AgentLLMProvider
+from backend.app.llm.structured import compile_schema
 
 # Setup logger
 logger = logging.getLogger("app.agents.factory")
@@ -15,13 +18,26 @@ class AgentFactory:
     
     The factory loads agent configurations from agent_definitions.yml
     and handles instantiation of agent classes based on their type.
+    
+    Pipelines take agents from a pool with ``acquire_agent`` and hand them
+    back with ``release_agent``, so instances (and their per-agent caches)
+    are reused across requests instead of being constructed for every
+    pipeline. An acquired agent is used by one execution at a time; at most
+    ``pipeline.agent_pool_size`` idle instances are kept per agent type.
     """
     _registry: Dict[str, Type[AbstractAgent]] = {}
-    _instances: Dict[str, AbstractAgent] = {}
+    # Live agents by ID; agents are dropped once nothing else references them
+    _instances: "weakref.WeakValueDictionary[str, AbstractAgent]" = weakref.WeakValueDictionary()
     _agent_configs: Dict[str, Dict[str, Any]] = {}
     _tool_definitions: Dict[str, Any] = {}
     _initialized = False
     
+    # Idle pooled agents by (agent type, provider, model)
+    _pools: Dict[Tuple[str, Optional[str], Optional[str]], List[AbstractAgent]] = {}
+    _pool_keys: "weakref.WeakKeyDictionary[AbstractAgent, Tuple[str, Optional[str], Optional[str]]]" = weakref.WeakKeyDictionary()
+    _pool_size = 8
+    _pool_lock = threading.Lock()
+    
     @classmethod
     def get_instance(cls):
         """
@@ -67,9 +83,17 @@ class AgentFactory:
             # Store tool definitions
             cls._tool_definitions = agent_defs.get("tools", {})
             
+            # Compile output schemas up front so a bad schema fails at startup
+            for agent_type, agent_config in cls._agent_configs.items():
+                if agent_config.get("output_schema"):
+                    compile_schema(agent_config["output_schema"])
+            
             # Register base agent types
             cls.register("llm", LLMAgent)
             
+            pipeline_config = settings.get_settings_config().get("pipeline") or {}
+            cls._pool_size = pipeline_config.get("agent_pool_size", cls._pool_size)
+            
             cls._initialized = True
             logger.info(f"Initialized AgentFactory with {len(cls._agent_configs)} agent types")
             
@@ -96,30 +120,40 @@ class AgentFactory:
             
         tool_config = cls._tool_definitions[tool_name]
         
-        parameters = []
+        # Parameters are listed in YAML; tool definitions hold JSON-schema properties
+        parameters = {}
+        required_parameters = []
         for param in tool_config.get("parameters", []):
-            parameters.append({
-                "name": param.get("name", ""),
-                "description": param.get("description", ""),
+            parameters[param.get("name", "")] = {
                 "type": param.get("type", "string"),
-                "required": param.get("required", True)
-            })
+                "description": param.get("description", "")
+            }
+            if param.get("required", True):
+                required_parameters.append(param.get("name", ""))
         
         return ToolDefinition(
             name=tool_name,
             description=tool_config.get("description", ""),
             parameters=parameters,
-            returns=tool_config.get("returns", None)
+            required_parameters=required_parameters
         )
     
     @classmethod
-    def create_agent(cls, agent_type: str, agent_id: Optional[str] = None) -> AbstractAgent:
+    def create_agent(
+        cls,
+        agent_type: str,
+        agent_id: Optional[str] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> AbstractAgent:
         """
         Create an agent instance by type
         
         Args:
             agent_type: Type of agent to create
             agent_id: Optional agent ID, generated if not provided
+            provider: Optional LLM backend override (entry of ``llm.providers``)
+            model: Optional model override
             
         Returns:
             Agent instance
@@ -149,6 +183,11 @@ class AgentFactory:
                 if tool_def:
                     tools.append(tool_def)
         
+        # Unresolved ${ENV_VAR} placeholders mean no model was configured
+        model = model or config.get("model")
+        if model and model.startswith("${"):
+            model = None
+        
         # Create agent instance
         agent = agent_cls(
             agent_id=agent_id,
@@ -156,8 +195,17 @@ class AgentFactory:
             description=config.get("description", ""),
             instructions=config.get("instructions", ""),
             tools=tools,
-            llm_provider=get_llm_provider(),
-            model=config.get("model")
+            llm_provider=AgentLLMProvider(
+                get_llm_provider(),
+                agent_type=agent_type,
+                cache=config.get("cache", True),
+                hedge=config.get("hedge", True),
+                route=provider or config.get("provider"),
+                model=model,
+                response_schema=config.get("output_schema")
+            ),
+            model=model,
+            max_tool_rounds=config.get("max_tool_rounds", 3)
         )
         
         # Store instance
@@ -166,6 +214,84 @@ class AgentFactory:
         logger.info(f"Created agent: {agent.name} ({agent_id})")
         return agent
     
+    @classmethod
+    def acquire_agent(
+        cls,
+        agent_type: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        state_id: Optional[str] = None
+    ) -> AbstractAgent:
+        """
+        Take an agent from the pool, creating one if none is idle
+        
+        The agent must be handed back with ``release_agent`` once the
+        execution using it has finished.
+        
+        Args:
+            agent_type: Type of agent
+            provider: Optional LLM backend override (entry of ``llm.providers``)
+            model: Optional model override
+            state_id: ID to store the agent's state under for this use, so
+                executions sharing a pooled instance never share state;
+                defaults to the agent ID
+            
+        Returns:
+            Agent instance for exclusive use by the caller
+            
+        Raises:
+            ValueError: If agent type is not registered or configured
+        """
+        key = (agent_type, provider, model)
+        agent = None
+        with cls._pool_lock:
+            idle = cls._pools.get(key)
+            if idle:
+                agent = idle.pop()
+        
+        if agent is None:
+            agent = cls.create_agent(agent_type, provider=provider, model=model)
+            with cls._pool_lock:
+                cls._pool_keys[agent] = key
+        agent.state_id = state_id or agent.agent_id
+        return agent
+    
+    @classmethod
+    def release_agent(cls, agent: Optional[AbstractAgent]) -> None:
+        """
+        Hand an agent taken with ``acquire_agent`` back to the pool
+        
+        Agents that did not come from the pool are ignored; agents beyond
+        the pool size are dropped.
+        
+        Args:
+            agent: Agent to release
+        """
+        if agent is None:
+            return
+        with cls._pool_lock:
+            key = cls._pool_keys.get(agent)
+            if key is None:
+                return
+            idle = cls._pools.setdefault(key, [])
+            if len(idle) < cls._pool_size and all(other is not agent for other in idle):
+                agent.reset_state()
+                idle.append(agent)
+    
+    @classmethod
+    def get_pool_stats(cls) -> Dict[str, int]:
+        """
+        Get the number of idle pooled agents per agent type
+        
+        Returns:
+            Idle agent counts by agent type
+        """
+        stats: Dict[str, int] = {}
+        with cls._pool_lock:
+            for (agent_type, _, _), idle in cls._pools.items():
+                stats[agent_type] = stats.get(agent_type, 0) + len(idle)
+        return stats
+    
     @classmethod
     def get_agent(cls, agent_id: str) -> Optional[AbstractAgent]:
         """
@@ -70,7 +70,10 @@ class DocumentLoaderAgent(AbstractAgent):
             try:
                 # Check if response is JSON
                 text = result.get("text", "")
-                if text.startswith("{") and text.endswith("}"):
+                if result.get("parsed") is not None:
+                    # Schema-constrained output, already parsed and validated
+                    output_data = {**result["parsed"], "processed_length": len(content)}
+                elif text.startswith("{") and text.endswith("}"):
                     output_data = json.loads(text)
                 else:
                     # Simple heuristic to extract key insights
@@ -67,7 +67,10 @@ class FinalFormatterAgent(AbstractAgent):
                 import re
                 code_block_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', text)
                 
-                if code_block_match:
+                if result.get("parsed") is not None:
+                    # Schema-constrained output, already parsed and validated
+                    output_data = dict(result["parsed"])
+                elif code_block_match:
                     # Extract just the JSON content from the code block
                     json_content = code_block_match.group(1).strip()
                     logger.info(f"Extracted JSON from code block: {json_content[:200]}...")
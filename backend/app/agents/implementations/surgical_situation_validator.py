@@ -49,8 +49,12 @@ class SurgicalSituationValidatorAgent(AbstractAgent):
             output_data = {}
             
             try:
-                # Try to parse the whole text as JSON
-                output_data = json.loads(text)
+                if result.get("parsed") is not None:
+                    # Schema-constrained output, already parsed and validated
+                    output_data = dict(result["parsed"])
+                else:
+                    # Try to parse the whole text as JSON
+                    output_data = json.loads(text)
             except json.JSONDecodeError:
                 # If that fails, try to extract JSON with regex
                 import re
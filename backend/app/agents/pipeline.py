@@ -1,15 +1,117 @@
 import logging
-from typing import Dict, List, Optional, Any, Tuple, Union
+from typing import Dict, List, Optional, Any, Set, Tuple, Union, AsyncIterator, Callable, Awaitable
 from datetime import datetime
+from functools import lru_cache
+import copy
+import json
 import uuid
 import asyncio
+import time
 
 from backend.app.agents.base import AbstractAgent, AgentRequest, AgentResponse, AgentContext
+from backend.app.agents.checkpoints import PipelineCheckpointStore, step_input_hash
+from backend.app.agents.conditions import StepCondition, StepOutputs
 from backend.app.agents.factory import AgentFactory
+from backend.app.agents.state import get_state_store
+from backend.app.llm.deadline import deadline_scope, remaining_time
+from backend.app.llm.tracing import span, trace_scope
+from backend.app.llm.usage import UsageCounter, track_usage, sum_usage
+from backend.app.services.admission import AdmissionController, Overloaded
 
 # Setup logger
 logger = logging.getLogger("app.agents.pipeline")
 
+# Async callback receiving pipeline progress events as (event name, data)
+PipelineEventCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+class StepSpeculation:
+    """
+    Speculative start of a pipeline step on predicted inputs
+    
+    The step starts as soon as its predicted ``inputs`` have completed,
+    while the steps it actually depends on are still running. When those
+    complete, the speculative output is kept if none of the ``unchanged``
+    steps ran (rather than being skipped) and the ``confirm`` condition
+    holds; otherwise it is discarded and the step runs on its real inputs.
+    """
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize speculation
+        
+        Args:
+            config: Speculation configuration with ``inputs`` and at least
+                one of ``unchanged`` and ``confirm``
+            
+        Raises:
+            ValueError: If the configuration is malformed
+        """
+        self.inputs = list(config.get("inputs") or [])
+        self.unchanged = list(config.get("unchanged") or [])
+        self.confirm = StepCondition(config["confirm"]) if config.get("confirm") else None
+        if not self.inputs:
+            raise ValueError("Speculation must name its predicted inputs")
+        if not self.unchanged and self.confirm is None:
+            raise ValueError("Speculation must have unchanged steps or a confirm condition")
+    
+    def holds(self, outputs: StepOutputs, ran: Set[str]) -> bool:
+        """
+        Check whether the speculative output can be kept
+        
+        Args:
+            outputs: output_data of completed steps by step name
+            ran: Names of the completed steps that were not skipped
+            
+        Returns:
+            Whether the predicted inputs turned out right
+        """
+        if ran.intersection(self.unchanged):
+            return False
+        return self.confirm is None or self.confirm.evaluate(outputs)
+
+
+class SpeculationStats:
+    """
+    Process-wide outcomes of speculative step executions
+    """
+    def __init__(self):
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.abandoned = 0  # The pipeline failed or timed out before the outcome was known
+        self.saved_time = 0.0  # Step latency saved by hits, in seconds
+        self.wasted_usage: Dict[str, Any] = {}  # LLM usage of discarded speculative runs
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for API responses"""
+        decided = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "abandoned": self.abandoned,
+            "hit_rate": self.hits / decided if decided else None,
+            "saved_time": self.saved_time,
+            "wasted_usage": self.wasted_usage,
+        }
+
+
+_speculation_stats = SpeculationStats()
+
+
+def get_speculation_stats() -> Dict[str, Any]:
+    """Get speculative execution outcomes since process start"""
+    return _speculation_stats.to_dict()
+
+
+class _SpeculativeRun:
+    """A step execution started on predicted inputs"""
+    def __init__(self, task: asyncio.Future, usage: UsageCounter):
+        self.task = task
+        self.usage = usage
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+
+
 class PipelineStep:
     """
     Represents a step in an agent pipeline
@@ -21,7 +123,13 @@ class PipelineStep:
         description: Optional[str] = None,
         system_prompt: Optional[str] = None,
         params: Optional[Dict[str, Any]] = None,
-        use_state: bool = True
+        use_state: bool = True,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        depends_on: Optional[List[str]] = None,
+        when: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        speculate: Optional[Dict[str, Any]] = None
     ):
         """
         Initialize pipeline step
@@ -33,6 +141,15 @@ class PipelineStep:
             system_prompt: Optional system prompt override
             params: Optional parameters to pass to the agent
             use_state: Whether to use state persistence for this step
+            provider: Optional LLM backend for this step, overriding the agent's
+            model: Optional model for this step, overriding the agent's
+            depends_on: Optional names of the steps whose outputs this step
+                takes as input; defaults to the previous step
+            when: Optional condition on upstream outputs; if it does not
+                hold, the step is skipped and passes on its first input
+            timeout: Optional time budget in seconds; the step fails if it
+                takes longer
+            speculate: Optional speculation config (see ``StepSpeculation``)
         """
         self.agent_type = agent_type
         self.name = name or f"step_{agent_type}"
@@ -42,12 +159,102 @@ class PipelineStep:
         self.agent = None
         self.use_state = use_state
         self.state_id = None
+        self.provider = provider
+        self.model = model
+        self.depends_on = list(depends_on) if depends_on is not None else None
+        self.condition = StepCondition(when) if when else None
+        self.timeout = timeout
+        self.speculation = StepSpeculation(speculate) if speculate else None
         
-    def get_agent(self) -> AbstractAgent:
-        """Get or create the agent for this step"""
-        if not self.agent:
-            self.agent = AgentFactory.create_agent(self.agent_type)
-        return self.agent
+    def check_agent_type(self) -> None:
+        """
+        Check that the step's agent type is configured
+        
+        Raises:
+            ValueError: If the step has no agent and its type is not configured
+        """
+        if self.agent is None:
+            AgentFactory.get_agent_config(self.agent_type)
+    
+    def get_agent(self, state_id: Optional[str] = None) -> AbstractAgent:
+        """
+        Get the agent for an execution of this step
+        
+        Returns the agent assigned to the step, or takes one from the
+        factory's pool; pass it to ``AgentFactory.release_agent`` when done.
+        
+        Args:
+            state_id: ID a pooled agent stores its state under for this execution
+        """
+        if self.agent:
+            return self.agent
+        return AgentFactory.acquire_agent(
+            self.agent_type, provider=self.provider, model=self.model, state_id=state_id
+        )
+
+
+class PipelineLoop:
+    """
+    A bounded loop over a sequence of steps, used as a single pipeline step
+    
+    The body steps run in order, each taking the previous one's output. The
+    body repeats until the ``until`` condition holds or ``max_iterations``
+    iterations have run; each later iteration takes the outputs of all body
+    steps of the previous one as input. The loop's output is the output of
+    its last body step.
+    """
+    def __init__(
+        self,
+        name: str,
+        steps: List[PipelineStep],
+        until: Dict[str, Any],
+        max_iterations: int = 2,
+        description: Optional[str] = None,
+        depends_on: Optional[List[str]] = None,
+        when: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Initialize pipeline loop
+        
+        Args:
+            name: Name of the loop
+            steps: Body steps, run in order
+            until: Condition on step outputs that ends the loop
+            max_iterations: Maximum number of times the body runs
+            description: Optional description
+            depends_on: Optional names of the steps whose outputs the loop
+                takes as input; defaults to the previous step
+            when: Optional condition on upstream outputs; if it does not
+                hold, the loop is skipped and passes on its first input
+        """
+        if not steps:
+            raise ValueError(f"Pipeline loop {name} has no steps")
+        self.name = name
+        self.steps = steps
+        self.until = StepCondition(until)
+        self.max_iterations = max(1, max_iterations)
+        self.description = description or f"Loop over {', '.join(step.name for step in steps)}"
+        self.depends_on = list(depends_on) if depends_on is not None else None
+        self.condition = StepCondition(when) if when else None
+        self.speculation = None
+        self.use_state = False
+        self.state_id = None
+
+
+def _copy_step(step: Union[PipelineStep, PipelineLoop]) -> Union[PipelineStep, PipelineLoop]:
+    """Copy a compiled step for a new pipeline; conditions and params are shared"""
+    clone = copy.copy(step)
+    clone.state_id = None
+    if isinstance(step, PipelineLoop):
+        clone.steps = [_copy_step(body) for body in step.steps]
+    return clone
+
+
+def _step_names(step: Union[PipelineStep, PipelineLoop]) -> List[str]:
+    """Names a step makes available to conditions: its own and its body steps'"""
+    if isinstance(step, PipelineLoop):
+        return [step.name] + [body_step.name for body_step in step.steps]
+    return [step.name]
 
 
 class PipelineResult:
@@ -67,6 +274,7 @@ class PipelineResult:
         self.steps: List[Tuple[str, AgentResponse]] = []
         self.success = True
         self.error: Optional[str] = None
+        self.timed_out = False  # The deadline passed; final_response is the best partial result
         self.final_response: Optional[AgentResponse] = None
         self.state_ids: Dict[str, str] = {}  # Map of step name to state ID
         
@@ -76,6 +284,19 @@ class PipelineResult:
         end = self.end_time or datetime.utcnow()
         return (end - self.start_time).total_seconds()
     
+    @property
+    def step_usage(self) -> Dict[str, Dict[str, Any]]:
+        """Get LLM usage (calls, tokens, LLM time) of each step"""
+        return {
+            step_name: response.metadata.get("usage") or {}
+            for step_name, response in self.steps
+        }
+    
+    @property
+    def usage(self) -> Dict[str, Any]:
+        """Get total LLM usage of the pipeline"""
+        return sum_usage(*self.step_usage.values())
+    
     def add_step_result(self, step_name: str, response: AgentResponse):
         """
         Add a step result
@@ -145,17 +366,22 @@ class PipelineResult:
             "elapsed_time": self.elapsed_time,
             "success": self.success,
             "error": self.error,
+            "timed_out": self.timed_out,
             "steps": [
                 {
                     "step": step_name,
                     "agent_id": response.agent_id,
                     "agent_name": response.agent_name,
                     "success": response.success,
+                    "skipped": response.metadata.get("skipped", False),
                     "elapsed_time": response.elapsed_time,
-                    "state_id": response.state_id
+                    "state_id": response.state_id,
+                    "usage": response.metadata.get("usage"),
+                    "speculation": response.metadata.get("speculation")
                 }
                 for step_name, response in self.steps
             ],
+            "usage": self.usage,
             "final_output": self.final_response.text if self.final_response else None,
             "final_data": self.final_response.output_data if self.final_response else None,
             "state_ids": self.state_ids
@@ -164,91 +390,266 @@ class PipelineResult:
 
 class AgentPipeline:
     """
-    Pipeline for executing sequences of agents
+    Pipeline for executing graphs of agents
     
-    The pipeline takes a series of agent steps and executes them in sequence,
-    passing the output of each step as input to the next step.
+    Each step takes the output of the steps it depends on (by default, the
+    previous step) as input. Steps whose dependencies have completed run
+    concurrently, so a pipeline takes as long as its critical path rather
+    than the sum of its steps. Steps with a ``when`` condition are skipped
+    when it does not hold, and loops repeat a sequence of steps until a
+    condition holds. Steps with a ``speculate`` configuration start early on
+    predicted inputs and keep that output if the prediction holds.
+    
+    With a checkpoint store, the pipeline ID is a run ID: completed step
+    outputs are stored under it, and executing the run again skips every
+    step whose input has not changed.
     """
     def __init__(
         self, 
-        steps: List[PipelineStep], 
+        steps: List[Union[PipelineStep, PipelineLoop]], 
         pipeline_id: Optional[str] = None,
-        persistent: bool = True
+        persistent: bool = True,
+        checkpoints: Optional[PipelineCheckpointStore] = None,
+        dependencies: Optional[List[List[int]]] = None,
+        speculative: bool = True
     ):
         """
         Initialize pipeline
         
         Args:
-            steps: List of pipeline steps
+            steps: List of pipeline steps and loops
             pipeline_id: Optional pipeline ID, generated if not provided
             persistent: Whether to persist state between pipeline runs
+            checkpoints: Optional store for step outputs, making runs resumable
+            dependencies: Optional dependency indexes already resolved for
+                these steps (see ``_resolve_dependencies``)
+            speculative: Whether steps with a ``speculate`` configuration
+                start early on their predicted inputs
         """
         self.steps = steps
         self.pipeline_id = pipeline_id or f"pipeline-{str(uuid.uuid4())[:8]}"
         self.persistent = persistent
+        self.checkpoints = checkpoints
+        self.speculative = speculative
+        # Pipeline name or step configurations, recorded so a run can be resumed
+        self.config: Optional[Union[List[Dict[str, Any]], str]] = None
         self.state_ids: Dict[str, str] = {}  # Map of step name to state ID
+        self.dependencies = dependencies if dependencies is not None else self._resolve_dependencies(steps)
         
-        # Ensure all agents are created
+        # Fail early on unknown agent types
         for step in self.steps:
-            step.get_agent()
+            for body in step.steps if isinstance(step, PipelineLoop) else [step]:
+                body.check_agent_type()
             
         logger.info(f"Initialized pipeline {self.pipeline_id} with {len(steps)} steps")
     
+    @staticmethod
+    def _resolve_dependencies(steps: List[Union[PipelineStep, PipelineLoop]]) -> List[List[int]]:
+        """
+        Resolve each step's dependencies to indexes of earlier steps
+        
+        Also checks that conditions and speculations only refer to upstream
+        steps, whose outputs are known when they are evaluated.
+        
+        Args:
+            steps: Pipeline steps
+            
+        Returns:
+            Indexes of the steps each step depends on
+            
+        Raises:
+            ValueError: If a step depends on an unknown or later step, or a
+                condition or speculation refers to a step that is not upstream
+        """
+        indexes: Dict[str, int] = {}
+        dependencies = []
+        upstream: List[set] = []
+        for i, step in enumerate(steps):
+            if step.depends_on is None:
+                dependencies.append([i - 1] if i > 0 else [])
+            else:
+                missing = [name for name in step.depends_on if name not in indexes]
+                if missing:
+                    raise ValueError(
+                        f"Pipeline step {step.name} depends on {missing}, "
+                        f"which must be defined before it"
+                    )
+                dependencies.append([indexes[name] for name in step.depends_on])
+            indexes[step.name] = i
+            
+            # Names of all steps that complete before this one starts
+            available = set()
+            for d in dependencies[i]:
+                available |= upstream[d] | set(_step_names(steps[d]))
+            upstream.append(available)
+            
+            # Conditions inside a loop may also refer to its body steps
+            conditions = [(step.name, step.condition, available)]
+            if isinstance(step, PipelineLoop):
+                in_loop = available | set(_step_names(step))
+                conditions += [(f"{step.name}.{body.name}", body.condition, in_loop) for body in step.steps]
+                conditions.append((step.name, step.until, in_loop))
+            if step.speculation is not None:
+                conditions.append((step.name, step.speculation.confirm, available))
+                # Predicted inputs must be earlier top-level steps, whose responses can be merged
+                missing = [
+                    name for name in step.speculation.inputs
+                    if name not in available or indexes.get(name, i) == i
+                ]
+                missing += [name for name in step.speculation.unchanged if name not in available]
+                if missing:
+                    raise ValueError(
+                        f"Speculation of pipeline step {step.name} refers to {missing}, "
+                        f"which must be upstream of it"
+                    )
+            for name, condition, allowed in conditions:
+                if condition is None:
+                    continue
+                missing = sorted(condition.steps - allowed)
+                if missing:
+                    raise ValueError(
+                        f"Condition of pipeline step {name} refers to {missing}, "
+                        f"which must be upstream of it"
+                    )
+        return dependencies
+    
+    @staticmethod
+    def _step_from_config(step_config: Dict[str, Any], default_depends_on: List[str]) -> PipelineStep:
+        """Create a pipeline step from its configuration"""
+        if "agent_type" not in step_config:
+            raise ValueError("Each pipeline step must have an agent_type")
+        
+        depends_on = step_config.get("depends_on")
+        return PipelineStep(
+            agent_type=step_config["agent_type"],
+            name=step_config.get("name"),
+            description=step_config.get("description"),
+            system_prompt=step_config.get("system_prompt"),
+            params=step_config.get("params", {}),
+            use_state=step_config.get("use_state", True),
+            provider=step_config.get("provider"),
+            model=step_config.get("model"),
+            depends_on=default_depends_on if depends_on is None else depends_on,
+            when=step_config.get("when"),
+            timeout=step_config.get("timeout"),
+            speculate=step_config.get("speculate")
+        )
+    
+    @classmethod
+    def _loop_from_config(cls, loop_config: Dict[str, Any], default_depends_on: List[str]) -> PipelineLoop:
+        """Create a pipeline loop from its configuration"""
+        if "name" not in loop_config:
+            raise ValueError("Each pipeline loop must have a name")
+        if "until" not in loop_config:
+            raise ValueError(f"Pipeline loop {loop_config['name']} must have an until condition")
+        
+        depends_on = loop_config.get("depends_on")
+        return PipelineLoop(
+            name=loop_config["name"],
+            steps=[cls._step_from_config(body, []) for body in loop_config.get("steps", [])],
+            until=loop_config["until"],
+            max_iterations=loop_config.get("max_iterations", 2),
+            description=loop_config.get("description"),
+            depends_on=default_depends_on if depends_on is None else depends_on,
+            when=loop_config.get("when")
+        )
+    
     @classmethod
     def from_config(
         cls, 
         config: Union[List[Dict[str, Any]], str], 
         pipeline_id: Optional[str] = None,
-        persistent: bool = True
+        persistent: bool = True,
+        checkpoints: Optional[PipelineCheckpointStore] = None,
+        speculative: Optional[bool] = None
     ) -> "AgentPipeline":
         """
         Create pipeline from configuration
         
+        Steps depend on the previous entry unless they list ``depends_on``.
+        An entry ``{"parallel": [...]}`` is a group of steps that all depend
+        on the previous entry; the entry after the group depends on all of
+        its steps. An entry ``{"loop": {...}}`` repeats its ``steps`` until
+        its ``until`` condition holds, at most ``max_iterations`` times.
+        
         Args:
             config: List of step configurations or pipeline name
             pipeline_id: Optional pipeline ID
             persistent: Whether to persist state between pipeline runs
+            checkpoints: Optional store for step outputs, making runs resumable
+            speculative: Whether to start steps early on predicted inputs;
+                defaults to ``pipeline.speculative`` in settings.yml
             
         Returns:
             Agent pipeline
         """
+        from backend.app.config import get_settings
+        settings = get_settings()
+        source = config
+        
         # If config is a string, load pipeline configuration from file
         if isinstance(config, str):
-            from backend.app.config import get_settings
-            settings = get_settings()
             config = settings.get_pipeline_config(config)
             if not config:
-                raise ValueError(f"Pipeline configuration not found: {config}")
+                raise ValueError(f"Pipeline configuration not found: {source}")
         
+        if speculative is None:
+            speculative = (settings.get_settings_config().get("pipeline") or {}).get("speculative", True)
+        
+        plan = _compile_plan(json.dumps(config, sort_keys=True, default=str))
+        pipeline = cls(
+            [_copy_step(step) for step in plan.steps], pipeline_id, persistent, checkpoints,
+            dependencies=plan.dependencies, speculative=speculative
+        )
+        pipeline.config = source
+        return pipeline
+    
+    @classmethod
+    def _build_steps(cls, config: List[Dict[str, Any]]) -> List[Union[PipelineStep, PipelineLoop]]:
+        """Create the steps and loops of a pipeline configuration"""
         steps = []
+        previous: List[str] = []
         for step_config in config:
-            if "agent_type" not in step_config:
-                raise ValueError("Each pipeline step must have an agent_type")
-                
-            steps.append(PipelineStep(
-                agent_type=step_config["agent_type"],
-                name=step_config.get("name"),
-                description=step_config.get("description"),
-                system_prompt=step_config.get("system_prompt"),
-                params=step_config.get("params", {}),
-                use_state=step_config.get("use_state", True)
-            ))
-        
-        return cls(steps, pipeline_id, persistent)
+            if step_config.get("parallel"):
+                group = [cls._step_from_config(member, previous) for member in step_config["parallel"]]
+                steps.extend(group)
+                previous = [step.name for step in group]
+            elif step_config.get("loop"):
+                step = cls._loop_from_config(step_config["loop"], previous)
+                steps.append(step)
+                previous = [step.name]
+            else:
+                step = cls._step_from_config(step_config, previous)
+                steps.append(step)
+                previous = [step.name]
+        return steps
     
     async def execute(
         self, 
         initial_input: Union[str, Dict[str, Any]], 
         system_prompt: Optional[str] = None,
-        continue_from_state: bool = False
+        continue_from_state: bool = False,
+        on_event: Optional[PipelineEventCallback] = None,
+        deadline: Optional[float] = None
     ) -> PipelineResult:
         """
         Execute the pipeline
         
+        If the deadline passes, running steps are cancelled and the result
+        is marked ``timed_out``, with the output of the furthest completed
+        step as its final response. If the pipeline itself is cancelled,
+        running steps and their LLM calls are cancelled too, and the run's
+        checkpoints and agent states are recorded before the cancellation
+        propagates.
+        
         Args:
             initial_input: Initial prompt or data dictionary to start the pipeline
             system_prompt: Optional system prompt for the first step
             continue_from_state: Whether to continue from saved state
+            on_event: Optional callback for progress events (step boundaries
+                and the final step's tokens)
+            deadline: Optional absolute deadline (``time.time()`` timestamp);
+                LLM calls use the time left as their timeout
             
         Returns:
             Pipeline result
@@ -256,10 +657,26 @@ class AgentPipeline:
         if not self.steps:
             raise ValueError("Pipeline has no steps")
         
+        with deadline_scope(deadline) as deadline:
+            async with trace_scope("pipeline", label=self.pipeline_id, pipeline_id=self.pipeline_id, steps=len(self.steps)) as pipeline_span:
+                result = await self._execute(initial_input, system_prompt, continue_from_state, on_event, deadline)
+                pipeline_span.set_attributes(success=result.success, timed_out=result.timed_out)
+                return result
+    
+    async def _execute(
+        self,
+        initial_input: Union[str, Dict[str, Any]],
+        system_prompt: Optional[str],
+        continue_from_state: bool,
+        on_event: Optional[PipelineEventCallback],
+        deadline: Optional[float]
+    ) -> PipelineResult:
+        """Run the steps of the pipeline under the deadline set by ``execute``"""
         result = PipelineResult(self.pipeline_id)
         context = AgentContext(
             request_id=str(uuid.uuid4()),
-            trace_id=self.pipeline_id
+            trace_id=self.pipeline_id,
+            deadline=deadline
         )
         
         # Handle input based on type
@@ -272,87 +689,646 @@ class AgentPipeline:
             current_prompt = initial_input.get("content", str(initial_input))
             current_data = initial_input
         
-        # Execute each step in sequence
-        for i, step in enumerate(self.steps):
-            logger.info(f"Executing pipeline step {i+1}/{len(self.steps)}: {step.name}")
+        if self.checkpoints:
+            await self.checkpoints.start_run(self.pipeline_id, self.config, initial_input, system_prompt)
+        
+        # Run every step as soon as the steps it depends on have completed
+        responses: Dict[int, AgentResponse] = {}
+        outputs: StepOutputs = {}  # output_data by step name, for conditions
+        running: Dict[asyncio.Future, int] = {}
+        waiting = list(range(len(self.steps)))
+        failed: Optional[AgentResponse] = None
+        speculations: Dict[int, _SpeculativeRun] = {}
+        indexes = {step.name: i for i, step in enumerate(self.steps)}
+        cancelled = False
+        
+        try:
+            while waiting or running:
+                for i in [i for i in waiting if all(d in responses for d in self.dependencies[i])]:
+                    waiting.remove(i)
+                    inputs = [(self.steps[d].name, responses[d]) for d in self.dependencies[i]]
+                    if i in speculations:
+                        execution = self._resolve_speculation(
+                            i, speculations.pop(i), self._ran_steps(responses), inputs, current_prompt,
+                            system_prompt, context, initial_input, current_data, continue_from_state,
+                            on_event, outputs
+                        )
+                    else:
+                        execution = self._execute_step(
+                            i, inputs, current_prompt, system_prompt, context, initial_input, current_data,
+                            continue_from_state, on_event, outputs
+                        )
+                    running[asyncio.ensure_future(execution)] = i
+                
+                # Start steps whose predicted inputs are ready while their real inputs are not
+                if self.speculative:
+                    for i in waiting:
+                        speculation = self.steps[i].speculation
+                        if (speculation is None or i in speculations
+                                or not all(indexes[name] in responses for name in speculation.inputs)):
+                            continue
+                        predicted = [(name, responses[indexes[name]]) for name in speculation.inputs]
+                        speculations[i] = self._speculate(i, predicted, current_prompt, context, initial_input, current_data)
+                
+                done, _ = await asyncio.wait(running, timeout=remaining_time(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    i = running.pop(task)
+                    step = self.steps[i]
+                    response = task.result()
+                    responses[i] = response
+                    outputs[step.name] = response.output_data or {}
+                    result.add_step_result(step.name, response)
+                    
+                    if on_event:
+                        await on_event("step_end", {
+                            "step": step.name,
+                            "index": i,
+                            "success": response.success,
+                            "skipped": response.metadata.get("skipped", False),
+                            "elapsed_time": response.elapsed_time,
+                            "error": response.error
+                        })
+                    
+                    # Save state ID for future use
+                    if response.state_id:
+                        self.state_ids[step.name] = response.state_id
+                        step.state_id = response.state_id
+                    
+                    if not response.success and failed is None:
+                        logger.error(f"Pipeline step {step.name} failed: {response.error}")
+                        failed = response
+                
+                # Out of time: stop the running steps and return what we have
+                if deadline is not None and time.time() >= deadline and (waiting or running or failed):
+                    self._timed_out(result, responses, context)
+                    return result
+                
+                # If a step failed, stop the pipeline
+                if failed:
+                    result.complete(failed)
+                    return result
+        except asyncio.CancelledError:
+            # The caller went away (e.g. the client disconnected)
+            logger.info(f"Pipeline {self.pipeline_id} cancelled after {len(responses)}/{len(self.steps)} steps")
+            cancelled = True
+            raise
+        finally:
+            for task in running:
+                task.cancel()
+            for run in speculations.values():
+                run.task.cancel()
+                _speculation_stats.abandoned += 1
+                _speculation_stats.wasted_usage = sum_usage(_speculation_stats.wasted_usage, run.usage.to_dict())
+            # Wait for cancelled steps to unwind, so no step saves state after the flush below
+            await asyncio.gather(*running, *(run.task for run in speculations.values()), return_exceptions=True)
+            if self.checkpoints:
+                await self.checkpoints.finish_run(
+                    self.pipeline_id,
+                    len(responses) == len(self.steps) and failed is None,
+                    "Cancelled" if cancelled else result.error
+                )
+            # Write the agent states this run saved in one transaction
+            if self.persistent:
+                with span("state.flush"):
+                    await get_state_store().flush(self.pipeline_id)
+        
+        result.complete(responses[len(self.steps) - 1])
+        return result
+    
+    def _timed_out(
+        self,
+        result: PipelineResult,
+        responses: Dict[int, AgentResponse],
+        context: AgentContext
+    ) -> None:
+        """Complete a result whose deadline passed with the best partial output"""
+        completed = [i for i in sorted(responses) if responses[i].success]
+        error = f"Pipeline deadline exceeded after {len(completed)}/{len(self.steps)} steps"
+        logger.warning(f"Pipeline {self.pipeline_id}: {error}")
+        
+        result.success = False
+        result.error = error
+        result.timed_out = True
+        if completed:
+            result.complete(responses[completed[-1]])
+        else:
+            result.complete(AgentResponse(
+                text="",
+                request_id=context.request_id,
+                agent_id=self.pipeline_id,
+                agent_name=self.pipeline_id,
+                elapsed_time=result.elapsed_time,
+                error=error,
+                success=False
+            ))
+    
+    @staticmethod
+    def _merge_inputs(inputs: List[Tuple[str, AgentResponse]], initial_prompt: str) -> str:
+        """
+        Build a step's prompt from the outputs it takes as input
+        
+        Args:
+            inputs: (step name, response) of each input
+            initial_prompt: Pipeline input, used by steps without inputs
             
+        Returns:
+            Prompt for the step
+        """
+        if not inputs:
+            return initial_prompt
+        if len(inputs) == 1:
+            return inputs[0][1].text
+        return "\n\n".join(f"## {name}\n\n{response.text}" for name, response in inputs)
+    
+    @staticmethod
+    def _skipped_response(
+        step: Union[PipelineStep, PipelineLoop],
+        inputs: List[Tuple[str, AgentResponse]],
+        initial_prompt: str,
+        context: AgentContext
+    ) -> AgentResponse:
+        """Response of a step whose condition does not hold: its first input, unchanged"""
+        logger.info(f"Skipping pipeline step {step.name}: condition not met")
+        source = inputs[0][1] if inputs else None
+        return AgentResponse(
+            text=source.text if source else initial_prompt,
+            request_id=context.request_id,
+            agent_id=step.name,
+            agent_name=step.name,
+            elapsed_time=0.0,
+            output_data=dict(source.output_data) if source else {},
+            metadata={"skipped": True}
+        )
+    
+    @staticmethod
+    def _step_params(step: PipelineStep, initial_input: Union[str, Dict[str, Any]], current_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge step params with input data if it's a dictionary"""
+        params = step.params.copy()
+        if isinstance(initial_input, dict):
+            # Only copy known parameters to avoid flooding the agent with data
+            for key in params.keys():
+                if key in current_data:
+                    params[key] = current_data[key]
+        return params
+    
+    async def _execute_step(
+        self,
+        index: int,
+        inputs: List[Tuple[str, AgentResponse]],
+        initial_prompt: str,
+        system_prompt: Optional[str],
+        context: AgentContext,
+        initial_input: Union[str, Dict[str, Any]],
+        current_data: Dict[str, Any],
+        continue_from_state: bool,
+        on_event: Optional[PipelineEventCallback],
+        outputs: StepOutputs
+    ) -> AgentResponse:
+        """
+        Execute a single step or loop
+        
+        Returns:
+            The step's response; exceptions are turned into failed responses
+        """
+        step = self.steps[index]
+        logger.info(f"Executing pipeline step {index+1}/{len(self.steps)}: {step.name}")
+        
+        is_final = index == len(self.steps) - 1
+        if on_event:
+            await on_event("step_start", {"step": step.name, "index": index, "total": len(self.steps)})
+        
+        # Steps without dependencies receive the pipeline's system prompt
+        pipeline_system_prompt = system_prompt if not self.dependencies[index] else None
+        
+        if step.condition is not None and not step.condition.evaluate(outputs):
+            with span("step.skipped", step=step.name):
+                response = self._skipped_response(step, inputs, initial_prompt, context)
+        elif isinstance(step, PipelineLoop):
+            with span("loop", loop=step.name, max_iterations=step.max_iterations) as loop_span:
+                response = await self._execute_loop(
+                    step, inputs, initial_prompt, pipeline_system_prompt, context,
+                    initial_input, current_data, outputs
+                )
+                loop_span.set_attributes(success=response.success, iterations=len(response.metadata.get("iterations", [])))
+        else:
             # Determine if we should load state
-            load_state = False
             state_id = None
+            if continue_from_state and self.persistent and step.name in self.state_ids:
+                state_id = self.state_ids[step.name]
+                logger.info(f"Continuing from saved state for step {step.name} (ID: {state_id})")
             
-            if continue_from_state and self.persistent:
-                # Check if we have a saved state for this step
-                if step.name in self.state_ids:
-                    load_state = True
-                    state_id = self.state_ids[step.name]
-                    logger.info(f"Continuing from saved state for step {step.name} (ID: {state_id})")
-            
-            # Merge step params with input data if it's a dictionary
-            params = step.params.copy()
-            if isinstance(initial_input, dict):
-                # Only copy known parameters to avoid flooding the agent with data
-                for key in params.keys():
-                    if key in current_data:
-                        params[key] = current_data[key]
+            # Stream the final step's tokens as they arrive
+            async def stream_token(chunk: str, step_name: str = step.name):
+                await on_event("token", {"step": step_name, "text": chunk})
+            on_token = stream_token if on_event and is_final else None
             
-            # Create request for this step
-            request = AgentRequest(
-                prompt=current_prompt,
-                system_prompt=step.system_prompt if i > 0 else (system_prompt or step.system_prompt),
-                context=context,
-                params=params,
-                load_state=load_state and step.use_state,
-                save_state=self.persistent and step.use_state,
-                state_id=state_id
+            with span("step.prompt", step=step.name, inputs=len(inputs)):
+                prompt = self._merge_inputs(inputs, initial_prompt)
+                params = self._step_params(step, initial_input, current_data)
+            return await self._run_agent(
+                step,
+                step.name,
+                prompt,
+                pipeline_system_prompt or step.system_prompt,
+                params,
+                context,
+                state_id=state_id,
+                on_token=on_token
             )
+        
+        # Skipped steps and loops do not stream; send their output at once
+        if on_event and is_final:
+            await on_event("token", {"step": step.name, "text": response.text})
+        return response
+    
+    def _ran_steps(self, responses: Dict[int, AgentResponse]) -> Set[str]:
+        """Names of the completed steps, including loop body steps, that ran rather than being skipped"""
+        ran = set()
+        for i, response in responses.items():
+            if not response.metadata.get("skipped", False):
+                ran.add(self.steps[i].name)
+            for iteration in response.metadata.get("iterations", []):
+                ran.update(step["step"] for step in iteration["steps"] if not step["skipped"])
+        return ran
+    
+    def _speculate(
+        self,
+        index: int,
+        predicted: List[Tuple[str, AgentResponse]],
+        initial_prompt: str,
+        context: AgentContext,
+        initial_input: Union[str, Dict[str, Any]],
+        current_data: Dict[str, Any]
+    ) -> _SpeculativeRun:
+        """
+        Start a step on its predicted inputs
+        
+        Returns:
+            The speculative run, collecting the usage of its LLM calls
+        """
+        step = self.steps[index]
+        logger.info(f"Speculatively starting pipeline step {step.name} on {[name for name, _ in predicted]}")
+        _speculation_stats.started += 1
+        usage = UsageCounter()
+        
+        async def run() -> AgentResponse:
+            with track_usage(usage), span("step.speculate", step=step.name):
+                response = await self._run_agent(
+                    step,
+                    step.name,
+                    self._merge_inputs(predicted, initial_prompt),
+                    step.system_prompt,
+                    self._step_params(step, initial_input, current_data),
+                    context
+                )
+            speculation.end_time = time.time()
+            return response
+        
+        speculation = _SpeculativeRun(asyncio.ensure_future(run()), usage)
+        return speculation
+    
+    async def _resolve_speculation(
+        self,
+        index: int,
+        speculation: _SpeculativeRun,
+        ran: Set[str],
+        inputs: List[Tuple[str, AgentResponse]],
+        initial_prompt: str,
+        system_prompt: Optional[str],
+        context: AgentContext,
+        initial_input: Union[str, Dict[str, Any]],
+        current_data: Dict[str, Any],
+        continue_from_state: bool,
+        on_event: Optional[PipelineEventCallback],
+        outputs: StepOutputs
+    ) -> AgentResponse:
+        """
+        Keep the output of a speculatively started step, or run it again on its real inputs
+        
+        Args:
+            index: Step index
+            speculation: The step's speculative run
+            ran: Names of the completed steps that were not skipped
             
-            # Execute the agent
-            agent = step.get_agent()
-            try:
+        Returns:
+            The step's response, with the outcome in ``metadata["speculation"]``
+        """
+        step = self.steps[index]
+        resolved_at = time.time()
+        if (step.condition is None or step.condition.evaluate(outputs)) and step.speculation.holds(outputs, ran):
+            response = await speculation.task
+            if response.success:
+                # Without speculation the step would have started now
+                saved_time = max(0.0, min(resolved_at, speculation.end_time or resolved_at) - speculation.start_time)
+                _speculation_stats.hits += 1
+                _speculation_stats.saved_time += saved_time
+                logger.info(f"Speculative output of pipeline step {step.name} kept, saving {saved_time:.2f}s")
+                if on_event:
+                    await on_event("step_start", {"step": step.name, "index": index, "total": len(self.steps)})
+                    if index == len(self.steps) - 1:
+                        await on_event("token", {"step": step.name, "text": response.text})
+                return response.model_copy(update={
+                    "metadata": {**response.metadata, "speculation": {"hit": True, "saved_time": saved_time}}
+                })
+        else:
+            speculation.task.cancel()
+            await asyncio.wait([speculation.task])
+        
+        wasted_usage = speculation.usage.to_dict()
+        _speculation_stats.misses += 1
+        _speculation_stats.wasted_usage = sum_usage(_speculation_stats.wasted_usage, wasted_usage)
+        logger.info(f"Speculative output of pipeline step {step.name} discarded, running it on its real inputs")
+        
+        response = await self._execute_step(
+            index, inputs, initial_prompt, system_prompt, context, initial_input, current_data,
+            continue_from_state, on_event, outputs
+        )
+        return response.model_copy(update={
+            "metadata": {
+                **response.metadata,
+                # The discarded run's tokens were spent too
+                "usage": sum_usage(response.metadata.get("usage"), wasted_usage),
+                "speculation": {"hit": False, "wasted_usage": wasted_usage},
+            }
+        })
+    
+    async def _execute_loop(
+        self,
+        loop: PipelineLoop,
+        inputs: List[Tuple[str, AgentResponse]],
+        initial_prompt: str,
+        system_prompt: Optional[str],
+        context: AgentContext,
+        initial_input: Union[str, Dict[str, Any]],
+        current_data: Dict[str, Any],
+        outputs: StepOutputs
+    ) -> AgentResponse:
+        """
+        Run a loop's body until its condition holds or it reaches its iteration limit
+        
+        Returns:
+            The last body step's response, with the loop's total usage and
+            a summary of its iterations
+        """
+        iterations: List[Dict[str, Any]] = []
+        usages: List[Dict[str, Any]] = []
+        loop_inputs = inputs
+        
+        for iteration in range(1, loop.max_iterations + 1):
+            step_inputs = loop_inputs
+            body_responses: List[Tuple[str, AgentResponse]] = []
+            for body_index, step in enumerate(loop.steps):
+                if step.condition is not None and not step.condition.evaluate(outputs):
+                    response = self._skipped_response(step, step_inputs, initial_prompt, context)
+                else:
+                    first = iteration == 1 and body_index == 0
+                    response = await self._run_agent(
+                        step,
+                        f"{loop.name}.{step.name}#{iteration}",
+                        self._merge_inputs(step_inputs, initial_prompt),
+                        (system_prompt if first else None) or step.system_prompt,
+                        self._step_params(step, initial_input, current_data),
+                        context
+                    )
+                body_responses.append((step.name, response))
+                usages.append(response.metadata.get("usage") or {})
+                if not response.success:
+                    break
+                outputs[step.name] = response.output_data or {}
+                step_inputs = [(step.name, response)]
+            
+            iterations.append({
+                "iteration": iteration,
+                "steps": [
+                    {"step": name, "success": r.success, "skipped": r.metadata.get("skipped", False)}
+                    for name, r in body_responses
+                ]
+            })
+            
+            if not response.success:
+                logger.error(f"Pipeline loop {loop.name} failed in iteration {iteration}: {response.error}")
+                break
+            if loop.until.evaluate(outputs):
+                logger.info(f"Pipeline loop {loop.name} finished after {iteration} iteration(s)")
+                break
+            if iteration == loop.max_iterations:
+                logger.warning(f"Pipeline loop {loop.name} reached {loop.max_iterations} iterations without meeting its condition")
+            
+            # The next iteration works on everything this one produced
+            loop_inputs = body_responses
+        
+        return response.model_copy(update={
+            "metadata": {
+                **response.metadata,
+                "usage": sum_usage(*usages),
+                "iterations": iterations,
+            }
+        })
+    
+    async def _run_agent(
+        self,
+        step: PipelineStep,
+        checkpoint_name: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        params: Dict[str, Any],
+        context: AgentContext,
+        state_id: Optional[str] = None,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> AgentResponse:
+        """
+        Run a step's agent, or reuse its output from an earlier attempt of the run
+        
+        Args:
+            step: Pipeline step
+            checkpoint_name: Name the output is checkpointed under
+            prompt: Step prompt
+            system_prompt: Step system prompt
+            params: Step parameters
+            context: Agent context
+            state_id: Optional saved state to continue from
+            on_token: Optional callback streaming the output
+            
+        Returns:
+            The step's response; exceptions are turned into failed responses
+        """
+        with span("step.run", step=checkpoint_name, agent_type=step.agent_type) as run_span:
+            response = await self._invoke_agent(
+                step, checkpoint_name, prompt, system_prompt, params, context, state_id, on_token
+            )
+            usage = response.metadata.get("usage") or {}
+            run_span.set_attributes(
+                success=response.success,
+                resumed=response.metadata.get("resumed", False),
+                timed_out=response.metadata.get("timed_out", False),
+                **{k: usage[k] for k in ("calls", "prompt_tokens", "completion_tokens", "cached_tokens") if k in usage}
+            )
+            return response
+    
+    async def _invoke_agent(
+        self,
+        step: PipelineStep,
+        checkpoint_name: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        params: Dict[str, Any],
+        context: AgentContext,
+        state_id: Optional[str],
+        on_token: Optional[Callable[[str], Awaitable[None]]]
+    ) -> AgentResponse:
+        """Run or resume a step's agent, see ``_run_agent``"""
+        # Reuse the output of this step from an earlier attempt of the run
+        input_hash = None
+        if self.checkpoints:
+            input_hash = step_input_hash(
+                step.agent_type, prompt, system_prompt, params, step.provider, step.model
+            )
+            with span("checkpoint.load"):
+                response = await self.checkpoints.load_step(self.pipeline_id, checkpoint_name, input_hash, context.request_id)
+            if response is not None:
+                logger.info(f"Resuming pipeline step {checkpoint_name} from its stored output")
+                if on_token:
+                    await on_token(response.text)
+                return response
+        
+        if on_token:
+            params = {**params, "on_token": on_token}
+        
+        # Create request for this step
+        request = AgentRequest(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            context=context,
+            params=params,
+            load_state=state_id is not None and step.use_state,
+            save_state=self.persistent and step.use_state,
+            state_id=state_id
+        )
+        
+        # Execute the agent within the step's time budget
+        # Pooled agents keep their state per run and step, not per instance
+        agent = step.get_agent(f"{self.pipeline_id}:{step.name}")
+        start_time = time.time()
+        try:
+            with deadline_scope(start_time + step.timeout if step.timeout else None), track_usage() as usage:
                 # Use execute_with_state if available and state is enabled
                 if hasattr(agent, 'execute_with_state') and step.use_state:
-                    response = await agent.execute_with_state(request)
+                    execution = agent.execute_with_state(request)
                 else:
-                    response = await agent.execute(request)
-                    
-                result.add_step_result(step.name, response)
-                
-                # Save state ID for future use
-                if response.state_id:
-                    self.state_ids[step.name] = response.state_id
-                    step.state_id = response.state_id
-                
-                # If the step failed, stop the pipeline
-                if not response.success:
-                    logger.error(f"Pipeline step {step.name} failed: {response.error}")
-                    result.complete(response)
-                    return result
-                
-                # Update prompt for next step
-                current_prompt = response.text
-                
-                # If this is the last step, complete the pipeline
-                if i == len(self.steps) - 1:
-                    result.complete(response)
-                    
-            except Exception as e:
-                logger.error(f"Error executing pipeline step {step.name}: {str(e)}")
-                error_response = AgentResponse(
-                    text=f"Error in pipeline step {step.name}: {str(e)}",
-                    request_id=context.request_id,
-                    agent_id=agent.agent_id,
-                    agent_name=agent.name,
-                    elapsed_time=0.0,
-                    error=str(e),
-                    success=False
+                    execution = agent.execute(request)
+                response = await asyncio.wait_for(execution, remaining_time())
+            response.metadata["usage"] = usage.to_dict()
+            if self.checkpoints and response.success:
+                with span("checkpoint.save"):
+                    await self.checkpoints.save_step(self.pipeline_id, checkpoint_name, input_hash, response)
+            return response
+            
+        except asyncio.TimeoutError:
+            elapsed = time.time() - start_time
+            logger.error(f"Pipeline step {checkpoint_name} timed out after {elapsed:.1f}s")
+            return AgentResponse(
+                text=f"Error in pipeline step {checkpoint_name}: timed out after {elapsed:.1f}s",
+                request_id=context.request_id,
+                agent_id=agent.agent_id,
+                agent_name=agent.name,
+                elapsed_time=elapsed,
+                metadata={"timed_out": True, "usage": usage.to_dict()},
+                error=f"Timed out after {elapsed:.1f}s",
+                success=False
+            )
+        except Exception as e:
+            logger.error(f"Error executing pipeline step {checkpoint_name}: {str(e)}")
+            return AgentResponse(
+                text=f"Error in pipeline step {checkpoint_name}: {str(e)}",
+                request_id=context.request_id,
+                agent_id=agent.agent_id,
+                agent_name=agent.name,
+                elapsed_time=0.0,
+                error=str(e),
+                success=False
+            )
+        finally:
+            AgentFactory.release_agent(agent)
+    
+    async def execute_stream(
+        self,
+        initial_input: Union[str, Dict[str, Any]],
+        system_prompt: Optional[str] = None,
+        continue_from_state: bool = False,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Execute the pipeline, yielding progress events as they happen
+        
+        Yields ``step_start``/``step_end`` events for every step, ``token``
+        events for the final step's output, and a closing ``result`` event
+        with the full pipeline result.
+        
+        Args:
+            initial_input: Initial prompt or data dictionary to start the pipeline
+            system_prompt: Optional system prompt for the first step
+            continue_from_state: Whether to continue from saved state
+            deadline: Optional absolute deadline (``time.time()`` timestamp)
+            
+        Yields:
+            Tuples of (event name, event data)
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def on_event(event: str, data: Dict[str, Any]):
+            await queue.put((event, data))
+        
+        async def run():
+            try:
+                result = await self.execute(
+                    initial_input,
+                    system_prompt=system_prompt,
+                    continue_from_state=continue_from_state,
+                    on_event=on_event,
+                    deadline=deadline
                 )
-                result.add_step_result(step.name, error_response)
-                result.complete(error_response)
-                break
+                await queue.put(("result", result.to_dict()))
+            except Exception as e:
+                logger.error(f"Error in streamed pipeline {self.pipeline_id}: {str(e)}")
+                await queue.put(("error", {"error": str(e)}))
         
-        return result
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event, data = await queue.get()
+                yield event, data
+                if event in ("result", "error"):
+                    break
+        finally:
+            # The consumer stopped listening (e.g. the client disconnected)
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
         
     
+class PipelinePlan:
+    """
+    Steps and dependency graph of a pipeline configuration, built once
+    
+    Pipelines created from the same configuration start from copies of the
+    plan's steps, sharing their compiled conditions.
+    """
+    def __init__(self, steps: List[Union[PipelineStep, PipelineLoop]]):
+        self.steps = steps
+        self.dependencies = AgentPipeline._resolve_dependencies(steps)
+
+
+@lru_cache(maxsize=32)
+def _compile_plan(config_json: str) -> PipelinePlan:
+    """
+    Build the plan of a pipeline configuration
+    
+    Keyed by the serialized configuration, so an edited configuration
+    gets a new plan.
+    """
+    return PipelinePlan(AgentPipeline._build_steps(json.loads(config_json)))
+
+
 # Create a simple helper function to create and execute a pipeline
 async def execute_agent_pipeline(
     step_configs: List[Dict[str, Any]], 
@@ -360,7 +1336,9 @@ async def execute_agent_pipeline(
     system_prompt: Optional[str] = None,
     pipeline_id: Optional[str] = None,
     persistent: bool = True,
-    continue_from_state: bool = False
+    continue_from_state: bool = False,
+    checkpoints: Optional[PipelineCheckpointStore] = None,
+    deadline: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     Helper function to create and execute a pipeline
@@ -372,6 +1350,8 @@ async def execute_agent_pipeline(
         pipeline_id: Optional pipeline ID
         persistent: Whether to persist state between pipeline runs
         continue_from_state: Whether to continue from saved state
+        checkpoints: Optional store for step outputs, making the run resumable
+        deadline: Optional absolute deadline (``time.time()`` timestamp)
         
     Returns:
         Pipeline result as a dictionary
@@ -379,11 +1359,155 @@ async def execute_agent_pipeline(
     pipeline = AgentPipeline.from_config(
         step_configs, 
         pipeline_id=pipeline_id, 
-        persistent=persistent
+        persistent=persistent,
+        checkpoints=checkpoints
     )
     result = await pipeline.execute(
         initial_input=initial_input, 
         system_prompt=system_prompt,
-        continue_from_state=continue_from_state
+        continue_from_state=continue_from_state,
+        deadline=deadline
+    )
+    return result.to_dict() 
+
+
+async def resume_pipeline(
+    run_id: str,
+    checkpoints: Optional[PipelineCheckpointStore] = None,
+    on_event: Optional[PipelineEventCallback] = None,
+    deadline: Optional[float] = None
+) -> PipelineResult:
+    """
+    Resume a checkpointed pipeline run from its first incomplete step
+    
+    The run is executed again with the configuration and input it was
+    started with; steps with a stored output for the same input are not
+    re-executed.
+    
+    Args:
+        run_id: Run ID (the pipeline ID of the original execution)
+        checkpoints: Store the run was recorded in, defaults to the database store
+        on_event: Optional callback for progress events
+        deadline: Optional absolute deadline (``time.time()`` timestamp)
+        
+    Returns:
+        Pipeline result
+        
+    Raises:
+        KeyError: If the run does not exist
+        ValueError: If the run was not recorded with its configuration
+    """
+    checkpoints = checkpoints or PipelineCheckpointStore()
+    run = await checkpoints.get_run(run_id)
+    if run is None:
+        raise KeyError(f"Pipeline run not found: {run_id}")
+    if not run["pipeline_config"]:
+        raise ValueError(f"Pipeline run {run_id} has no recorded configuration and cannot be resumed")
+    
+    logger.info(f"Resuming pipeline run {run_id} (completed steps: {run['completed_steps']})")
+    pipeline = AgentPipeline.from_config(run["pipeline_config"], pipeline_id=run_id, checkpoints=checkpoints)
+    return await pipeline.execute(
+        run["initial_input"],
+        system_prompt=run["system_prompt"],
+        on_event=on_event,
+        deadline=deadline
     )
-    return result.to_dict() 
\ No newline at end of file
+
+
+# Async callback receiving each fan-out branch result as it finishes
+FanOutResultCallback = Callable[[int, PipelineResult], Awaitable[None]]
+
+
+async def execute_pipeline_fan_out(
+    config: Union[List[Dict[str, Any]], str],
+    inputs: List[Union[str, Dict[str, Any]]],
+    max_concurrency: int = 4,
+    pipeline_id: Optional[str] = None,
+    persistent: bool = True,
+    on_result: Optional[FanOutResultCallback] = None,
+    checkpoints: Optional[PipelineCheckpointStore] = None,
+    deadline: Optional[float] = None,
+    admission: Optional[AdmissionController] = None
+) -> List[PipelineResult]:
+    """
+    Run one independent pipeline instance per input, concurrently
+    
+    A failing branch does not affect the others; its result has
+    ``success`` False and the error. With an admission controller, each
+    branch holds one of its slots while it runs; a branch that is not
+    admitted fails like any other.
+    
+    Args:
+        config: List of step configurations or pipeline name
+        inputs: Initial input of each branch
+        max_concurrency: Maximum number of branches running at once
+        pipeline_id: Optional base pipeline ID; branches get an index suffix
+        persistent: Whether to persist state between pipeline runs
+        on_result: Optional callback invoked with (branch index, result) as
+            each branch finishes
+        checkpoints: Optional store for step outputs, making each branch a
+            resumable run
+        deadline: Optional absolute deadline (``time.time()`` timestamp)
+            shared by all branches
+        admission: Optional admission controller, counting each branch as
+            one generation
+        
+    Returns:
+        Branch results, in input order
+        
+    Raises:
+        Overloaded: If no branch was admitted
+    """
+    base_id = pipeline_id or f"pipeline-{str(uuid.uuid4())[:8]}"
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    rejections: List[Overloaded] = []
+    
+    async def run_branch(index: int, initial_input: Union[str, Dict[str, Any]]) -> Tuple[int, PipelineResult]:
+        branch_id = f"{base_id}-{index}"
+        admitted_at = None
+        with span("pipeline.queue", branch=branch_id):
+            await semaphore.acquire()
+        try:
+            if admission is not None:
+                with span("pipeline.admission", branch=branch_id):
+                    await admission.acquire()
+                admitted_at = time.monotonic()
+            pipeline = AgentPipeline.from_config(
+                config, pipeline_id=branch_id, persistent=persistent, checkpoints=checkpoints
+            )
+            return index, await pipeline.execute(initial_input, deadline=deadline)
+        except Exception as e:
+            if isinstance(e, Overloaded):
+                rejections.append(e)
+            logger.error(f"Pipeline branch {branch_id} failed: {str(e)}")
+            result = PipelineResult(branch_id)
+            result.success = False
+            result.error = str(e)
+            result.end_time = datetime.utcnow()
+            return index, result
+        finally:
+            if admitted_at is not None:
+                admission.release(time.monotonic() - admitted_at)
+            semaphore.release()
+    
+    results: List[Optional[PipelineResult]] = [None] * len(inputs)
+    async with trace_scope("pipeline.fan_out", label=base_id, pipeline_id=base_id, branches=len(inputs)):
+        tasks = [asyncio.ensure_future(run_branch(i, initial_input)) for i, initial_input in enumerate(inputs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result = await next_done
+                results[index] = result
+                logger.info(f"Pipeline branch {result.pipeline_id} finished: success={result.success}")
+                if on_result:
+                    await on_result(index, result)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            # Let cancelled branches record their runs and flush their state first
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    if inputs and len(rejections) == len(inputs):
+        # Nothing ran: reject the whole fan-out, so callers can retry later
+        raise rejections[0]
+    return results
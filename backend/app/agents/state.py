@@ -1,11 +1,15 @@
+import asyncio
+import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Callable, Tuple
 from datetime import datetime
+from functools import lru_cache
 
 from sqlalchemy.orm import Session
 from fastapi import Depends
 
-from backend.app.db.session import get_db
+from backend.app.config import get_settings
+from backend.app.db.session import get_db, SessionLocal
 from backend.app.agents.base import AbstractAgent, AgentRequest
 from backend.app.models.agent_state import AgentState
 from backend.app.crud.agent_state import agent_state as agent_state_crud
@@ -42,7 +46,7 @@ class StatefulAgent(AbstractAgent):
                 close_db = True
             
             # Get state ID from request or use agent ID
-            state_id = request.state_id or self.agent_id
+            state_id = request.state_id or self.state_id
             
             # Get state from database
             db_state = agent_state_crud.get_by_agent_id(db, state_id) 
@@ -90,7 +94,7 @@ class StatefulAgent(AbstractAgent):
                 close_db = True
             
             # Get state ID from request or use agent ID
-            state_id = request.state_id or self.agent_id
+            state_id = request.state_id or self.state_id
             pipeline_id = getattr(request.context, 'trace_id', None)
             
             # Get existing state or create new
@@ -132,55 +136,229 @@ class StatefulAgent(AbstractAgent):
                 db.close()
 
 
+class _PendingState:
+    """Buffered versions of one agent state, oldest first, with the pipeline run saving each"""
+    def __init__(self, state_id: str, agent_type: str):
+        self.state_id = state_id
+        self.agent_type = agent_type
+        self.versions: List[Tuple[Optional[str], Dict[str, Any]]] = []
+
+    def saved_by(self, pipeline_id: Optional[str]) -> bool:
+        return any(saver == pipeline_id for saver, _ in self.versions)
+
+
+class WriteBehindStateStore:
+    """
+    Write-behind buffer for agent state persistence
+
+    Saving state only buffers it; buffered states are written in one
+    transaction, in a worker thread, when their pipeline run ends, every
+    ``flush_interval`` seconds and whenever ``max_pending`` states are
+    buffered. Every buffered version is still recorded as a checkpoint, as
+    with direct writes. Loads see buffered states before they are written.
+
+    State saved since the last flush is lost if the process dies; step
+    outputs are checkpointed separately, so a resumed run still skips its
+    completed steps. Use ``mode: write_through`` to write each save at once.
+    """
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        session_factory: Optional[Callable[[], Session]] = None
+    ):
+        """
+        Initialize store
+
+        Args:
+            config: State configuration (``state`` in settings.yml)
+            session_factory: Optional session factory, defaults to the application database
+        """
+        config = config or {}
+        self.write_through = config.get("mode", "write_behind") == "write_through"
+        self.flush_interval = config.get("flush_interval", 5.0)
+        self.max_pending = max(1, config.get("max_pending", 100))
+        self.session_factory = session_factory or SessionLocal
+        self._pending: Dict[str, _PendingState] = {}
+        self._flushing: Dict[str, _PendingState] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.saved = 0
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+
+    def get(self, state_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the latest buffered version of a state
+
+        Args:
+            state_id: State ID (agent ID)
+
+        Returns:
+            The state, or None if nothing is buffered for it
+        """
+        pending = self._pending.get(state_id) or self._flushing.get(state_id)
+        return json.loads(json.dumps(pending.versions[-1][1])) if pending else None
+
+    async def load(self, state_id: str) -> Dict[str, Any]:
+        """
+        Load the latest version of a state, buffered or written
+
+        Args:
+            state_id: State ID (agent ID)
+
+        Returns:
+            The state, or an empty dictionary if it was never saved
+        """
+        buffered = self.get(state_id)
+        if buffered is not None:
+            return buffered
+        return await asyncio.to_thread(self._read, state_id)
+
+    def _read(self, state_id: str) -> Dict[str, Any]:
+        with self.session_factory() as db:
+            db_state = agent_state_crud.get_by_agent_id(db, state_id)
+            return db_state.state_data if db_state else {}
+
+    async def save(self, state_id: str, agent_type: str, pipeline_id: Optional[str], state: Dict[str, Any]) -> str:
+        """
+        Buffer a new version of a state
+
+        Args:
+            state_id: State ID (agent ID)
+            agent_type: Agent class name
+            pipeline_id: ID of the pipeline run saving the state
+            state: State data
+
+        Returns:
+            State ID
+        """
+        pending = self._pending.get(state_id)
+        if pending is None:
+            pending = self._pending[state_id] = _PendingState(state_id, agent_type)
+        # Copy now, agents keep mutating their state
+        pending.versions.append((pipeline_id, json.loads(json.dumps(state, default=str))))
+        self.saved += 1
+
+        if self.write_through:
+            await self.flush(pipeline_id)
+        elif len(self._pending) >= self.max_pending:
+            await self.flush()
+        elif self.flush_interval and (self._flusher is None or self._flusher.done()):
+            self._flusher = asyncio.create_task(self._flush_periodically())
+        return state_id
+
+    async def flush(self, pipeline_id: Optional[str] = None) -> int:
+        """
+        Write buffered states in one transaction
+
+        A state saved by several runs since the last flush is written with
+        all its versions when any of them flushes.
+
+        Args:
+            pipeline_id: Only write the states saved by this pipeline run; all if None
+
+        Returns:
+            Number of states written
+        """
+        if not any(pipeline_id is None or p.saved_by(pipeline_id) for p in self._pending.values()):
+            return 0
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            ids = [i for i, p in self._pending.items() if pipeline_id is None or p.saved_by(pipeline_id)]
+            if not ids:
+                return 0
+            self._flushing = {i: self._pending.pop(i) for i in ids}
+            try:
+                await asyncio.to_thread(self._write, list(self._flushing.values()))
+            except Exception as e:
+                logger.error(f"Error writing {len(ids)} agent states, keeping them buffered: {str(e)}")
+                self.errors += 1
+                # Older versions go before any saved during the write
+                for state_id, failed in self._flushing.items():
+                    newer = self._pending.get(state_id)
+                    if newer is not None:
+                        failed.versions.extend(newer.versions)
+                    self._pending[state_id] = failed
+                return 0
+            finally:
+                self._flushing = {}
+            self.written += len(ids)
+            self.flushes += 1
+            return len(ids)
+
+    def _write(self, entries: List[_PendingState]) -> None:
+        """Apply buffered versions like ``update_state_data``, with a single commit"""
+        with self.session_factory() as db:
+            for entry in entries:
+                db_state = agent_state_crud.get_by_agent_id(db, entry.state_id)
+                for saver, state in entry.versions:
+                    if db_state is None:
+                        db_state = AgentState(
+                            agent_id=entry.state_id,
+                            agent_type=entry.agent_type,
+                            pipeline_id=saver,
+                            state_data=state
+                        )
+                        db.add(db_state)
+                        # Assign the ID checkpoints refer to
+                        db.flush()
+                    else:
+                        db.add(db_state.create_checkpoint())
+                        db_state.state_data = state
+                    db_state.last_executed = datetime.utcnow().isoformat()
+            db.commit()
+
+    async def _flush_periodically(self) -> None:
+        try:
+            while self._pending:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            self._flusher = None
+
+    async def close(self) -> None:
+        """Stop the interval flush and write everything still buffered"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get buffer counters"""
+        return {
+            "mode": "write_through" if self.write_through else "write_behind",
+            "pending": len(self._pending),
+            "saved": self.saved,
+            "written": self.written,
+            "flushes": self.flushes,
+            "errors": self.errors,
+        }
+
+
+@lru_cache()
+def get_state_store() -> WriteBehindStateStore:
+    """Get the agent state store configured in settings.yml"""
+    return WriteBehindStateStore(get_settings().get_settings_config().get("state"))
+
+
 class DatabaseStateMixin:
     """
     Mixin to add database state capabilities to any agent
     
     This mixin is simpler than the StatefulAgent and can be added to any
-    existing agent class.
+    existing agent class. Saves go through the write-behind state store.
     """
     async def load_state(self, request: AgentRequest) -> Dict[str, Any]:
-        """Load state from database"""
-        db = next(get_db())
-        try:
-            state_id = request.state_id or self.agent_id
-            db_state = agent_state_crud.get_by_agent_id(db, state_id)
-            
-            if not db_state:
-                return {}
-                
-            return db_state.state_data
-        finally:
-            db.close()
+        """Load state through the state store"""
+        return await get_state_store().load(request.state_id or self.state_id)
             
     async def save_state(self, request: AgentRequest, state: Dict[str, Any]) -> str:
-        """Save state to database"""
-        db = next(get_db())
-        try:
-            state_id = request.state_id or self.agent_id
-            pipeline_id = getattr(request.context, 'trace_id', None)
-            
-            db_state = agent_state_crud.get_by_agent_id(db, state_id)
-            
-            if db_state:
-                agent_state_crud.update_state_data(
-                    db=db,
-                    db_obj=db_state,
-                    state_data=state,
-                    create_checkpoint=True
-                )
-                return db_state.id
-            else:
-                from backend.app.schemas.agent_state import AgentStateCreate
-                
-                new_state = AgentStateCreate(
-                    agent_id=self.agent_id,
-                    agent_type=self.__class__.__name__,
-                    pipeline_id=pipeline_id,
-                    state_data=state
-                )
-                
-                db_state = agent_state_crud.create(db=db, obj_in=new_state)
-                return db_state.id
-        finally:
-            db.close() 
\ No newline at end of file
+        """Save state through the state store"""
+        return await get_state_store().save(
+            request.state_id or self.state_id,
+            self.__class__.__name__,
+            getattr(request.context, 'trace_id', None),
+            state
+        )
@@ -0,0 +1,258 @@
+"""
+Tool implementations and the tool-calling loop for agents.
+
+Tools declared under ``tools`` in agent_definitions.yml are offered to the
+model only when a Python implementation is registered here. Each model turn
+may request several tool calls; they run concurrently (coroutines on the
+event loop, blocking functions in worker threads) and their results are
+sent back in the next turn, up to a maximum number of rounds.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.app.agents.base import ToolDefinition
+from backend.app.llm import LLMProvider
+
+# Setup logger
+logger = logging.getLogger("app.agents.tools")
+
+
+def _tool_call_dict(call: Any) -> Dict[str, Any]:
+    """Convert an SDK tool call object (or cached dict) into a plain dictionary"""
+    if hasattr(call, "model_dump"):
+        call = call.model_dump()
+    function = call.get("function") or {}
+    return {
+        "id": call.get("id", ""),
+        "type": "function",
+        "function": {"name": function.get("name", ""), "arguments": function.get("arguments") or "{}"},
+    }
+
+
+class ToolRegistry:
+    """
+    Registry of Python implementations for agent tools
+    """
+    def __init__(self):
+        self._tools: Dict[str, Callable[..., Any]] = {}
+
+    def register(self, name: str, func: Optional[Callable[..., Any]] = None):
+        """
+        Register a tool implementation
+
+        Can be used directly or as a decorator. Coroutine functions are
+        awaited; plain functions are treated as blocking and run in a
+        worker thread.
+
+        Args:
+            name: Tool name, as in agent_definitions.yml
+            func: Implementation receiving the tool arguments as keywords
+        """
+        if func is None:
+            return lambda f: self.register(name, f)
+        self._tools[name] = func
+        logger.info(f"Registered tool: {name}")
+        return func
+
+    def has(self, name: str) -> bool:
+        """Check whether a tool has an implementation"""
+        return name in self._tools
+
+    async def call(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Run a tool
+
+        Args:
+            name: Tool name
+            arguments: Tool arguments
+
+        Returns:
+            Tool output
+
+        Raises:
+            KeyError: If the tool is not registered
+        """
+        func = self._tools[name]
+        if inspect.iscoroutinefunction(func):
+            return await func(**arguments)
+        return await asyncio.to_thread(func, **arguments)
+
+    async def execute(self, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one tool call requested by the model
+
+        Errors are returned to the model instead of raised, so it can
+        correct its arguments or answer without the tool.
+
+        Args:
+            tool_call: Tool call dictionary
+
+        Returns:
+            Dictionary with the tool name, arguments, output or error and
+            elapsed time
+        """
+        name = tool_call["function"]["name"]
+        start_time = time.time()
+        record: Dict[str, Any] = {"id": tool_call["id"], "name": name}
+        try:
+            arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+            record["arguments"] = arguments
+            if not self.has(name):
+                raise KeyError(f"Unknown tool: {name}")
+            record["output"] = await self.call(name, arguments)
+        except Exception as e:
+            logger.warning(f"Tool {name} failed: {str(e)}")
+            record["error"] = str(e)
+        record["elapsed_time"] = time.time() - start_time
+        return record
+
+
+# Default registry used by agents
+tool_registry = ToolRegistry()
+
+
+def tool_spec(tool: ToolDefinition) -> Dict[str, Any]:
+    """
+    Build the OpenAI function tool specification for a tool definition
+
+    Args:
+        tool: Tool definition
+
+    Returns:
+        Tool specification for ``generate_with_tools``
+    """
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": {
+                "type": "object",
+                "properties": tool.parameters,
+                "required": tool.required_parameters,
+            },
+        },
+    }
+
+
+async def run_tool_loop(
+    provider: LLMProvider,
+    prompt: str,
+    tools: List[ToolDefinition],
+    system_prompt: Optional[str] = None,
+    max_rounds: int = 3,
+    registry: Optional[ToolRegistry] = None,
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    Generate a response, running the tools the model calls
+
+    Each round sends the conversation so far; if the model asks for tools,
+    all calls of that turn run concurrently and their outputs are appended.
+    When ``max_rounds`` rounds have requested tools, one last call asks for
+    an answer without tools.
+
+    Args:
+        provider: LLM provider
+        prompt: User prompt
+        tools: Tools offered to the model; tools without an implementation are skipped
+        system_prompt: Optional system prompt
+        max_rounds: Maximum number of rounds that may run tools
+        registry: Tool registry, defaults to the global registry
+        **kwargs: Additional generation arguments
+
+    Returns:
+        Final response with ``tool_results`` and ``tool_rounds``
+    """
+    registry = registry or tool_registry
+    available = [tool for tool in tools if registry.has(tool.name)]
+    for tool in tools:
+        if not registry.has(tool.name):
+            logger.warning(f"Tool {tool.name} has no implementation and is not offered to the model")
+
+    if not available:
+        result = await provider.generate(prompt, system_prompt=system_prompt, **kwargs)
+        return {**result, "tool_results": [], "tool_rounds": 0}
+
+    specs = [tool_spec(tool) for tool in available]
+    messages: List[Dict[str, Any]] = []
+    tool_results: List[Dict[str, Any]] = []
+
+    for round_number in range(max_rounds + 1):
+        if round_number < max_rounds:
+            result = await provider.generate_with_tools(
+                prompt, specs, system_prompt=system_prompt, tool_messages=list(messages), **kwargs
+            )
+        else:
+            logger.warning(f"Tool loop reached {max_rounds} rounds, asking for a final answer")
+            result = await provider.generate_with_tools(
+                prompt, specs, system_prompt=system_prompt, tool_messages=list(messages),
+                tool_choice="none", **kwargs
+            )
+
+        tool_calls = [_tool_call_dict(call) for call in result.get("tool_calls") or []]
+        if not result.get("success") or not tool_calls or round_number == max_rounds:
+            break
+
+        messages.append({"role": "assistant", "content": result.get("text") or None, "tool_calls": tool_calls})
+        records = await asyncio.gather(*(registry.execute(call) for call in tool_calls))
+        for record in records:
+            content = {"error": record["error"]} if "error" in record else record["output"]
+            messages.append({
+                "role": "tool",
+                "tool_call_id": record["id"],
+                "content": json.dumps(content, default=str),
+            })
+        tool_results.extend(records)
+
+    return {**result, "tool_results": tool_results, "tool_rounds": round_number}
+
+
+_vector_store_client = None
+_vector_store_ids: Dict[str, str] = {}
+
+
+@tool_registry.register("search_vector_store")
+async def search_vector_store(query: str, collection_name: str = "cardiothoracic_knowledge", top_k: int = 5) -> Dict[str, Any]:
+    """
+    Search an OpenAI vector store by name
+
+    Args:
+        query: Search query
+        collection_name: Vector store name
+        top_k: Number of results to return
+
+    Returns:
+        Dictionary with the matching chunks
+    """
+    global _vector_store_client
+    if _vector_store_client is None:
+        from openai import AsyncOpenAI
+        _vector_store_client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+    if collection_name not in _vector_store_ids:
+        async for store in _vector_store_client.vector_stores.list():
+            _vector_store_ids.setdefault(store.name, store.id)
+    if collection_name not in _vector_store_ids:
+        raise ValueError(f"Vector store not found: {collection_name}")
+
+    page = await _vector_store_client.vector_stores.search(
+        _vector_store_ids[collection_name],
+        query=query,
+        max_num_results=top_k
+    )
+    return {
+        "results": [
+            {
+                "filename": item.filename,
+                "score": item.score,
+                "text": "\n".join(part.text for part in item.content),
+            }
+            for item in page.data
+        ]
+    }
@@ -7,6 +7,8 @@ class LLMProviderEnum(str, Enum):
     """Supported LLM providers"""
     OPENAI = "openai"
     OLLAMA = "ollama"
+    LOCAL = "local"  # Any OpenAI-compatible server (vLLM, llama.cpp, ...)
+    REPLAY = "replay"
 
 
 class SystemPrompts(BaseModel):
@@ -15,6 +17,14 @@ class SystemPrompts(BaseModel):
     deep_thinking: Optional[str] = None
 
 
+class LLMBatchingConfig(BaseModel):
+    """Micro-batching of concurrent prompts for local servers"""
+    enabled: bool = False
+    max_batch_size: int = 8
+    window_ms: float = 10  # How long the first prompt of a batch waits for others
+    prompt_template: str = "{system}\n\n{prompt}"  # Renders chat messages as one completion prompt
+
+
 class LLMProviderConfig(BaseModel):
     """Configuration for a specific LLM provider"""
     provider: LLMProviderEnum
@@ -28,6 +38,98 @@ class LLMProviderConfig(BaseModel):
     system_prompts: Optional[SystemPrompts] = None
     system_prompt: Optional[str] = None
     openai_api_key: Optional[str] = None
+    base_url: Optional[str] = None  # Local OpenAI-compatible server, e.g. http://localhost:11434/v1
+    api_key: Optional[str] = None  # Only if the local server requires one
+    max_concurrency: int = 4  # Concurrent requests to a local server
+    timeout: float = 600.0  # Seconds; local models can be slow
+    batching: Optional[LLMBatchingConfig] = None
+
+
+class LLMCacheConfig(BaseModel):
+    """Configuration for the LLM response cache"""
+    enabled: bool = False
+    max_entries: int = 1024
+    ttl: int = 86400  # Entry lifetime in seconds
+    max_temperature: Optional[float] = 0.0  # Only cache requests at or below this temperature
+    redis: bool = True  # Share entries between workers through Redis
+    redis_retry_interval: int = 60  # Seconds to skip Redis after an error
+    key_prefix: str = "llm"
+
+
+class LLMConcurrencyConfig(BaseModel):
+    """AIMD adaptive concurrency settings"""
+    initial: float = 4
+    min: float = 1
+    max: float = 32
+    increase: float = 1.0  # Additive increase per round trip
+    decrease_factor: float = 0.5  # Multiplicative decrease on 429 or latency spike
+    latency_factor: float = 2.0  # Latency above this multiple of the average is a spike
+
+
+class LLMRateLimitConfig(BaseModel):
+    """Configuration for LLM request rate limiting"""
+    enabled: bool = False
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    redis: bool = True  # Share budgets between workers through Redis
+    redis_retry_interval: int = 60  # Seconds of local limiting after a Redis error
+    key_prefix: str = "llm_rate"
+    concurrency: Optional[LLMConcurrencyConfig] = None
+
+
+class LLMReplayLatencyConfig(BaseModel):
+    """Simulated latency for replayed responses"""
+    distribution: str = "recorded"  # none, fixed, lognormal or recorded
+    value: float = 1.0  # Seconds, for the fixed distribution
+    mu: Optional[float] = None  # Log-normal parameters; fitted to the recordings if unset
+    sigma: Optional[float] = None
+    scale: float = 1.0  # Multiplier applied to every sampled latency
+
+
+class LLMReplayConfig(BaseModel):
+    """Configuration for the record/replay provider"""
+    mode: str = "replay"  # record or replay
+    target: str = "openai"  # Provider recorded from in record mode
+    cassette_dir: str = "storage/cassettes"
+    cassette: str = "default"
+    on_missing: str = "error"  # error, agent or any
+    seed: Optional[int] = None
+    latency: Optional[LLMReplayLatencyConfig] = None
+
+
+class LLMRoutingConfig(BaseModel):
+    """Configuration for routing calls between provider entries"""
+    enabled: bool = False
+    default: Optional[str] = None  # Defaults to llm.provider
+    backends: List[str] = Field(default_factory=list)  # Entries of llm.providers to route to
+    fallbacks: Dict[str, List[str]] = Field(default_factory=dict)  # Ordered fallbacks per backend
+    timeout: Optional[float] = None  # Seconds before a backend call counts as failed
+
+
+class LLMHedgingConfig(BaseModel):
+    """Configuration for hedged LLM requests"""
+    enabled: bool = False
+    percentile: float = 95  # Hedge calls slower than this latency percentile of their agent type
+    min_samples: int = 20  # Observed latencies needed before an agent type is hedged
+    window: int = 200  # Recent latencies kept per agent type
+    min_delay: float = 0.0  # Never hedge earlier than this many seconds
+    budget: float = 0.05  # Maximum extra calls as a fraction of all calls
+
+
+class LLMRetryConfig(BaseModel):
+    """Configuration for retrying failed LLM calls"""
+    enabled: bool = True
+    max_attempts: int = 3
+    initial_wait: float = 1.0  # Seconds before the first retry when the provider gives no Retry-After
+    max_wait: float = 30.0  # Cap on exponential backoff
+    max_retry_after: float = 60.0  # Give up instead of waiting longer than this
+
+
+class LLMCircuitBreakerConfig(BaseModel):
+    """Configuration for failing fast while a provider is down"""
+    enabled: bool = True
+    failure_threshold: int = 5  # Consecutive provider failures that open the circuit
+    reset_timeout: float = 30.0  # Seconds before a probe call is let through
 
 
 class LLMConfig(BaseModel):
@@ -42,6 +144,14 @@ class LLMConfig(BaseModel):
     system_prompts: Optional[SystemPrompts] = None
     system_prompt: Optional[str] = None
     providers: Optional[Dict[str, LLMProviderConfig]] = None
+    cache: Optional[LLMCacheConfig] = None
+    rate_limit: Optional[LLMRateLimitConfig] = None
+    coalesce: bool = True  # Share one call between identical in-flight requests
+    replay: Optional[LLMReplayConfig] = None
+    routing: Optional[LLMRoutingConfig] = None
+    hedging: Optional[LLMHedgingConfig] = None
+    retry: Optional[LLMRetryConfig] = None
+    circuit_breaker: Optional[LLMCircuitBreakerConfig] = None
 
 
 class RedisConfig(BaseModel):
@@ -55,10 +165,62 @@ class RedisConfig(BaseModel):
     enabled: bool = True
 
 
+class PipelineConfig(BaseModel):
+    """Configuration for agent pipeline execution"""
+    fan_out_concurrency: int = 4  # Pipeline instances run at once when generating several questions
+    checkpoints: bool = True  # Store step outputs so failed runs can be resumed
+    timeout: Optional[float] = 110.0  # Seconds a pipeline request may run before returning a partial result
+    agent_pool_size: int = 8  # Idle agent instances kept for reuse per agent type
+    speculative: bool = True  # Start steps with a speculate config early on predicted inputs
+
+
+class TracingConfig(BaseModel):
+    """Configuration for span tracing of pipeline executions"""
+    enabled: bool = False
+    format: str = "chrome"  # chrome (trace-event JSON) or otlp (OpenTelemetry JSON)
+    directory: str = "storage/traces"  # One file per traced pipeline run
+    endpoint: Optional[str] = None  # OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces
+    service_name: str = "abts-unified-generator"
+
+
+class JobsConfig(BaseModel):
+    """Configuration for the background job queue"""
+    workers: int = 2  # Jobs run concurrently by each process
+    broker: str = "redis"  # redis (shared by all processes) or memory (this process only)
+    max_attempts: int = 3
+    retry_delay: float = 5.0  # Delay before the first retry in seconds, doubled per attempt
+    timeout: Optional[float] = 900.0  # Time limit of one attempt in seconds
+    stale_after: float = 960.0  # Running jobs older than this are requeued at startup, their worker presumed gone
+    ttl: int = 86400  # Lifetime of job records in Redis in seconds
+    max_jobs: int = 1000  # Job records kept by the in-process broker
+    key_prefix: str = "jobs"
+
+
+class StateConfig(BaseModel):
+    """Configuration for agent state persistence"""
+    mode: str = "write_behind"  # write_behind (buffered) or write_through (every save commits)
+    flush_interval: Optional[float] = 5.0  # Seconds between flushes of long runs; None flushes at run end only
+    max_pending: int = 100  # Buffered states that trigger a flush
+
+
+class AdmissionConfig(BaseModel):
+    """Configuration for admission control of generation requests"""
+    enabled: bool = True
+    max_in_flight: int = 8  # Pipelines running at once per worker process
+    max_queue: int = 16  # Pipelines waiting for a slot; more are rejected with 429
+    max_queue_time: float = 10.0  # Longest wait for a slot in seconds
+    duration_smoothing: float = 0.2  # Weight of the newest request in the average duration
+
+
 class SettingsConfig(BaseModel):
     """Root configuration schema for settings.yml"""
     llm: LLMConfig
     redis: Optional[RedisConfig] = None
+    pipeline: Optional[PipelineConfig] = None
+    tracing: Optional[TracingConfig] = None
+    jobs: Optional[JobsConfig] = None
+    state: Optional[StateConfig] = None
+    admission: Optional[AdmissionConfig] = None
 
 
 class ToolParameter(BaseModel):
@@ -66,6 +228,7 @@ class ToolParameter(BaseModel):
     name: str
     description: str
     type: str
+    required: bool = True
 
 
 class ToolDefinition(BaseModel):
@@ -82,6 +245,11 @@ class AgentDefinition(BaseModel):
     model: str
     instructions: str
     tools: Optional[List[str]] = None
+    cache: bool = True  # Set to false to bypass the LLM response cache
+    provider: Optional[str] = None  # Entry of llm.providers to route this agent's calls to
+    hedge: bool = True  # Set to false to never send backup requests for this agent
+    max_tool_rounds: int = 3  # Model turns that may call tools before a final answer is forced
+    output_schema: Optional[Dict[str, Any]] = None  # JSON schema constraining the agent's output
 
 
 class AgentDefinitionsConfig(BaseModel):
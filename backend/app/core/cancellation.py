@@ -0,0 +1,74 @@
+"""
+Cancellation of request work when the client disconnects.
+
+Route handlers keep running after the client has gone away, so a closed
+browser tab would otherwise still pay for every remaining pipeline step.
+``cancel_on_disconnect`` runs the handler's work as a task next to a watcher
+that polls the connection; when the client disconnects the task is
+cancelled, which cancels the pipeline, its steps and their in-flight LLM
+calls, and the handler stops with ``ClientDisconnected``. Cleanup code in
+the cancelled work (``finally`` blocks recording checkpoints and flushing
+agent state) has finished by the time the exception is raised.
+"""
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+logger = logging.getLogger("app.core.cancellation")
+
+T = TypeVar("T")
+
+# Non-standard status code for requests closed by the client (as used by nginx)
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    """Raised when request work is cancelled because the client disconnected"""
+
+
+async def wait_for_disconnect(request: Request, poll_interval: float = 0.5) -> None:
+    """
+    Wait until the client of a request disconnects
+
+    Args:
+        request: Request to watch
+        poll_interval: Seconds between checks of the connection
+    """
+    while not await request.is_disconnected():
+        await asyncio.sleep(poll_interval)
+
+
+async def cancel_on_disconnect(
+    request: Request,
+    work: Awaitable[T],
+    poll_interval: float = 0.5
+) -> T:
+    """
+    Await work, cancelling it if the client disconnects first
+
+    Args:
+        request: Request the work is done for
+        work: Coroutine or future doing the work
+        poll_interval: Seconds between checks of the connection
+
+    Returns:
+        Result of the work
+
+    Raises:
+        ClientDisconnected: If the client disconnected before the work finished
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request, poll_interval))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            return task.result()
+        logger.info(f"Client disconnected from {request.method} {request.url.path}, cancelling its work")
+        raise ClientDisconnected(f"Client disconnected from {request.url.path}")
+    finally:
+        # Also runs when the handler itself is cancelled
+        for pending in (task, watcher):
+            pending.cancel()
+        await asyncio.gather(task, watcher, return_exceptions=True)
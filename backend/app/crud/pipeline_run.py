@@ -0,0 +1,87 @@
+from typing import List, Optional, Dict, Any
+from sqlalchemy.orm import Session
+
+from backend.app.crud.base import CRUDBase
+from backend.app.models.pipeline_run import PipelineRun, PipelineStepOutput
+from backend.app.schemas.pipeline_run import PipelineRunCreate, PipelineRunUpdate
+
+class CRUDPipelineRun(CRUDBase[PipelineRun, PipelineRunCreate, PipelineRunUpdate]):
+    """
+    CRUD operations for pipeline runs and their step outputs
+    """
+    def get_step_output(
+        self,
+        db: Session,
+        run_id: str,
+        step_name: str,
+        input_hash: str
+    ) -> Optional[PipelineStepOutput]:
+        """
+        Get the stored output of a step for a given input
+
+        Args:
+            db: Database session
+            run_id: Run ID
+            step_name: Pipeline step name
+            input_hash: Hash of the step's input
+
+        Returns:
+            Optional step output
+        """
+        return db.query(PipelineStepOutput).filter(
+            PipelineStepOutput.run_id == run_id,
+            PipelineStepOutput.step_name == step_name,
+            PipelineStepOutput.input_hash == input_hash
+        ).first()
+
+    def save_step_output(
+        self,
+        db: Session,
+        run_id: str,
+        step_name: str,
+        input_hash: str,
+        data: Dict[str, Any]
+    ) -> PipelineStepOutput:
+        """
+        Store the output of a completed step, replacing an output for the same input
+
+        Args:
+            db: Database session
+            run_id: Run ID
+            step_name: Pipeline step name
+            input_hash: Hash of the step's input
+            data: Column values (agent_id, agent_name, text, output_data,
+                response_metadata, elapsed_time)
+
+        Returns:
+            Stored step output
+        """
+        db_obj = self.get_step_output(db, run_id, step_name, input_hash)
+        if db_obj is None:
+            db_obj = PipelineStepOutput(run_id=run_id, step_name=step_name, input_hash=input_hash)
+        for field, value in data.items():
+            setattr(db_obj, field, value)
+
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def list_step_outputs(self, db: Session, run_id: str) -> List[PipelineStepOutput]:
+        """
+        List the stored step outputs of a run
+
+        Args:
+            db: Database session
+            run_id: Run ID
+
+        Returns:
+            List of step outputs, oldest first
+        """
+        return db.query(PipelineStepOutput).filter(
+            PipelineStepOutput.run_id == run_id
+        ).order_by(PipelineStepOutput.created_at).all()
+
+
+# Create CRUD instance
+pipeline_run = CRUDPipelineRun(PipelineRun)
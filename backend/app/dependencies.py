@@ -1,9 +1,13 @@
 """
 Dependencies for FastAPI
 """
-from typing import Generator
+from typing import AsyncIterator, Generator
 import logging
+import time
 
+from fastapi import HTTPException, status
+
+from backend.app.services.admission import Overloaded, get_admission_controller
 from backend.app.services.question_templates import QuestionTemplateService
 from backend.app.services.outlines import OutlineService
 
@@ -42,4 +46,38 @@ def get_outline_service() -> OutlineService:
         logger.info("Creating OutlineService instance")
         _outline_service = OutlineService()
     
-    return _outline_service 
\ No newline at end of file
+    return _outline_service
+
+def too_many_requests(error: Overloaded) -> HTTPException:
+    """
+    Convert an admission rejection to a 429 response
+    
+    Args:
+        error: Rejection raised by the admission controller
+        
+    Returns:
+        HTTPException with a Retry-After header
+    """
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+async def admit_generation() -> AsyncIterator[None]:
+    """
+    Hold a generation slot of the admission controller for the request
+    
+    Raises:
+        HTTPException: 429 if the request is not admitted
+    """
+    controller = get_admission_controller()
+    try:
+        await controller.acquire()
+    except Overloaded as e:
+        raise too_many_requests(e)
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        controller.release(time.monotonic() - start)
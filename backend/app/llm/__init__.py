@@ -1 +1,17 @@
-from backend.app.llm.provider import get_llm_provider, LLMProvider, OpenAIProvider 
\ No newline at end of file
+from backend.app.llm.provider import (
+    get_llm_provider,
+    create_llm_provider,
+    LLMProvider,
+    LLMProviderWrapper,
+    AgentLLMProvider,
+    OpenAIProvider
+)
+from backend.app.llm.cache import CachedLLMProvider
+from backend.app.llm.rate_limit import RateLimitedLLMProvider
+from backend.app.llm.coalescing import CoalescingLLMProvider
+from backend.app.llm.replay import ReplayProvider
+from backend.app.llm.router import RouterLLMProvider
+from backend.app.llm.hedging import HedgedLLMProvider
+from backend.app.llm.resilience import RetryingLLMProvider, CircuitBreakerLLMProvider
+from backend.app.llm.local import LocalLLMProvider
+from backend.app.llm.structured import SchemaValidator, compile_schema
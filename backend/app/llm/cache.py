@@ -0,0 +1,316 @@
+"""
+Content-addressed response cache for LLM providers.
+
+Requests are hashed after the wrapped provider has resolved its defaults, so
+two calls that would send byte-identical API requests share a cache entry.
+Entries live in an in-process LRU and, optionally, in Redis so that they are
+shared between workers.
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from backend.app.db.cache import get_redis, get_cache_key
+from backend.app.llm.provider import LLMProvider, LLMProviderWrapper
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# Keys of a provider result that are stored in the cache; the raw SDK
+# response object is dropped because it is neither small nor serializable
+CACHED_RESULT_KEYS = ("text", "model", "tool_calls")
+
+
+def make_request_key(description: Dict[str, Any], kind: str = "generate") -> str:
+    """
+    Hash a resolved request description into a cache key
+
+    Args:
+        description: Output of ``LLMProvider.describe_request``
+        kind: Type of call (``generate`` or ``generate_with_tools``)
+
+    Returns:
+        Hex digest identifying the request
+    """
+    payload = json.dumps({"kind": kind, "request": description}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _serialize_tool_calls(tool_calls: List[Any]) -> List[Dict[str, Any]]:
+    """Convert SDK tool call objects into plain dictionaries"""
+    serialized = []
+    for call in tool_calls or []:
+        if hasattr(call, "model_dump"):
+            serialized.append(call.model_dump())
+        elif isinstance(call, dict):
+            serialized.append(call)
+        else:
+            serialized.append({"value": str(call)})
+    return serialized
+
+
+class LLMResponseCache:
+    """
+    In-process LRU cache with TTL and size eviction
+    """
+    def __init__(self, max_entries: int = 1024, ttl: int = 86400):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of entries kept in memory
+            ttl: Time to live of an entry in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get an entry, refreshing its LRU position
+
+        Args:
+            key: Request key
+
+        Returns:
+            Cached result or None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        """
+        Store an entry, evicting the least recently used entries if full
+
+        Args:
+            key: Request key
+            value: Result to cache
+            ttl: Optional TTL override in seconds
+        """
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CachedLLMProvider(LLMProviderWrapper):
+    """
+    Provider wrapper that serves repeated requests from a cache
+
+    Only successful responses are cached. Agents opt out by passing the
+    ``cache=False`` call option, which ``AgentFactory`` sets for agents with
+    ``cache: false`` in agent_definitions.yml.
+    """
+    def __init__(self, inner: LLMProvider, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize cached provider
+
+        Args:
+            inner: Provider to cache
+            config: Cache configuration (``llm.cache`` in settings.yml)
+        """
+        super().__init__(inner)
+        config = config or {}
+        self.ttl = config.get("ttl", 86400)
+        self.max_temperature = config.get("max_temperature", 0.0)
+        self.use_redis = config.get("redis", True)
+        self.redis_retry_interval = config.get("redis_retry_interval", 60)
+        self.key_prefix = config.get("key_prefix", "llm")
+        self.local = LLMResponseCache(
+            max_entries=config.get("max_entries", 1024),
+            ttl=self.ttl
+        )
+
+        self._redis_disabled_until = 0.0
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+        logger.info(
+            f"Initialized LLM response cache (max_entries={self.local.max_entries}, "
+            f"ttl={self.ttl}s, redis={self.use_redis})"
+        )
+
+    def _is_cacheable(self, description: Dict[str, Any], call_options: Dict[str, Any]) -> bool:
+        """Check whether a request may be served from or stored in the cache"""
+        if call_options.get("cache") is False:
+            return False
+        temperature = description.get("temperature")
+        if temperature is not None and self.max_temperature is not None:
+            return temperature <= self.max_temperature
+        return True
+
+    def _redis_available(self) -> bool:
+        return self.use_redis and time.monotonic() >= self._redis_disabled_until
+
+    def _disable_redis(self, error: Exception) -> None:
+        """Stop using Redis for a while after an error instead of failing every call"""
+        logger.warning(f"LLM cache Redis tier unavailable, retrying in {self.redis_retry_interval}s: {str(error)}")
+        self._redis_disabled_until = time.monotonic() + self.redis_retry_interval
+
+    async def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a key in memory, then in Redis"""
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self._redis_available():
+            try:
+                raw = await get_redis().get(get_cache_key(self.key_prefix, key))
+            except Exception as e:
+                self._disable_redis(e)
+                raw = None
+
+            if raw is not None:
+                try:
+                    value = json.loads(raw)
+                except json.JSONDecodeError:
+                    logger.warning(f"Failed to decode cached LLM response: {key[:8]}")
+                else:
+                    self.local.set(key, value)
+                    self.hits += 1
+                    self.redis_hits += 1
+                    return value
+
+        self.misses += 1
+        return None
+
+    async def _store(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a successful result in memory and Redis"""
+        value = {k: result[k] for k in CACHED_RESULT_KEYS if k in result}
+        if "tool_calls" in value:
+            value["tool_calls"] = _serialize_tool_calls(value["tool_calls"])
+
+        self.local.set(key, value)
+
+        if self._redis_available():
+            try:
+                await get_redis().set(
+                    get_cache_key(self.key_prefix, key),
+                    json.dumps(value, default=str),
+                    ex=self.ttl
+                )
+            except Exception as e:
+                self._disable_redis(e)
+
+    @staticmethod
+    def _hit_result(value: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        return {
+            **value,
+            "elapsed_time": time.time() - start_time,
+            "success": True,
+            "cached": True,
+        }
+
+    async def _cached_call(self, kind: str, call, prompt: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Serve a call from cache or forward it and cache the result"""
+        start_time = time.time()
+        call_options = {k: kwargs[k] for k in ("cache",) if k in kwargs}
+        description = self.inner.describe_request(prompt, **kwargs)
+
+        if not self._is_cacheable(description, call_options):
+            self.bypassed += 1
+            return await call()
+
+        key = make_request_key(description, kind)
+        value = await self._lookup(key)
+        if value is not None:
+            logger.debug(f"LLM cache hit: {key[:8]}")
+            on_token = kwargs.get("on_token")
+            if on_token is not None and value.get("text"):
+                await on_token(value["text"])
+            return self._hit_result(value, start_time)
+
+        result = await call()
+        if result.get("success"):
+            await self._store(key, result)
+        return result
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        return await self._cached_call(
+            "generate",
+            lambda: self.inner.generate(prompt, **kwargs),
+            prompt,
+            kwargs
+        )
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self._cached_call(
+            "generate_with_tools",
+            lambda: self.inner.generate_with_tools(prompt, tools, **kwargs),
+            prompt,
+            {**kwargs, "tools": tools}
+        )
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream a cached response as one chunk, or stream and cache a new one"""
+        call_options = {k: kwargs[k] for k in ("cache",) if k in kwargs}
+        description = self.inner.describe_request(prompt, **kwargs)
+
+        if not self._is_cacheable(description, call_options):
+            self.bypassed += 1
+            async for chunk in self.inner.generate_stream(prompt, **kwargs):
+                yield chunk
+            return
+
+        key = make_request_key(description, "generate")
+        value = await self._lookup(key)
+        if value is not None:
+            if value.get("text"):
+                yield value["text"]
+            return
+
+        chunks = []
+        async for chunk in self.inner.generate_stream(prompt, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        await self._store(key, {"text": "".join(chunks), "model": self.model})
+
+    def clear(self) -> None:
+        """Clear the in-process cache"""
+        self.local.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters merged with the wrapped provider's stats"""
+        lookups = self.hits + self.misses
+        return {
+            **self.inner.get_stats(),
+            "cache": {
+                "hits": self.hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self.local),
+                "max_entries": self.local.max_entries,
+                "evictions": self.local.evictions,
+                "expirations": self.local.expirations,
+            },
+        }
@@ -0,0 +1,116 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests.
+
+While a request is in flight, identical requests (same resolved API request)
+await the same call instead of issuing their own. Unlike the response cache
+nothing is kept once the call completes, so this needs no storage.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.app.llm.cache import make_request_key
+from backend.app.llm.provider import LLMProvider, LLMProviderWrapper
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+class _InFlight:
+    """A shared call and the number of callers waiting on it"""
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class CoalescingLLMProvider(LLMProviderWrapper):
+    """
+    Provider wrapper that shares one call between identical concurrent requests
+
+    Callers opt out with the ``coalesce=False`` call option. If every caller
+    of a shared call is cancelled the call itself is cancelled.
+    """
+    def __init__(self, inner: LLMProvider):
+        """
+        Initialize coalescing provider
+
+        Args:
+            inner: Provider to coalesce calls to
+        """
+        super().__init__(inner)
+        self._in_flight: Dict[str, _InFlight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def _single_flight(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[Dict[str, Any]]],
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Join the in-flight call for `key`, starting it if there is none"""
+        entry = self._in_flight.get(key)
+        follower = entry is not None
+
+        if follower:
+            self.coalesced += 1
+            logger.debug(f"Coalesced LLM request onto in-flight call: {key[:8]}")
+        else:
+            self.leaders += 1
+            entry = _InFlight(asyncio.ensure_future(call()))
+            self._in_flight[key] = entry
+            entry.task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        start_time = time.time()
+        entry.waiters += 1
+        try:
+            result = await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            if entry.waiters == 1 and not entry.task.done():
+                entry.task.cancel()
+            raise
+        finally:
+            entry.waiters -= 1
+
+        if follower:
+            # The leader's callback got the tokens; followers get the whole text
+            if on_token is not None and result.get("success") and result.get("text"):
+                await on_token(result["text"])
+            result = {**result, "elapsed_time": time.time() - start_time, "coalesced": True}
+        return result
+
+    def _key(self, kind: str, prompt: str, kwargs: Dict[str, Any]) -> Optional[str]:
+        if kwargs.get("coalesce") is False:
+            return None
+        return make_request_key(self.inner.describe_request(prompt, **kwargs), kind)
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        key = self._key("generate", prompt, kwargs)
+        if key is None:
+            return await self.inner.generate(prompt, **kwargs)
+        return await self._single_flight(
+            key,
+            lambda: self.inner.generate(prompt, **kwargs),
+            kwargs.get("on_token")
+        )
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        key = self._key("generate_with_tools", prompt, {**kwargs, "tools": tools})
+        if key is None:
+            return await self.inner.generate_with_tools(prompt, tools, **kwargs)
+        return await self._single_flight(
+            key,
+            lambda: self.inner.generate_with_tools(prompt, tools, **kwargs)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters merged with the wrapped provider's stats"""
+        return {
+            **self.inner.get_stats(),
+            "coalescing": {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight),
+            },
+        }
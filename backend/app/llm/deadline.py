@@ -0,0 +1,83 @@
+"""
+Request deadlines for LLM calls.
+
+A deadline is an absolute time (``time.time()`` timestamp) by which the
+work started for a request must be finished. It is set for a block of code
+with ``deadline_scope`` and follows the asyncio context into tasks started
+from that block, so every provider layer can read it without threading it
+through call arguments: API calls use the remaining time as their HTTP
+timeout, retries stop once it has passed, and calls made after it fail
+immediately instead of spending tokens on a response nobody waits for.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_current_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an LLM call is attempted after the request deadline"""
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    Apply a deadline to the LLM calls made inside the block
+
+    Nested scopes can only shorten the deadline, never extend it.
+
+    Args:
+        deadline: Absolute deadline as a ``time.time()`` timestamp, or None
+            to keep the current one
+
+    Yields:
+        The deadline in effect inside the block
+    """
+    current = _current_deadline.get()
+    if deadline is None or (current is not None and current <= deadline):
+        effective = current
+    else:
+        effective = deadline
+    token = _current_deadline.set(effective)
+    try:
+        yield effective
+    finally:
+        _current_deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """Get the deadline of the current context, if any"""
+    return _current_deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """
+    Get the time left before the current deadline
+
+    Returns:
+        Seconds left (negative once passed), or None without a deadline
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def request_timeout() -> Optional[float]:
+    """
+    Get the HTTP timeout for an API call made now
+
+    Returns:
+        Seconds left before the deadline, or None without a deadline
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return None
+    if remaining <= 0:
+        raise DeadlineExceeded(f"Request deadline passed {-remaining:.2f}s ago")
+    return remaining
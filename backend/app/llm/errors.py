@@ -0,0 +1,157 @@
+"""
+Classification of LLM provider errors.
+
+Providers report failures as results with ``success: False``. The fields
+added by ``describe_error`` tell the retry and circuit breaker layers what
+kind of failure it was, whether retrying can help and how long the
+provider asked us to wait.
+"""
+import asyncio
+import re
+import time
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Any, Dict, Optional
+
+import openai
+
+from backend.app.llm.deadline import DeadlineExceeded
+
+
+class LLMErrorType(str, Enum):
+    """Kinds of LLM call failures"""
+    RATE_LIMIT = "rate_limit"
+    SERVER = "server"
+    TIMEOUT = "timeout"
+    CONNECTION = "connection"
+    AUTHENTICATION = "authentication"
+    CONTEXT_LENGTH = "context_length"
+    INVALID_REQUEST = "invalid_request"
+    CIRCUIT_OPEN = "circuit_open"
+    DEADLINE = "deadline"  # The request deadline passed; retrying cannot help
+    UNKNOWN = "unknown"
+
+
+# Failures that may succeed when the same request is sent again
+RETRYABLE_ERRORS = {
+    LLMErrorType.RATE_LIMIT,
+    LLMErrorType.SERVER,
+    LLMErrorType.TIMEOUT,
+    LLMErrorType.CONNECTION,
+}
+
+# Failures that say something about the provider rather than the request
+PROVIDER_ERRORS = RETRYABLE_ERRORS | {LLMErrorType.AUTHENTICATION}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """
+    Parse a rate-limit reset duration such as ``"20ms"``, ``"1.5s"`` or ``"6m0s"``
+
+    Args:
+        value: Header value
+
+    Returns:
+        Seconds, or None if the value is not a duration
+    """
+    parts = _DURATION_PART.findall(value or "")
+    if not parts or "".join(n + u for n, u in parts) != value.strip():
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """
+    Read how long the provider asked us to wait before retrying
+
+    Checks ``retry-after-ms``, ``retry-after`` (seconds or an HTTP date) and
+    OpenAI's ``x-ratelimit-reset-*`` headers, in that order.
+
+    Args:
+        headers: Response headers
+
+    Returns:
+        Seconds to wait, or None if the response does not say
+    """
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000.0)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    resets = [
+        parse_duration(headers.get(name, ""))
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def classify_error(error: BaseException) -> LLMErrorType:
+    """
+    Classify an exception raised by a provider client
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        Error type
+    """
+    if isinstance(error, DeadlineExceeded):
+        return LLMErrorType.DEADLINE
+    if isinstance(error, (openai.APITimeoutError, asyncio.TimeoutError, TimeoutError)):
+        return LLMErrorType.TIMEOUT
+    if isinstance(error, (openai.APIConnectionError, ConnectionError)):
+        return LLMErrorType.CONNECTION
+
+    status_code = getattr(error, "status_code", None)
+    if status_code == 429:
+        return LLMErrorType.RATE_LIMIT
+    if status_code in (401, 403):
+        return LLMErrorType.AUTHENTICATION
+    if status_code in (408, 409) or (status_code is not None and status_code >= 500):
+        return LLMErrorType.SERVER
+    if status_code is not None and 400 <= status_code < 500:
+        if getattr(error, "code", None) == "context_length_exceeded":
+            return LLMErrorType.CONTEXT_LENGTH
+        return LLMErrorType.INVALID_REQUEST
+    return LLMErrorType.UNKNOWN
+
+
+def describe_error(error: BaseException) -> Dict[str, Any]:
+    """
+    Build the error fields of a failed result
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        Dictionary with ``error``, ``error_type``, ``retryable``,
+        ``retry_after`` and ``status_code``
+    """
+    error_type = classify_error(error)
+    response = getattr(error, "response", None)
+    return {
+        "error": str(error),
+        "error_type": error_type.value,
+        "retryable": error_type in RETRYABLE_ERRORS,
+        "retry_after": parse_retry_after(getattr(response, "headers", None)),
+        "status_code": getattr(error, "status_code", None),
+    }
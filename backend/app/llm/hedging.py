@@ -0,0 +1,181 @@
+"""
+Hedged LLM requests.
+
+Pipeline latency is the sum of its sequential LLM calls, so a single slow
+completion dominates the tail. When a call has not returned after a high
+percentile of the latencies recently observed for its agent type, a
+duplicate request is sent; whichever finishes first wins and the other is
+cancelled. Hedges are capped at a fraction of all calls.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from backend.app.llm.provider import LLMProvider, LLMProviderWrapper
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile
+
+    Args:
+        values: Observed values (not necessarily sorted)
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile value
+    """
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class HedgedLLMProvider(LLMProviderWrapper):
+    """
+    Provider wrapper sending a backup request for slow calls
+
+    Callers opt out with the ``hedge=False`` call option. Streamed calls
+    and calls with an ``on_token`` callback are never hedged, since both
+    requests would emit tokens.
+    """
+    def __init__(self, inner: LLMProvider, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize hedged provider
+
+        Args:
+            inner: Provider to hedge calls to
+            config: Hedging configuration (``llm.hedging`` in settings.yml)
+        """
+        super().__init__(inner)
+        config = config or {}
+        self.percentile = config.get("percentile", 95)
+        self.min_samples = config.get("min_samples", 20)
+        self.min_delay = config.get("min_delay", 0.0)
+        self.budget = config.get("budget", 0.05)
+        window = config.get("window", 200)
+
+        self._latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.budget_exhausted = 0
+
+        logger.info(f"Initialized LLM hedging at p{self.percentile} with a {self.budget:.0%} budget")
+
+    def hedge_delay(self, agent_type: Optional[str]) -> Optional[float]:
+        """
+        Get the delay after which a call of this agent type is hedged
+
+        Args:
+            agent_type: Agent type making the call
+
+        Returns:
+            Delay in seconds, or None while too few latencies are known
+        """
+        latencies = self._latencies[agent_type or ""]
+        if len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, percentile(list(latencies), self.percentile))
+
+    def _within_budget(self) -> bool:
+        return self.hedged + 1 <= self.budget * self.calls
+
+    async def _hedged(
+        self,
+        kwargs: Dict[str, Any],
+        call: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Run a call, sending a duplicate if it is slower than the hedge delay"""
+        agent_type = kwargs.get("agent_type")
+        self.calls += 1
+        start_time = time.monotonic()
+
+        delay = None
+        if kwargs.get("hedge") is not False and kwargs.get("on_token") is None:
+            delay = self.hedge_delay(agent_type)
+
+        if delay is None:
+            result = await call()
+            if result.get("success"):
+                self._latencies[agent_type or ""].append(time.monotonic() - start_time)
+            return result
+
+        primary = asyncio.ensure_future(call())
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                result = primary.result()
+            elif not self._within_budget():
+                self.budget_exhausted += 1
+                result = await primary
+            else:
+                self.hedged += 1
+                logger.debug(f"Hedging {agent_type or 'unknown'} LLM call after {delay:.2f}s")
+                hedge = asyncio.ensure_future(call())
+                pending = {primary, hedge}
+                winner, result = await self._first_success(pending)
+                if winner is hedge:
+                    self.hedge_wins += 1
+                    result = {**result, "hedged": True}
+                else:
+                    self.primary_wins += 1
+        finally:
+            # Cancel the loser (or both calls if we were cancelled)
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+        if result.get("success"):
+            self._latencies[agent_type or ""].append(time.monotonic() - start_time)
+        return result
+
+    @staticmethod
+    async def _first_success(pending: Set[asyncio.Future]) -> Tuple[Optional[asyncio.Future], Dict[str, Any]]:
+        """
+        Wait for the first successful call, or the last failure
+
+        Finished calls are removed from ``pending``.
+
+        Returns:
+            Tuple of (winning task, its result)
+        """
+        winner, result = None, {}
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.difference_update(done)
+            for task in done:
+                winner, result = task, task.result()
+                if result.get("success"):
+                    return winner, result
+        return winner, result
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        return await self._hedged(kwargs, lambda: self.inner.generate(prompt, **kwargs))
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self._hedged(kwargs, lambda: self.inner.generate_with_tools(prompt, tools, **kwargs))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedging counters merged with the wrapped provider's stats"""
+        return {
+            **self.inner.get_stats(),
+            "hedging": {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "primary_wins": self.primary_wins,
+                "budget_exhausted": self.budget_exhausted,
+                "delays": {
+                    agent_type or "unknown": self.hedge_delay(agent_type)
+                    for agent_type in list(self._latencies)
+                },
+            },
+        }
@@ -0,0 +1,244 @@
+"""
+Provider for local OpenAI-compatible servers (Ollama, vLLM, llama.cpp, ...).
+
+Requests go through a single pooled async client pointed at the server's
+``base_url``, with a cap on concurrent requests so a single GPU is not
+oversubscribed. Optionally, concurrent prompts with identical sampling
+parameters are micro-batched into one ``/completions`` request with a list
+of prompts, which servers with continuous batching (vLLM) process far more
+efficiently than separate requests.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from backend.app.llm.deadline import DeadlineExceeded, get_deadline, request_timeout
+from backend.app.llm.errors import describe_error
+from backend.app.llm.provider import OpenAIProvider
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prompts and sends them as one completions request
+
+    Prompts are grouped by their resolved sampling parameters. A group is
+    sent when it reaches ``max_batch_size`` or ``window_ms`` after its first
+    prompt arrived, whichever comes first. A batch request times out at the
+    latest deadline of its callers, and each caller stops waiting at its own.
+    """
+    def __init__(self, provider: "LocalLLMProvider", config: Dict[str, Any]):
+        """
+        Initialize batcher
+
+        Args:
+            provider: Provider whose client and concurrency limit are used
+            config: Batching configuration
+        """
+        self.provider = provider
+        self.max_batch_size = config.get("max_batch_size", 8)
+        self.window = config.get("window_ms", 10) / 1000.0
+        self.prompt_template = config.get("prompt_template", "{system}\n\n{prompt}")
+
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future, Optional[float]]]] = {}
+        self._params: Dict[str, Dict[str, Any]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self.batches = 0
+        self.batched_requests = 0
+
+    def _render(self, messages: List[Dict[str, Any]]) -> str:
+        """Render chat messages as a single completion prompt"""
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        prompt = "\n\n".join(m["content"] for m in messages if m["role"] != "system")
+        if not system:
+            return prompt
+        return self.prompt_template.format(system=system, prompt=prompt)
+
+    async def submit(self, prompt: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add a prompt to the next batch and wait for its result
+
+        Args:
+            prompt: User prompt
+            kwargs: Generation arguments
+
+        Returns:
+            Response in the same shape as ``generate``
+        """
+        start_time = time.time()
+        request = self.provider._build_request(prompt, **kwargs)
+        try:
+            timeout = request_timeout()
+        except DeadlineExceeded as e:
+            return self._failure(e, request, start_time)
+        text = self._render(request.pop("messages"))
+        if "max_completion_tokens" in request:
+            request["max_tokens"] = request.pop("max_completion_tokens")
+        key = json.dumps(request, sort_keys=True, default=str)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((text, future, get_deadline()))
+        self._params[key] = request
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            error = DeadlineExceeded(f"Request deadline passed while waiting for a batch of {self.provider.base_url}")
+            return self._failure(error, request, start_time)
+
+    @staticmethod
+    def _failure(error: Exception, params: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        """Result of a prompt whose batch failed"""
+        return {
+            "text": f"Error: {str(error)}",
+            "model": params.get("model"),
+            "elapsed_time": time.time() - start_time,
+            **describe_error(error),
+            "success": False,
+        }
+
+    def _flush(self, key: str) -> None:
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(key, [])
+        params = self._params.pop(key, {})
+        if batch:
+            asyncio.ensure_future(self._send(batch, params))
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future, Optional[float]]], params: Dict[str, Any]) -> None:
+        """Send one batch and resolve its callers' futures"""
+        start_time = time.time()
+        self.batches += 1
+        self.batched_requests += len(batch)
+
+        # Nobody waits for the batch after its callers' last deadline
+        deadlines = [deadline for _, _, deadline in batch]
+        deadline = None if None in deadlines else max(deadlines)
+
+        try:
+            async with self.provider._semaphore:
+                timeout_option = {}
+                if deadline is not None:
+                    timeout = deadline - time.time()
+                    if timeout <= 0:
+                        raise DeadlineExceeded(f"Request deadline passed {-timeout:.2f}s ago")
+                    timeout_option = {"timeout": timeout}
+                response = await self.provider.client.completions.create(
+                    prompt=[text for text, _, _ in batch],
+                    **params,
+                    **timeout_option
+                )
+        except Exception as e:
+            logger.error(f"Error generating batch of {len(batch)} with {self.provider.base_url}: {str(e)}")
+            failure = self._failure(e, params, start_time)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_result(dict(failure))
+            return
+
+        texts = {choice.index: choice.text for choice in response.choices}
+        usage = getattr(response, "usage", None)
+        elapsed_time = time.time() - start_time
+        for index, (_, future, _) in enumerate(batch):
+            if future.done():
+                continue
+            future.set_result({
+                "text": texts.get(index, ""),
+                "model": params.get("model"),
+                "elapsed_time": elapsed_time,
+                # The server reports usage for the whole batch; split it evenly
+                "usage": {
+                    "prompt_tokens": (getattr(usage, "prompt_tokens", 0) or 0) // len(batch),
+                    "completion_tokens": (getattr(usage, "completion_tokens", 0) or 0) // len(batch),
+                    "cached_tokens": 0,
+                    "total_tokens": (getattr(usage, "total_tokens", 0) or 0) // len(batch),
+                } if usage else None,
+                "batch_size": len(batch),
+                "success": True,
+            })
+
+
+class LocalLLMProvider(OpenAIProvider):
+    """
+    Provider for a local OpenAI-compatible HTTP server
+
+    No API key is needed; requests are limited to ``max_concurrency`` at a
+    time and, if ``batching.enabled``, plain generations are micro-batched.
+    """
+    metered = False
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize local provider with config
+
+        Args:
+            config: Provider configuration with ``base_url``
+        """
+        self.base_url = config.get("base_url") or os.environ.get("LOCAL_LLM_BASE_URL", "http://localhost:11434/v1")
+        super().__init__({**config, "openai_api_key": config.get("api_key") or "local"})
+
+        self.max_concurrency = config.get("max_concurrency", 4)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        batching = config.get("batching") or {}
+        self.batcher = MicroBatcher(self, batching) if batching.get("enabled", False) else None
+
+    def _create_client(self, config: Dict[str, Any]) -> AsyncOpenAI:
+        """Create a client for the local server; its connection pool is reused by all calls"""
+        return AsyncOpenAI(
+            base_url=self.base_url,
+            api_key=self.api_key,
+            max_retries=config.get("sdk_max_retries", 0),
+            timeout=config.get("timeout", 600.0)
+        )
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Generate text, batching with concurrent calls if enabled"""
+        if kwargs.get("on_token") is not None:
+            # Streams take their own concurrency slot in generate_stream
+            return await super().generate(prompt, **kwargs)
+
+        # The completions endpoint used for batches takes no response format
+        if self.batcher is not None and not kwargs.get("response_schema"):
+            return await self.batcher.submit(prompt, kwargs)
+
+        async with self._semaphore:
+            return await super().generate(prompt, **kwargs)
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        async with self._semaphore:
+            return await super().generate_with_tools(prompt, tools, **kwargs)
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        async with self._semaphore:
+            async for chunk in super().generate_stream(prompt, **kwargs):
+                yield chunk
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get concurrency and batching counters"""
+        stats = {
+            "base_url": self.base_url,
+            "max_concurrency": self.max_concurrency,
+        }
+        if self.batcher is not None:
+            stats.update({
+                "batches": self.batcher.batches,
+                "batched_requests": self.batcher.batched_requests,
+                "avg_batch_size": self.batcher.batched_requests / self.batcher.batches if self.batcher.batches else 0.0,
+            })
+        return {"local": stats}
@@ -1,22 +1,66 @@
 import os
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, AsyncIterator, Callable, Awaitable
 from functools import lru_cache
 import time
 from openai import OpenAI, AsyncOpenAI
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 from backend.app.config import get_settings
+from backend.app.llm.deadline import request_timeout
+from backend.app.llm.errors import describe_error
+from backend.app.llm.structured import apply_schema, compile_schema, json_schema_response_format
+from backend.app.llm.tracing import span
+from backend.app.llm.usage import extract_usage, record_usage
 
 # Setup logger
 logger = logging.getLogger(__name__)
 
+# Keyword arguments that steer the provider layer itself (caching, routing, ...)
+# and must never be forwarded to the underlying API client
+CALL_OPTION_KEYS = ("agent_type", "cache", "coalesce", "hedge", "on_token", "on_usage", "route")
+
+# Async callback receiving each text chunk of a streamed generation
+TokenCallback = Callable[[str], Awaitable[None]]
+
+
+def split_call_options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Remove provider-layer call options from request kwargs
+    
+    Args:
+        kwargs: Keyword arguments passed to generate; modified in place
+        
+    Returns:
+        The call options that were removed
+    """
+    return {key: kwargs.pop(key) for key in CALL_OPTION_KEYS if key in kwargs}
+
+
+def trace_result(current: Any, result: Dict[str, Any]) -> None:
+    """
+    Record the outcome of an LLM call on its trace span
+    
+    Args:
+        current: Span of the call
+        result: Result returned by a provider
+    """
+    current.set_attributes(
+        model=result.get("model"),
+        success=result.get("success", False),
+        cache_hit=bool(result.get("cached") or result.get("coalesced")),
+        error_type=result.get("error_type"),
+        **(result.get("usage") or {})
+    )
+
 
 class LLMProvider(ABC):
     """
     Abstract base class for LLM providers
     """
+    # Whether calls count against a hosted API's request/token quotas
+    metered = True
+    
     @abstractmethod
     async def generate(
         self, 
@@ -64,6 +108,218 @@ class LLMProvider(ABC):
             Response with text, tool calls, and metadata
         """
         pass
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Generate text from prompt, yielding chunks as they arrive
+        
+        The default implementation yields the complete text of ``generate``
+        as a single chunk; providers with native streaming override it.
+        
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            temperature: Optional temperature override
+            max_tokens: Optional max tokens override
+            
+        Yields:
+            Text chunks
+            
+        Raises:
+            RuntimeError: If generation fails
+        """
+        result = await self.generate(
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        if not result.get("success"):
+            raise RuntimeError(result.get("error", "Unknown error"))
+        on_usage = kwargs.get("on_usage")
+        if result.get("usage") and on_usage is not None:
+            on_usage(result["usage"])
+        if result.get("text"):
+            yield result["text"]
+    
+    async def _generate_from_stream(self, on_token: TokenCallback, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Run ``generate_stream``, forwarding chunks to a callback
+        
+        Args:
+            on_token: Callback receiving each chunk
+            prompt: User prompt
+            **kwargs: Arguments for ``generate_stream``
+            
+        Returns:
+            Response in the same shape as ``generate``
+        """
+        start_time = time.time()
+        model = getattr(self, "model", "unknown")
+        chunks = []
+        usage = {}
+        
+        try:
+            async for chunk in self.generate_stream(prompt, on_usage=usage.update, **kwargs):
+                chunks.append(chunk)
+                await on_token(chunk)
+        except Exception as e:
+            logger.error(f"Error streaming text: {str(e)}")
+            return {
+                "text": f"Error: {str(e)}",
+                "model": model,
+                "elapsed_time": time.time() - start_time,
+                **describe_error(e),
+                "success": False,
+            }
+        
+        return {
+            "text": "".join(chunks),
+            "model": model,
+            "elapsed_time": time.time() - start_time,
+            "usage": usage or None,
+            "streamed": True,
+            "success": True,
+        }
+    
+    def describe_request(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Describe the request that would be sent for these arguments
+        
+        Providers override this to resolve their defaults (model, sampling
+        params, system prompt) so that two calls producing the same API
+        request produce the same description.
+        
+        Returns:
+            JSON-serializable description of the request
+        """
+        split_call_options(kwargs)
+        return {
+            "provider": self.__class__.__name__,
+            "prompt": prompt,
+            "system_prompt": system_prompt,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            **kwargs,
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get runtime statistics for this provider
+        
+        Returns:
+            Dictionary of counters, keyed by provider layer
+        """
+        return {}
+
+
+class LLMProviderWrapper(LLMProvider):
+    """
+    Base class for providers that add behaviour around another provider
+    
+    Subclasses override the methods they care about; everything else is
+    delegated to the wrapped provider.
+    """
+    def __init__(self, inner: LLMProvider):
+        """
+        Initialize wrapper
+        
+        Args:
+            inner: Provider to delegate to
+        """
+        self.inner = inner
+    
+    @property
+    def model(self) -> str:
+        """Model of the wrapped provider"""
+        return getattr(self.inner, "model", "unknown")
+    
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        return await self.inner.generate(prompt, **kwargs)
+    
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self.inner.generate_with_tools(prompt, tools, **kwargs)
+    
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        async for chunk in self.inner.generate_stream(prompt, **kwargs):
+            yield chunk
+    
+    def describe_request(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        return self.inner.describe_request(prompt, **kwargs)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return self.inner.get_stats()
+
+
+class AgentLLMProvider(LLMProviderWrapper):
+    """
+    View of a shared provider bound to a single agent
+    
+    Injects per-agent call options (agent type, cache opt-out, ...) into every
+    call so that agent implementations can keep calling ``generate`` with
+    just their prompts. With a ``response_schema``, generations are
+    schema-constrained and their validated JSON is returned as ``parsed``.
+    """
+    def __init__(self, inner: LLMProvider, **call_options):
+        """
+        Initialize agent view
+        
+        Args:
+            inner: Shared provider
+            **call_options: Default call options for this agent
+        """
+        super().__init__(inner)
+        self.call_options = {k: v for k, v in call_options.items() if v is not None}
+        
+        schema = self.call_options.get("response_schema")
+        self.validator = compile_schema(schema) if schema else None
+    
+    def _with_options(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {**self.call_options, **kwargs}
+    
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        kwargs = self._with_options(kwargs)
+        with span("llm.generate", agent_type=kwargs.get("agent_type"), streamed="on_token" in kwargs) as current:
+            result = await self.inner.generate(prompt, **kwargs)
+            record_usage(self.call_options.get("agent_type"), result)
+            trace_result(current, result)
+        schema = kwargs.get("response_schema")
+        if schema:
+            with span("llm.parse", agent_type=kwargs.get("agent_type")) as current:
+                validator = self.validator if schema is self.call_options.get("response_schema") else compile_schema(schema)
+                result = apply_schema(result, validator)
+                current.set_attribute("valid", result.get("success", False))
+        return result
+    
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        kwargs = self._with_options(kwargs)
+        with span("llm.generate", agent_type=kwargs.get("agent_type"), tools=len(tools)) as current:
+            result = await self.inner.generate_with_tools(prompt, tools, **kwargs)
+            record_usage(self.call_options.get("agent_type"), result)
+            trace_result(current, result)
+        return result
+    
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        async for chunk in self.inner.generate_stream(prompt, **self._with_options(kwargs)):
+            yield chunk
+    
+    def describe_request(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        return self.inner.describe_request(prompt, **self._with_options(kwargs))
 
 
 class OpenAIProvider(LLMProvider):
@@ -96,38 +352,77 @@ class OpenAIProvider(LLMProvider):
         self.default_system_prompt = config.get("system_prompt", "")
         
         # Create client
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        self.client = self._create_client(config)
         
-        logger.info(f"Initialized OpenAI provider with model: {self.model}")
+        logger.info(f"Initialized {self.__class__.__name__} with model: {self.model}")
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    async def generate(
-        self, 
-        prompt: str, 
+    def _create_client(self, config: Dict[str, Any]) -> AsyncOpenAI:
+        """
+        Create the API client
+        
+        Retries are handled by RetryingLLMProvider so that every attempt is
+        visible to the rate limiter and circuit breaker. ``timeout`` bounds
+        calls made without a request deadline.
+        
+        Args:
+            config: Provider configuration
+            
+        Returns:
+            Async OpenAI client
+        """
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            max_retries=config.get("sdk_max_retries", 0),
+            timeout=config.get("timeout", 600.0)
+        )
+    
+    @staticmethod
+    def _timeout_option() -> Dict[str, Any]:
+        """
+        Per-call ``timeout`` argument: the time left before the request deadline
+        
+        Raises:
+            DeadlineExceeded: If the deadline has already passed
+        """
+        timeout = request_timeout()
+        return {"timeout": timeout} if timeout is not None else {}
+    
+    def _build_request(
+        self,
+        prompt: str,
         system_prompt: Optional[str] = None,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
-        Generate text with OpenAI
+        Build keyword arguments for ``chat.completions.create``
         
         Args:
             prompt: User prompt
             system_prompt: Optional system prompt
             temperature: Optional temperature override
             max_tokens: Optional max tokens override
+            **kwargs: Additional API parameters; ``response_schema`` (a JSON
+                schema) requests schema-constrained output and
+                ``tool_messages`` continues the conversation after the prompt
+                (assistant tool calls and tool results)
             
         Returns:
-            Response with text and metadata
+            Request keyword arguments with all defaults resolved
         """
-        start_time = time.time()
+        split_call_options(kwargs)
+        
+        response_schema = kwargs.pop("response_schema", None)
+        if response_schema:
+            kwargs["response_format"] = json_schema_response_format(response_schema)
         
         # Use provided values or fall back to defaults
+        model = kwargs.pop("model", None) or self.model
         temperature = temperature if temperature is not None else self.temperature
         
         # Handle max_tokens vs max_completion_tokens for different models
-        if self.model.startswith("o1"):
+        if model.startswith("o1"):
             max_completion_tokens = max_tokens if max_tokens is not None else self.max_completion_tokens
             kwargs["max_completion_tokens"] = max_completion_tokens
         else:
@@ -145,18 +440,73 @@ class OpenAIProvider(LLMProvider):
         
         # Remove None values
         messages = [msg for msg in messages if msg]
+        messages.extend(kwargs.pop("tool_messages", None) or [])
         
-        try:
-            # Make API call
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
+        return {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "top_p": self.top_p,
+            "frequency_penalty": self.frequency_penalty,
+            "presence_penalty": self.presence_penalty,
+            **kwargs
+        }
+    
+    def describe_request(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Describe the resolved OpenAI request for these arguments
+        
+        Returns:
+            The ``chat.completions.create`` keyword arguments
+        """
+        return self._build_request(prompt, system_prompt, temperature, max_tokens, **kwargs)
+    
+    async def generate(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Generate text with OpenAI
+        
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            temperature: Optional temperature override
+            max_tokens: Optional max tokens override
+            
+        Returns:
+            Response with text and metadata
+        """
+        on_token = kwargs.pop("on_token", None)
+        if on_token is not None:
+            return await self._generate_from_stream(
+                on_token,
+                prompt,
+                system_prompt=system_prompt,
                 temperature=temperature,
-                top_p=self.top_p,
-                frequency_penalty=self.frequency_penalty,
-                presence_penalty=self.presence_penalty,
+                max_tokens=max_tokens,
                 **kwargs
             )
+        
+        start_time = time.time()
+        request_kwargs = self._build_request(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        
+        try:
+            # Make API call
+            with span("llm.request", model=request_kwargs["model"]) as current:
+                response = await self.client.chat.completions.create(**request_kwargs, **self._timeout_option())
+                current.set_attributes(**(extract_usage(response) or {}))
             
             elapsed_time = time.time() - start_time
             
@@ -165,8 +515,9 @@ class OpenAIProvider(LLMProvider):
             
             result = {
                 "text": text,
-                "model": self.model,
+                "model": request_kwargs["model"],
                 "elapsed_time": elapsed_time,
+                "usage": extract_usage(response),
                 "response": response,
                 "success": True,
             }
@@ -179,11 +530,50 @@ class OpenAIProvider(LLMProvider):
                 "text": f"Error: {str(e)}",
                 "model": self.model,
                 "elapsed_time": time.time() - start_time,
-                "error": str(e),
+                **describe_error(e),
                 "success": False,
             }
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Generate text with OpenAI, yielding content deltas as they arrive
+        
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            temperature: Optional temperature override
+            max_tokens: Optional max tokens override
+            
+        Yields:
+            Text chunks
+        """
+        on_usage = kwargs.get("on_usage")
+        request_kwargs = self._build_request(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        
+        stream = await self.client.chat.completions.create(
+            stream=True,
+            stream_options={"include_usage": True},
+            **request_kwargs,
+            **self._timeout_option()
+        )
+        async for chunk in stream:
+            # The last chunk carries the usage of the whole stream
+            usage = extract_usage(chunk)
+            if usage and on_usage is not None:
+                on_usage(usage)
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
+    
     async def generate_with_tools(
         self,
         prompt: str,
@@ -207,42 +597,13 @@ class OpenAIProvider(LLMProvider):
             Response with text, tool calls, and metadata
         """
         start_time = time.time()
-        
-        # Use provided values or fall back to defaults
-        temperature = temperature if temperature is not None else self.temperature
-        
-        # Handle max_tokens vs max_completion_tokens for different models
-        if self.model.startswith("o1"):
-            max_completion_tokens = max_tokens if max_tokens is not None else self.max_completion_tokens
-            kwargs["max_completion_tokens"] = max_completion_tokens
-        else:
-            max_tokens_value = max_tokens if max_tokens is not None else self.max_tokens
-            kwargs["max_tokens"] = max_tokens_value
-        
-        # Get system prompt
-        if system_prompt is None:
-            system_prompt = self.default_system_prompt
-        
-        messages = [
-            {"role": "system", "content": system_prompt} if system_prompt else None,
-            {"role": "user", "content": prompt}
-        ]
-        
-        # Remove None values
-        messages = [msg for msg in messages if msg]
+        request_kwargs = self._build_request(prompt, system_prompt, temperature, max_tokens, tools=tools, **kwargs)
         
         try:
             # Make API call
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                top_p=self.top_p,
-                frequency_penalty=self.frequency_penalty,
-                presence_penalty=self.presence_penalty,
-                tools=tools,
-                **kwargs
-            )
+            with span("llm.request", model=request_kwargs["model"]) as current:
+                response = await self.client.chat.completions.create(**request_kwargs, **self._timeout_option())
+                current.set_attributes(**(extract_usage(response) or {}))
             
             elapsed_time = time.time() - start_time
             
@@ -256,8 +617,9 @@ class OpenAIProvider(LLMProvider):
             
             result = {
                 "text": message.content or "",
-                "model": self.model,
+                "model": request_kwargs["model"],
                 "elapsed_time": elapsed_time,
+                "usage": extract_usage(response),
                 "response": response,
                 "tool_calls": tool_calls,
                 "success": True,
@@ -271,11 +633,71 @@ class OpenAIProvider(LLMProvider):
                 "text": f"Error: {str(e)}",
                 "model": self.model,
                 "elapsed_time": time.time() - start_time,
-                "error": str(e),
+                **describe_error(e),
                 "success": False,
             }
 
 
+def create_llm_provider(provider_id: str, llm_config: Dict[str, Any]) -> LLMProvider:
+    """
+    Create an unwrapped provider
+    
+    Args:
+        provider_id: Entry in ``llm.providers`` or a provider type
+        llm_config: LLM configuration
+        
+    Returns:
+        LLM provider instance
+    """
+    # Check if we have specific provider config
+    if "providers" in llm_config and provider_id in (llm_config["providers"] or {}):
+        provider_config = llm_config["providers"][provider_id]
+    else:
+        # Use root config
+        provider_config = llm_config
+    provider_type = provider_config.get("provider", provider_id)
+    
+    if provider_type == "openai":
+        return OpenAIProvider(provider_config)
+    
+    if provider_type in ("ollama", "local"):
+        from backend.app.llm.local import LocalLLMProvider
+        return LocalLLMProvider(provider_config)
+    
+    if provider_type == "replay":
+        from backend.app.llm.replay import ReplayProvider
+        replay_config = llm_config.get("replay") or {}
+        target = None
+        if replay_config.get("mode") == "record":
+            target = create_llm_provider(replay_config.get("target", "openai"), llm_config)
+        return ReplayProvider(replay_config, target)
+    
+    raise ValueError(f"Unsupported LLM provider: {provider_type}")
+
+
+def _wrap_backend(provider: LLMProvider, llm_config: Dict[str, Any]) -> LLMProvider:
+    """Apply the per-backend layers: rate limiting, retries and circuit breaking"""
+    # Enforce request/token budgets and adaptive concurrency if enabled
+    rate_limit_config = llm_config.get("rate_limit") or {}
+    if rate_limit_config.get("enabled", False) and provider.metered:
+        from backend.app.llm.rate_limit import RateLimitedLLMProvider
+        provider = RateLimitedLLMProvider(provider, rate_limit_config)
+    
+    # Retry retryable errors; each attempt passes the rate limiter again
+    retry_config = llm_config.get("retry") or {}
+    if retry_config.get("enabled", True):
+        from backend.app.llm.resilience import RetryingLLMProvider
+        provider = RetryingLLMProvider(provider, retry_config)
+    
+    # Fail fast while the backend is down (and let the router fall back)
+    breaker_config = llm_config.get("circuit_breaker") or {}
+    if breaker_config.get("enabled", True):
+        from backend.app.llm.resilience import CircuitBreakerLLMProvider
+        provider = CircuitBreakerLLMProvider(provider, breaker_config)
+    
+    return provider
+
+
 @lru_cache()
 def get_llm_provider() -> LLMProvider:
     """
@@ -286,20 +708,38 @@ def get_llm_provider() -> LLMProvider:
     """
     settings = get_settings()
     llm_config = settings.get_llm_config()
-    provider_type = llm_config.get("provider", "openai")
-    
-    if provider_type == "openai":
-        # Get the right provider config
-        provider_id = llm_config.get("provider", "openai")
-        
-        # Check if we have specific provider config
-        if "providers" in llm_config and provider_id in llm_config["providers"]:
-            provider_config = llm_config["providers"][provider_id]
-        else:
-            # Use root config
-            provider_config = llm_config
-        
-        return OpenAIProvider(provider_config)
+    routing_config = llm_config.get("routing") or {}
     
+    if routing_config.get("enabled", False):
+        # One rate-limited backend per configured provider entry
+        from backend.app.llm.router import RouterLLMProvider
+        default_provider = llm_config.get("provider", "openai")
+        default = routing_config.get("default") or getattr(default_provider, "value", default_provider)
+        backend_ids = [default] + [b for b in routing_config.get("backends") or [] if b != default]
+        backends = {
+            backend_id: _wrap_backend(create_llm_provider(backend_id, llm_config), llm_config)
+            for backend_id in backend_ids
+        }
+        provider = RouterLLMProvider(backends, {**routing_config, "default": default})
     else:
-        raise ValueError(f"Unsupported LLM provider: {provider_type}") 
\ No newline at end of file
+        provider = _wrap_backend(create_llm_provider(llm_config.get("provider", "openai"), llm_config), llm_config)
+    
+    # Send a backup request for calls slower than recent latency percentiles
+    hedging_config = llm_config.get("hedging") or {}
+    if hedging_config.get("enabled", False):
+        from backend.app.llm.hedging import HedgedLLMProvider
+        provider = HedgedLLMProvider(provider, hedging_config)
+    
+    # Share one call between identical concurrent requests
+    if llm_config.get("coalesce", True):
+        from backend.app.llm.coalescing import CoalescingLLMProvider
+        provider = CoalescingLLMProvider(provider)
+    
+    # Wrap with the response cache if enabled (outermost, so hits skip the limiter)
+    cache_config = llm_config.get("cache") or {}
+    if cache_config.get("enabled", False):
+        from backend.app.llm.cache import CachedLLMProvider
+        provider = CachedLLMProvider(provider, cache_config)
+    
+    return provider
+ 
\ No newline at end of file
@@ -0,0 +1,366 @@
+"""
+Rate limiting and adaptive concurrency for LLM providers.
+
+Requests-per-minute and tokens-per-minute budgets are enforced with token
+buckets. When Redis is available the buckets are shared by every worker
+process; otherwise each process falls back to a local bucket. On top of the
+buckets an AIMD limiter adapts the number of concurrent calls: it shrinks
+multiplicatively on 429 responses and latency spikes and grows additively
+while calls succeed, so throughput settles just under the provider quota.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from backend.app.db.cache import get_redis, get_cache_key
+from backend.app.llm.provider import LLMProvider, LLMProviderWrapper
+from backend.app.llm.tracing import span
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used to estimate prompt size before sending
+CHARS_PER_TOKEN = 4
+
+# Atomically refill a bucket and take `amount` from it. Returns the number of
+# seconds to wait before retrying, or "0" when the tokens were taken.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local amount = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= amount then
+    tokens = tokens - amount
+else
+    wait = (amount - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) * 2)
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """
+    In-process token bucket
+    """
+    def __init__(self, capacity: float, refill_per_second: float):
+        """
+        Initialize bucket
+
+        Args:
+            capacity: Maximum number of tokens (burst size)
+            refill_per_second: Tokens added per second
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def try_take(self, amount: float) -> float:
+        """
+        Take tokens if available
+
+        Args:
+            amount: Number of tokens to take
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they will be
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+
+class SharedTokenBucket:
+    """
+    Token bucket shared across workers through Redis
+
+    Falls back to a local bucket with the same budget while Redis is
+    unreachable, so a Redis outage degrades to per-process limiting instead
+    of failing LLM calls.
+    """
+    def __init__(
+        self,
+        name: str,
+        capacity: float,
+        refill_per_second: float,
+        use_redis: bool = True,
+        redis_retry_interval: int = 60
+    ):
+        """
+        Initialize shared bucket
+
+        Args:
+            name: Redis key identifying the budget
+            capacity: Maximum number of tokens (burst size)
+            refill_per_second: Tokens added per second
+            use_redis: Whether to coordinate through Redis
+            redis_retry_interval: Seconds to use the local bucket after a Redis error
+        """
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.use_redis = use_redis
+        self.redis_retry_interval = redis_retry_interval
+        self.local = TokenBucket(capacity, refill_per_second)
+        self._redis_disabled_until = 0.0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    async def _try_take(self, amount: float) -> float:
+        if self.use_redis and time.monotonic() >= self._redis_disabled_until:
+            try:
+                wait = await get_redis().eval(
+                    TOKEN_BUCKET_SCRIPT,
+                    1,
+                    self.name,
+                    self.capacity,
+                    self.refill_per_second,
+                    amount
+                )
+                return float(wait)
+            except Exception as e:
+                logger.warning(
+                    f"Rate limit bucket {self.name} falling back to local limiting "
+                    f"for {self.redis_retry_interval}s: {str(e)}"
+                )
+                self._redis_disabled_until = time.monotonic() + self.redis_retry_interval
+        return self.local.try_take(amount)
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Wait until `amount` tokens have been taken from the bucket
+
+        Args:
+            amount: Number of tokens; capped at the bucket capacity
+        """
+        amount = min(amount, self.capacity)
+        while True:
+            wait = await self._try_take(amount)
+            if wait <= 0:
+                return
+            self.waits += 1
+            self.wait_time += wait
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limiter for the number of concurrent calls
+
+    The limit grows by ``increase`` per limit's worth of successful calls
+    (roughly one step per round trip) and is multiplied by
+    ``decrease_factor`` on a 429 or when latency exceeds
+    ``latency_factor`` times its moving average. Decreases are spaced at
+    least one average latency apart so a burst of failures from the same
+    window only counts once.
+    """
+    def __init__(
+        self,
+        initial: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_factor: float = 2.0,
+        latency_smoothing: float = 0.1,
+        warmup_samples: int = 5
+    ):
+        self.limit = float(initial)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.latency_smoothing = latency_smoothing
+        self.warmup_samples = warmup_samples
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.avg_latency: Optional[float] = None
+        self.samples = 0
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        """Wait for a free concurrency slot"""
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    async def release(self, latency: float, rate_limited: bool = False) -> None:
+        """
+        Release a slot and adapt the limit
+
+        Args:
+            latency: Duration of the call in seconds
+            rate_limited: Whether the provider answered with a rate limit error
+        """
+        async with self._condition:
+            self.in_flight -= 1
+
+            spike = (
+                self.avg_latency is not None
+                and self.samples >= self.warmup_samples
+                and latency > self.avg_latency * self.latency_factor
+            )
+
+            if not rate_limited:
+                self._record_latency(latency)
+
+            if rate_limited or spike:
+                self._decrease()
+            else:
+                self.limit = min(self.max_limit, self.limit + self.increase / max(self.limit, 1.0))
+                self.increases += 1
+
+            self._condition.notify_all()
+
+    def _record_latency(self, latency: float) -> None:
+        self.samples += 1
+        if self.avg_latency is None:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += self.latency_smoothing * (latency - self.avg_latency)
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if self.avg_latency is not None and now - self._last_decrease < self.avg_latency:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.decreases += 1
+        logger.info(f"Reduced LLM concurrency limit to {self.limit:.2f}")
+
+
+class RateLimitedLLMProvider(LLMProviderWrapper):
+    """
+    Provider wrapper enforcing RPM/TPM budgets and adaptive concurrency
+    """
+    def __init__(self, inner: LLMProvider, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize rate limited provider
+
+        Args:
+            inner: Provider to limit
+            config: Rate limit configuration (``llm.rate_limit`` in settings.yml)
+        """
+        super().__init__(inner)
+        config = config or {}
+        use_redis = config.get("redis", True)
+        retry_interval = config.get("redis_retry_interval", 60)
+        key_prefix = config.get("key_prefix", "llm_rate")
+
+        rpm = config.get("requests_per_minute")
+        tpm = config.get("tokens_per_minute")
+        self.requests = SharedTokenBucket(
+            get_cache_key(key_prefix, self.model, "rpm"), rpm, rpm / 60.0, use_redis, retry_interval
+        ) if rpm else None
+        self.tokens = SharedTokenBucket(
+            get_cache_key(key_prefix, self.model, "tpm"), tpm, tpm / 60.0, use_redis, retry_interval
+        ) if tpm else None
+
+        concurrency = config.get("concurrency") or {}
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial=concurrency.get("initial", 4),
+            min_limit=concurrency.get("min", 1),
+            max_limit=concurrency.get("max", 32),
+            increase=concurrency.get("increase", 1.0),
+            decrease_factor=concurrency.get("decrease_factor", 0.5),
+            latency_factor=concurrency.get("latency_factor", 2.0)
+        )
+        self.rate_limited = 0
+
+        logger.info(f"Initialized LLM rate limiter (rpm={rpm}, tpm={tpm}, redis={use_redis})")
+
+    def _estimate_tokens(self, prompt: str, kwargs: Dict[str, Any]) -> int:
+        """Estimate the tokens a request counts against the TPM budget"""
+        description = self.inner.describe_request(prompt, **kwargs)
+        messages = description.get("messages") or [{"content": prompt}]
+        prompt_chars = sum(len(str(m.get("content") or "")) for m in messages)
+        completion = description.get("max_tokens") or description.get("max_completion_tokens") or 0
+        return prompt_chars // CHARS_PER_TOKEN + completion
+
+    @asynccontextmanager
+    async def _slot(self, prompt: str, kwargs: Dict[str, Any]):
+        """Wait for budget and a concurrency slot; yields a dict for the call outcome"""
+        with span("llm.queue", agent_type=kwargs.get("agent_type")):
+            if self.requests:
+                await self.requests.acquire(1)
+            if self.tokens:
+                await self.tokens.acquire(self._estimate_tokens(prompt, kwargs))
+
+            await self.concurrency.acquire()
+        outcome = {"rate_limited": False}
+        start_time = time.monotonic()
+        try:
+            yield outcome
+        finally:
+            if outcome["rate_limited"]:
+                self.rate_limited += 1
+            await self.concurrency.release(time.monotonic() - start_time, outcome["rate_limited"])
+
+    @staticmethod
+    def _is_rate_limited(result: Dict[str, Any]) -> bool:
+        return result.get("status_code") == 429
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        async with self._slot(prompt, kwargs) as outcome:
+            result = await self.inner.generate(prompt, **kwargs)
+            outcome["rate_limited"] = self._is_rate_limited(result)
+            return result
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        async with self._slot(prompt, kwargs) as outcome:
+            result = await self.inner.generate_with_tools(prompt, tools, **kwargs)
+            outcome["rate_limited"] = self._is_rate_limited(result)
+            return result
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        async with self._slot(prompt, kwargs) as outcome:
+            try:
+                async for chunk in self.inner.generate_stream(prompt, **kwargs):
+                    yield chunk
+            except Exception as e:
+                outcome["rate_limited"] = getattr(e, "status_code", None) == 429
+                raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter counters merged with the wrapped provider's stats"""
+        buckets = {}
+        for name, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            if bucket:
+                buckets[name] = {"waits": bucket.waits, "wait_time": bucket.wait_time}
+        return {
+            **self.inner.get_stats(),
+            "rate_limit": {
+                **buckets,
+                "concurrency_limit": self.concurrency.limit,
+                "in_flight": self.concurrency.in_flight,
+                "waiting": self.concurrency.waiting,
+                "avg_latency": self.concurrency.avg_latency,
+                "increases": self.concurrency.increases,
+                "decreases": self.concurrency.decreases,
+                "rate_limited": self.rate_limited,
+            },
+        }
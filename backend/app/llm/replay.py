@@ -0,0 +1,307 @@
+"""
+Record/replay LLM provider for deterministic offline runs.
+
+In ``record`` mode the provider forwards calls to a real target provider and
+appends every request/response pair to a cassette file (JSON lines). In
+``replay`` mode it serves responses from the cassette without any network
+access, sleeping for a simulated latency so pipeline, database and
+serialization overheads can be measured in isolation.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+import statistics
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from backend.app.llm.cache import make_request_key, _serialize_tool_calls
+from backend.app.llm.provider import LLMProvider
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+REPLAY_MODES = ("record", "replay")
+LATENCY_DISTRIBUTIONS = ("none", "fixed", "lognormal", "recorded")
+
+
+class LatencyModel:
+    """
+    Simulated latency distribution for replayed responses
+    """
+    def __init__(self, config: Optional[Dict[str, Any]] = None, recorded: Optional[List[float]] = None, seed: Optional[int] = None):
+        """
+        Initialize latency model
+
+        Args:
+            config: Latency configuration with ``distribution`` and its parameters
+            recorded: Recorded latencies, used to fit a log-normal when
+                ``mu``/``sigma`` are not configured
+            seed: Optional random seed for reproducible runs
+        """
+        config = config or {}
+        self.distribution = config.get("distribution", "recorded")
+        if self.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unsupported latency distribution: {self.distribution}")
+
+        self.value = config.get("value", 1.0)
+        self.scale = config.get("scale", 1.0)
+        self.random = random.Random(seed)
+
+        self.mu = config.get("mu")
+        self.sigma = config.get("sigma")
+        if self.distribution == "lognormal" and (self.mu is None or self.sigma is None):
+            self.mu, self.sigma = self.fit_lognormal(recorded or [])
+
+    @staticmethod
+    def fit_lognormal(latencies: List[float]) -> "tuple[float, float]":
+        """
+        Fit log-normal parameters to observed latencies
+
+        Args:
+            latencies: Latencies in seconds
+
+        Returns:
+            Tuple of (mu, sigma) of the underlying normal distribution
+        """
+        logs = [math.log(x) for x in latencies if x and x > 0]
+        if not logs:
+            return 0.0, 0.0
+        if len(logs) == 1:
+            return logs[0], 0.0
+        return statistics.fmean(logs), statistics.stdev(logs)
+
+    def sample(self, recorded: Optional[float] = None) -> float:
+        """
+        Sample a latency
+
+        Args:
+            recorded: Latency recorded with the replayed entry
+
+        Returns:
+            Latency in seconds
+        """
+        if self.distribution == "none":
+            latency = 0.0
+        elif self.distribution == "fixed":
+            latency = self.value
+        elif self.distribution == "lognormal":
+            latency = self.random.lognormvariate(self.mu, self.sigma)
+        else:
+            latency = recorded or 0.0
+        return max(0.0, latency * self.scale)
+
+
+class ReplayProvider(LLMProvider):
+    """
+    LLM provider that records calls to cassettes or replays them
+
+    Requests are matched on their call arguments. Calls with the same key
+    are served in recorded order, cycling when exhausted. Unmatched calls
+    are handled according to ``on_missing``: ``error`` fails the call,
+    ``agent`` serves a recording from the same agent type and ``any``
+    serves any recording.
+    """
+    metered = False
+
+    def __init__(self, config: Dict[str, Any], target: Optional[LLMProvider] = None):
+        """
+        Initialize replay provider
+
+        Args:
+            config: Replay configuration (``llm.replay`` in settings.yml)
+            target: Provider to record from; required in record mode
+        """
+        self.mode = config.get("mode", "replay")
+        if self.mode not in REPLAY_MODES:
+            raise ValueError(f"Unsupported replay mode: {self.mode}")
+        if self.mode == "record" and target is None:
+            raise ValueError("Record mode requires a target provider")
+
+        self.target = target
+        if target is not None:
+            self.metered = target.metered
+        self.cassette_path = Path(config.get("cassette_dir", "storage/cassettes")) / f"{config.get('cassette', 'default')}.jsonl"
+        self.on_missing = config.get("on_missing", "error")
+        self.model = getattr(target, "model", None) or config.get("model", "replay")
+
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._by_agent: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._all: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._write_lock = asyncio.Lock()
+
+        if self.mode == "replay":
+            self._load()
+
+        self.latency = LatencyModel(
+            config.get("latency"),
+            recorded=[e.get("elapsed_time", 0.0) for e in self._all],
+            seed=config.get("seed")
+        )
+        self.replayed = 0
+        self.recorded = 0
+        self.missing = 0
+
+        logger.info(f"Initialized replay provider in {self.mode} mode with cassette {self.cassette_path}")
+
+    def _load(self) -> None:
+        """Load the cassette into memory"""
+        if not self.cassette_path.exists():
+            raise FileNotFoundError(f"Cassette not found: {self.cassette_path}")
+
+        with open(self.cassette_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                self._entries[entry["key"]].append(entry)
+                self._by_agent[entry.get("agent_type") or ""].append(entry)
+                self._all.append(entry)
+
+        logger.info(f"Loaded {len(self._all)} recordings from {self.cassette_path}")
+
+    def _request_key(self, kind: str, prompt: str, kwargs: Dict[str, Any]) -> str:
+        # Match on call arguments so keys are identical in both modes
+        return make_request_key(LLMProvider.describe_request(self, prompt, **kwargs), kind)
+
+    def _next(self, pool_key: str, pool: List[Dict[str, Any]]) -> Dict[str, Any]:
+        position = self._positions[pool_key]
+        self._positions[pool_key] = position + 1
+        return pool[position % len(pool)]
+
+    def _find(self, key: str, agent_type: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Find the recording for a key, applying the ``on_missing`` policy"""
+        if self._entries.get(key):
+            return self._next(key, self._entries[key])
+
+        self.missing += 1
+        if self.on_missing == "agent" and self._by_agent.get(agent_type or ""):
+            return self._next(f"agent:{agent_type}", self._by_agent[agent_type or ""])
+        if self.on_missing == "any" and self._all:
+            return self._next("any", self._all)
+        return None
+
+    async def _record(self, kind: str, key: str, prompt: str, kwargs: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Append a request/response pair to the cassette"""
+        response = {k: result[k] for k in ("text", "model", "tool_calls", "usage") if k in result}
+        if "tool_calls" in response:
+            response["tool_calls"] = _serialize_tool_calls(response["tool_calls"])
+
+        entry = {
+            "key": key,
+            "kind": kind,
+            "agent_type": kwargs.get("agent_type"),
+            "request": LLMProvider.describe_request(self, prompt, **kwargs),
+            "response": response,
+            "elapsed_time": result.get("elapsed_time", 0.0),
+            "recorded_at": time.time(),
+        }
+
+        async with self._write_lock:
+            os.makedirs(self.cassette_path.parent, exist_ok=True)
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        self.recorded += 1
+
+    async def _call(self, kind: str, prompt: str, kwargs: Dict[str, Any], forward) -> Dict[str, Any]:
+        start_time = time.time()
+        key = self._request_key(kind, prompt, kwargs)
+
+        if self.mode == "record":
+            result = await forward()
+            if result.get("success"):
+                await self._record(kind, key, prompt, kwargs, result)
+            return result
+
+        entry = self._find(key, kwargs.get("agent_type"))
+        if entry is None:
+            error = f"No recording for request {key[:8]} in {self.cassette_path}"
+            logger.error(error)
+            return {
+                "text": f"Error: {error}",
+                "model": self.model,
+                "elapsed_time": time.time() - start_time,
+                "error": error,
+                "success": False,
+            }
+
+        await asyncio.sleep(self.latency.sample(entry.get("elapsed_time")))
+        self.replayed += 1
+
+        text = entry["response"].get("text", "")
+        on_token = kwargs.get("on_token")
+        if on_token is not None and text:
+            await on_token(text)
+
+        return {
+            **entry["response"],
+            "model": entry["response"].get("model", self.model),
+            "elapsed_time": time.time() - start_time,
+            "replayed": True,
+            "success": True,
+        }
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Generate text by recording a target call or replaying a recording"""
+        return await self._call(
+            "generate",
+            prompt,
+            kwargs,
+            lambda: self.target.generate(prompt, **kwargs)
+        )
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """Generate text with tools by recording a target call or replaying a recording"""
+        return await self._call(
+            "generate_with_tools",
+            prompt,
+            {**kwargs, "tools": tools},
+            lambda: self.target.generate_with_tools(prompt, tools, **kwargs)
+        )
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream a replayed response word by word, spreading its latency"""
+        if self.mode == "record":
+            result = await self.generate(prompt, **kwargs)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error", "Unknown error"))
+            yield result.get("text", "")
+            return
+
+        key = self._request_key("generate", prompt, kwargs)
+        entry = self._find(key, kwargs.get("agent_type"))
+        if entry is None:
+            raise RuntimeError(f"No recording for request {key[:8]} in {self.cassette_path}")
+
+        on_usage = kwargs.get("on_usage")
+        if entry["response"].get("usage") and on_usage is not None:
+            on_usage(entry["response"]["usage"])
+
+        chunks = re.findall(r"\S+\s*", entry["response"].get("text", "")) or [""]
+        delay = self.latency.sample(entry.get("elapsed_time")) / len(chunks)
+        self.replayed += 1
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get replay counters"""
+        return {
+            **(self.target.get_stats() if self.target else {}),
+            "replay": {
+                "mode": self.mode,
+                "cassette": str(self.cassette_path),
+                "recordings": len(self._all),
+                "replayed": self.replayed,
+                "recorded": self.recorded,
+                "missing": self.missing,
+                "latency_distribution": self.latency.distribution,
+            },
+        }
@@ -0,0 +1,294 @@
+"""
+Retries and circuit breaking for LLM providers.
+
+``RetryingLLMProvider`` resends calls that failed with a retryable error
+(see ``backend.app.llm.errors``), waiting as long as the provider asked
+via ``Retry-After`` or rate-limit reset headers, else backing off
+exponentially, but never past the request deadline (see
+``backend.app.llm.deadline``). ``CircuitBreakerLLMProvider`` fails calls fast for a
+cool-down window after repeated provider failures, so queued pipelines do
+not each wait through their full timeouts while the provider is down.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from tenacity import AsyncRetrying, RetryCallState, retry_if_result, stop_after_attempt
+
+from backend.app.llm.deadline import remaining_time
+from backend.app.llm.errors import LLMErrorType, PROVIDER_ERRORS, classify_error, describe_error
+from backend.app.llm.provider import LLMProvider, LLMProviderWrapper
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+class RetryingLLMProvider(LLMProviderWrapper):
+    """
+    Provider wrapper retrying calls that failed with a retryable error
+    """
+    def __init__(self, inner: LLMProvider, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize retrying provider
+
+        Args:
+            inner: Provider to retry calls to
+            config: Retry configuration (``llm.retry`` in settings.yml)
+        """
+        super().__init__(inner)
+        config = config or {}
+        self.max_attempts = config.get("max_attempts", 3)
+        self.initial_wait = config.get("initial_wait", 1.0)
+        self.max_wait = config.get("max_wait", 30.0)
+        self.max_retry_after = config.get("max_retry_after", 60.0)
+        self.retries = 0
+        self.retry_wait_time = 0.0
+        self.gave_up = 0
+
+    def _should_retry(self, result: Dict[str, Any]) -> bool:
+        if result.get("success") or not result.get("retryable"):
+            return False
+        # Waiting longer than allowed would only hold up the caller
+        retry_after = result.get("retry_after")
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return False
+        # A retry that cannot finish before the deadline only burns tokens
+        remaining = remaining_time()
+        return remaining is None or remaining > (retry_after or 0.0)
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        result = retry_state.outcome.result()
+        retry_after = result.get("retry_after")
+        if retry_after is not None:
+            wait = retry_after
+        else:
+            backoff = self.initial_wait * 2 ** (retry_state.attempt_number - 1)
+            wait = min(self.max_wait, backoff) * random.uniform(0.5, 1.0)
+        remaining = remaining_time()
+        if remaining is not None:
+            wait = min(wait, max(0.0, remaining))
+
+        self.retries += 1
+        self.retry_wait_time += wait
+        logger.warning(
+            f"Retrying LLM call after {result.get('error_type', 'unknown')} error "
+            f"in {wait:.2f}s (attempt {retry_state.attempt_number}/{self.max_attempts})"
+        )
+        return wait
+
+    def _give_up(self, retry_state: RetryCallState) -> Dict[str, Any]:
+        self.gave_up += 1
+        return {**retry_state.outcome.result(), "attempts": retry_state.attempt_number}
+
+    async def _retrying(self, call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=self._wait,
+            retry=retry_if_result(self._should_retry),
+            retry_error_callback=self._give_up
+        )
+
+        async def attempt() -> Dict[str, Any]:
+            return await call()
+
+        return await retrying(attempt)
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        return await self._retrying(lambda: self.inner.generate(prompt, **kwargs))
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self._retrying(lambda: self.inner.generate_with_tools(prompt, tools, **kwargs))
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream, retrying failures that happen before the first chunk"""
+        for attempt in range(1, self.max_attempts + 1):
+            started = False
+            try:
+                async for chunk in self.inner.generate_stream(prompt, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                details = describe_error(e)
+                retry_after = details["retry_after"]
+                if started or attempt == self.max_attempts or not self._should_retry(details):
+                    raise
+                wait = retry_after if retry_after is not None else min(self.max_wait, self.initial_wait * 2 ** (attempt - 1))
+                remaining = remaining_time()
+                if remaining is not None:
+                    wait = min(wait, max(0.0, remaining))
+                self.retries += 1
+                self.retry_wait_time += wait
+                await asyncio.sleep(wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retry counters merged with the wrapped provider's stats"""
+        return {
+            **self.inner.get_stats(),
+            "retry": {
+                "retries": self.retries,
+                "retry_wait_time": self.retry_wait_time,
+                "gave_up": self.gave_up,
+            },
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Closed: calls pass. After ``failure_threshold`` consecutive provider
+    failures it opens and rejects calls for ``reset_timeout`` seconds, then
+    lets a single probe call through (half-open). The probe's outcome
+    closes or reopens the circuit.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may proceed
+
+        Returns:
+            False if the call should fail fast
+        """
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a probe through"""
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        """Record a successful call"""
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            logger.info("LLM circuit closed")
+        self.state = self.CLOSED
+
+    def record_cancelled(self) -> None:
+        """Record a cancelled call; a cancelled probe says nothing about the provider"""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a provider failure"""
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opens += 1
+                logger.warning(f"LLM circuit opened for {self.reset_timeout}s after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class CircuitBreakerLLMProvider(LLMProviderWrapper):
+    """
+    Provider wrapper failing fast while its circuit breaker is open
+
+    Only provider-side failures (rate limits, server errors, timeouts,
+    connection and authentication errors) count against the circuit;
+    failures caused by the request itself do not.
+    """
+    def __init__(self, inner: LLMProvider, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize circuit breaker provider
+
+        Args:
+            inner: Provider to protect
+            config: Breaker configuration (``llm.circuit_breaker`` in settings.yml)
+        """
+        super().__init__(inner)
+        config = config or {}
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.get("failure_threshold", 5),
+            reset_timeout=config.get("reset_timeout", 30.0)
+        )
+
+    def _rejected(self) -> Dict[str, Any]:
+        error = f"Circuit open for {self.model}, retry in {self.breaker.retry_after:.1f}s"
+        return {
+            "text": f"Error: {error}",
+            "model": self.model,
+            "elapsed_time": 0.0,
+            "error": error,
+            "error_type": LLMErrorType.CIRCUIT_OPEN.value,
+            "retryable": False,
+            "retry_after": self.breaker.retry_after,
+            "success": False,
+        }
+
+    def _record(self, result: Dict[str, Any]) -> None:
+        if result.get("success"):
+            self.breaker.record_success()
+        elif result.get("error_type", LLMErrorType.UNKNOWN.value) in {e.value for e in PROVIDER_ERRORS}:
+            self.breaker.record_failure()
+        else:
+            # The provider answered; the request was at fault
+            self.breaker.record_success()
+
+    async def _guarded(self, call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        if not self.breaker.allow():
+            return self._rejected()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            self.breaker.record_cancelled()
+            raise
+        self._record(result)
+        return result
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        return await self._guarded(lambda: self.inner.generate(prompt, **kwargs))
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self._guarded(lambda: self.inner.generate_with_tools(prompt, tools, **kwargs))
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        if not self.breaker.allow():
+            raise RuntimeError(self._rejected()["error"])
+        try:
+            async for chunk in self.inner.generate_stream(prompt, **kwargs):
+                yield chunk
+        except Exception as e:
+            if classify_error(e) in PROVIDER_ERRORS:
+                self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state merged with the wrapped provider's stats"""
+        return {
+            **self.inner.get_stats(),
+            "circuit_breaker": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.failures,
+                "opens": self.breaker.opens,
+                "rejected": self.breaker.rejected,
+            },
+        }
@@ -0,0 +1,197 @@
+"""
+Routing between multiple configured LLM backends.
+
+Each backend is an entry of ``llm.providers`` in settings.yml. A call is
+routed by the ``route`` call option (a backend name, set per agent or
+pipeline step), else by its ``model`` parameter when a backend serves that
+model, else to the default backend. When the chosen backend fails or times
+out the call moves down its ordered fallback chain, unless the request
+deadline has passed.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.app.llm.deadline import remaining_time
+from backend.app.llm.errors import LLMErrorType
+from backend.app.llm.provider import LLMProvider
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+class RouterLLMProvider(LLMProvider):
+    """
+    Provider dispatching calls to named backends with fallback chains
+    """
+    def __init__(self, backends: Dict[str, LLMProvider], config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize router
+
+        Args:
+            backends: Providers by backend name
+            config: Routing configuration (``llm.routing`` in settings.yml)
+        """
+        if not backends:
+            raise ValueError("Router requires at least one backend")
+        config = config or {}
+
+        self.backends = backends
+        self.default = config.get("default") or next(iter(backends))
+        if self.default not in backends:
+            raise ValueError(f"Default backend not configured: {self.default}")
+        self.fallbacks: Dict[str, List[str]] = config.get("fallbacks") or {}
+        self.timeout: Optional[float] = config.get("timeout")
+        self.model = getattr(backends[self.default], "model", "unknown")
+
+        self._counters = {
+            name: {"calls": 0, "failures": 0, "timeouts": 0, "fallbacks": 0}
+            for name in backends
+        }
+
+        logger.info(f"Initialized LLM router with backends {list(backends)} (default: {self.default})")
+
+    def _chain(self, kwargs: Dict[str, Any]) -> Tuple[List[str], bool]:
+        """
+        Resolve the ordered backends to try for a call
+
+        Returns:
+            Tuple of (backend names, whether the first backend should
+            receive the caller's ``model`` override)
+        """
+        route = kwargs.get("route")
+        model = kwargs.get("model")
+        keep_model = False
+
+        if route in self.backends:
+            first = route
+        else:
+            if route:
+                logger.warning(f"Unknown LLM route {route}, using model selection")
+            first = next(
+                (name for name, backend in self.backends.items() if model and getattr(backend, "model", None) == model),
+                None
+            )
+            if first is None:
+                first = self.default
+                keep_model = bool(model)
+
+        chain = [first]
+        for name in self.fallbacks.get(first, []):
+            if name in self.backends and name not in chain:
+                chain.append(name)
+        return chain, keep_model
+
+    @staticmethod
+    def _backend_kwargs(kwargs: Dict[str, Any], keep_model: bool) -> Dict[str, Any]:
+        # A backend serves its own model unless the caller overrides the default backend's
+        if keep_model:
+            return kwargs
+        return {k: v for k, v in kwargs.items() if k != "model"}
+
+    async def _route(
+        self,
+        kwargs: Dict[str, Any],
+        call: Callable[[LLMProvider, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Run a call on the first backend of its chain that succeeds"""
+        chain, keep_model = self._chain(kwargs)
+        result: Dict[str, Any] = {}
+        last = chain[0]
+
+        for attempt, name in enumerate(chain):
+            remaining = remaining_time()
+            if attempt > 0 and remaining is not None and remaining <= 0:
+                logger.warning(f"Request deadline passed, not falling back from {chain[attempt - 1]} to {name}")
+                break
+
+            backend = self.backends[name]
+            last = name
+            counters = self._counters[name]
+            counters["calls"] += 1
+            if attempt > 0:
+                counters["fallbacks"] += 1
+
+            start_time = time.time()
+            backend_kwargs = self._backend_kwargs(kwargs, keep_model and attempt == 0)
+            try:
+                if self.timeout:
+                    result = await asyncio.wait_for(call(backend, backend_kwargs), self.timeout)
+                else:
+                    result = await call(backend, backend_kwargs)
+            except asyncio.TimeoutError:
+                counters["timeouts"] += 1
+                error = f"Backend {name} timed out after {self.timeout}s"
+                result = {
+                    "text": f"Error: {error}",
+                    "model": getattr(backend, "model", "unknown"),
+                    "elapsed_time": time.time() - start_time,
+                    "error": error,
+                    "error_type": LLMErrorType.TIMEOUT.value,
+                    "success": False,
+                }
+
+            if result.get("success"):
+                result = {**result, "backend": name}
+                if attempt > 0:
+                    result["fallback_from"] = chain[0]
+                return result
+
+            counters["failures"] += 1
+            if attempt < len(chain) - 1:
+                logger.warning(f"LLM backend {name} failed, falling back to {chain[attempt + 1]}: {result.get('error')}")
+
+        return {**result, "backend": last}
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Generate text on the routed backend"""
+        return await self._route(kwargs, lambda backend, kw: backend.generate(prompt, **kw))
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """Generate text with tools on the routed backend"""
+        return await self._route(kwargs, lambda backend, kw: backend.generate_with_tools(prompt, tools, **kw))
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream from the routed backend
+
+        Falls back only while nothing has been yielded yet; a stream that
+        fails midway is not restarted on another backend.
+        """
+        chain, keep_model = self._chain(kwargs)
+        for attempt, name in enumerate(chain):
+            counters = self._counters[name]
+            counters["calls"] += 1
+            if attempt > 0:
+                counters["fallbacks"] += 1
+
+            started = False
+            backend_kwargs = self._backend_kwargs(kwargs, keep_model and attempt == 0)
+            try:
+                async for chunk in self.backends[name].generate_stream(prompt, **backend_kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                counters["failures"] += 1
+                if started or attempt == len(chain) - 1:
+                    raise
+                logger.warning(f"LLM backend {name} failed, falling back to {chain[attempt + 1]}: {str(e)}")
+
+    def describe_request(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Describe the request as the first backend of the chain would send it"""
+        chain, keep_model = self._chain(kwargs)
+        return self.backends[chain[0]].describe_request(prompt, **self._backend_kwargs(kwargs, keep_model))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-backend routing counters and backend stats"""
+        return {
+            "router": {
+                "default": self.default,
+                "backends": {
+                    name: {**self._counters[name], **backend.get_stats()}
+                    for name, backend in self.backends.items()
+                },
+            },
+        }
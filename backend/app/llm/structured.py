@@ -0,0 +1,229 @@
+"""
+Structured (JSON-schema constrained) LLM output.
+
+Agents declare an ``output_schema`` in agent_definitions.yml. The schema is
+sent to the provider as a ``json_schema`` response format, so the model can
+only answer with a matching JSON document, and the reply is checked against
+a validator compiled once per schema instead of being scraped out of free
+text.
+
+The validator covers the JSON-schema subset that strict structured outputs
+accept: ``type``, ``properties``, ``required``, ``additionalProperties``,
+``items``, ``minItems``/``maxItems``, ``enum`` and ``anyOf``.
+"""
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# Checks a value at a JSON path and appends error messages to the list
+Check = Callable[[Any, str, List[str]], None]
+
+_TYPES = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def _compile(schema: Dict[str, Any]) -> Check:
+    """Compile a schema node into a list of checks run in order"""
+    checks: List[Check] = []
+
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else list(types)
+        unknown = [t for t in types if t not in _TYPES]
+        if unknown:
+            raise ValueError(f"Unsupported schema type: {unknown}")
+        predicates = [_TYPES[t] for t in types]
+        expected = " or ".join(types)
+
+        def check_type(value, path, errors):
+            if not any(predicate(value) for predicate in predicates):
+                errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed}")
+        checks.append(check_enum)
+
+    properties = {name: _compile(sub) for name, sub in (schema.get("properties") or {}).items()}
+    required = list(schema.get("required") or [])
+    additional = schema.get("additionalProperties", True)
+    if properties or required or additional is not True:
+        additional_check = _compile(additional) if isinstance(additional, dict) else None
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing required property {name!r}")
+            for name, item in value.items():
+                if name in properties:
+                    properties[name](item, f"{path}.{name}", errors)
+                elif additional is False:
+                    errors.append(f"{path}: unexpected property {name!r}")
+                elif additional_check is not None:
+                    additional_check(item, f"{path}.{name}", errors)
+        checks.append(check_object)
+
+    items = _compile(schema["items"]) if isinstance(schema.get("items"), dict) else None
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+    if items is not None or min_items is not None or max_items is not None:
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: expected at least {min_items} items, got {len(value)}")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: expected at most {max_items} items, got {len(value)}")
+            if items is not None:
+                for index, item in enumerate(value):
+                    items(item, f"{path}[{index}]", errors)
+        checks.append(check_array)
+
+    if "anyOf" in schema:
+        options = [_compile(sub) for sub in schema["anyOf"]]
+
+        def check_any_of(value, path, errors):
+            for option in options:
+                option_errors: List[str] = []
+                option(value, path, option_errors)
+                if not option_errors:
+                    return
+            errors.append(f"{path}: does not match any allowed schema")
+        checks.append(check_any_of)
+
+    def check(value, path, errors):
+        for sub_check in checks:
+            sub_check(value, path, errors)
+    return check
+
+
+class SchemaValidator:
+    """
+    JSON-schema validator compiled once and reused for every response
+    """
+    def __init__(self, schema: Dict[str, Any]):
+        """
+        Compile a schema
+
+        Args:
+            schema: JSON schema
+
+        Raises:
+            ValueError: If the schema uses an unsupported type
+        """
+        self.schema = schema
+        self.name = schema.get("title") or "response"
+        self._check = _compile(schema)
+
+    def validate(self, value: Any) -> List[str]:
+        """
+        Validate a parsed value
+
+        Args:
+            value: Parsed JSON value
+
+        Returns:
+            Error messages, empty if the value is valid
+        """
+        errors: List[str] = []
+        self._check(value, "$", errors)
+        return errors
+
+    def parse(self, text: str) -> Tuple[Optional[Any], List[str]]:
+        """
+        Parse and validate a response
+
+        Args:
+            text: Response text
+
+        Returns:
+            Tuple of (parsed value or None if invalid, error messages)
+        """
+        try:
+            value = json.loads(text)
+        except (TypeError, ValueError) as e:
+            return None, [f"$: invalid JSON: {str(e)}"]
+        errors = self.validate(value)
+        return (None if errors else value), errors
+
+
+_validators: Dict[str, SchemaValidator] = {}
+
+
+def compile_schema(schema: Dict[str, Any]) -> SchemaValidator:
+    """
+    Get the compiled validator for a schema
+
+    Validators are cached by schema content, so agents created per pipeline
+    run share one compiled validator.
+
+    Args:
+        schema: JSON schema
+
+    Returns:
+        Compiled validator
+    """
+    key = json.dumps(schema, sort_keys=True)
+    validator = _validators.get(key)
+    if validator is None:
+        validator = _validators[key] = SchemaValidator(schema)
+    return validator
+
+
+def json_schema_response_format(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the OpenAI ``response_format`` for a JSON schema
+
+    Args:
+        schema: JSON schema; ``title`` names the format
+
+    Returns:
+        ``response_format`` request parameter
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": schema.get("title") or "response",
+            "schema": {k: v for k, v in schema.items() if k != "title"},
+            "strict": True,
+        },
+    }
+
+
+def apply_schema(result: Dict[str, Any], validator: SchemaValidator) -> Dict[str, Any]:
+    """
+    Attach the parsed, validated output to a successful result
+
+    Adds ``parsed`` (None when the output does not match the schema) and,
+    for mismatches, ``schema_errors``.
+
+    Args:
+        result: Provider result
+        validator: Compiled validator
+
+    Returns:
+        The result with structured output fields
+    """
+    if not result.get("success"):
+        return result
+    parsed, errors = validator.parse(result.get("text", ""))
+    if errors:
+        logger.warning(f"LLM output does not match schema {validator.name}: {errors[:3]}")
+        return {**result, "parsed": None, "schema_errors": errors}
+    return {**result, "parsed": parsed}
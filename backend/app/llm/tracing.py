@@ -0,0 +1,352 @@
+"""
+Span-based tracing of pipeline executions.
+
+A trace is a tree of timed spans: the pipeline, each step, the agent
+execution, state loads and saves, and every LLM call with its model, token
+counts and cache hits. Spans are opened with ``span`` and follow the asyncio
+context, so concurrent steps get their own branches of the tree. Outside an
+active trace ``span`` does nothing, which keeps untraced runs free of
+overhead.
+
+``trace_scope`` starts a trace (when ``tracing.enabled`` is set in
+settings.yml) and exports it when the block ends, either as Chrome
+trace-event JSON (open in chrome://tracing or https://ui.perfetto.dev) or as
+OpenTelemetry (OTLP/JSON) spans, written to a file and optionally posted to
+a collector endpoint.
+"""
+import asyncio
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from backend.app.config import get_settings
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "abts-unified-generator"
+
+
+class Span:
+    """
+    Timed operation within a trace
+    """
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        """
+        Start span
+
+        Args:
+            trace: Trace the span belongs to
+            name: Operation name
+            parent_id: Span ID of the enclosing span, if any
+            attributes: Initial attributes
+        """
+        self.trace_id = trace.trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes)
+        self.lane = trace.lane()
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds, up to now while the span is open"""
+        return (self.end_time or time.time()) - self.start_time
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute; None values are ignored"""
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        """Set several attributes; None values are ignored"""
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_error(self, error: str) -> None:
+        """Mark the span as failed"""
+        self.error = error
+
+    def end(self) -> None:
+        """End the span"""
+        if self.end_time is None:
+            self.end_time = time.time()
+
+    def __repr__(self):
+        return f"<Span {self.name} {self.duration * 1000:.1f}ms>"
+
+
+class _NoopSpan:
+    """Span returned outside an active trace"""
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes) -> None:
+        pass
+
+    def record_error(self, error: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+class Trace:
+    """
+    Spans recorded for one traced operation
+    """
+    def __init__(self, name: str):
+        """
+        Initialize trace
+
+        Args:
+            name: Name of the traced operation, used for the export file name
+        """
+        self.name = name
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self._lanes: Dict[int, int] = {}
+
+    def lane(self) -> int:
+        """
+        Get the lane of the running task
+
+        Spans of one asyncio task are properly nested; concurrent tasks get
+        separate lanes (Chrome trace "threads").
+        """
+        try:
+            key = id(asyncio.current_task())
+        except RuntimeError:
+            key = threading.get_ident()
+        return self._lanes.setdefault(key, len(self._lanes) + 1)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """
+        Convert to Chrome trace-event JSON
+
+        Returns:
+            Trace-event document with one complete ("X") event per span
+        """
+        events: List[Dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": self.name}}
+        ]
+        for span in self.spans:
+            args = dict(span.attributes)
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".")[0],
+                "ph": "X",
+                "ts": span.start_time * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": 1,
+                "tid": span.lane,
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace_id": self.trace_id}}
+
+    def to_otlp(self, service_name: str = SERVICE_NAME) -> Dict[str, Any]:
+        """
+        Convert to OpenTelemetry OTLP/JSON
+
+        Args:
+            service_name: Value of the ``service.name`` resource attribute
+
+        Returns:
+            ``ExportTraceServiceRequest`` document
+        """
+        spans = []
+        for span in self.spans:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(int(span.start_time * 1e9)),
+                "endTimeUnixNano": str(int((span.end_time or span.start_time) * 1e9)),
+                "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "backend.app"}, "spans": spans}],
+        }]}
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": value if isinstance(value, str) else json.dumps(value, default=str)}
+    return {"key": key, "value": typed}
+
+
+def get_current_trace() -> Optional[Trace]:
+    """Get the trace of the current context, if any"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Any]:
+    """
+    Time the block as a span of the current trace
+
+    Exceptions raised in the block mark the span as failed and propagate.
+
+    Args:
+        name: Operation name, e.g. ``llm.generate``
+        **attributes: Initial attributes; None values are ignored
+
+    Yields:
+        The span, or a no-op span outside an active trace
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    current = Span(trace, name, parent.span_id if parent else None,
+                   {k: v for k, v in attributes.items() if v is not None})
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(str(e) or type(e).__name__)
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+
+
+class TraceExporter:
+    """
+    Writes finished traces to files and an optional OTLP collector
+    """
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize exporter
+
+        Args:
+            config: ``tracing`` section of settings.yml
+        """
+        config = config or {}
+        self.enabled = config.get("enabled", False)
+        self.format = config.get("format", "chrome")
+        self.directory = config.get("directory", "storage/traces")
+        self.endpoint = config.get("endpoint")
+        self.service_name = config.get("service_name", SERVICE_NAME)
+        if self.format not in ("chrome", "otlp"):
+            raise ValueError(f"Unknown trace format: {self.format}")
+
+    def export(self, trace: Trace) -> Optional[str]:
+        """
+        Export a finished trace
+
+        The file is written in the configured format; the endpoint always
+        receives OTLP/JSON. Errors are logged, not raised.
+
+        Args:
+            trace: Finished trace
+
+        Returns:
+            Path of the written file, or None if writing failed
+        """
+        path = None
+        try:
+            document = trace.to_chrome() if self.format == "chrome" else trace.to_otlp(self.service_name)
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{trace.name}.{trace.trace_id[:8]}.json")
+            with open(path, "w") as f:
+                json.dump(document, f, default=str)
+        except Exception as e:
+            logger.error(f"Error writing trace {trace.name}: {str(e)}")
+            path = None
+
+        if self.endpoint:
+            try:
+                request = urllib.request.Request(
+                    self.endpoint,
+                    data=json.dumps(trace.to_otlp(self.service_name), default=str).encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                    method="POST"
+                )
+                with urllib.request.urlopen(request, timeout=5):
+                    pass
+            except Exception as e:
+                logger.error(f"Error sending trace {trace.name} to {self.endpoint}: {str(e)}")
+        return path
+
+
+@lru_cache()
+def get_trace_exporter() -> TraceExporter:
+    """Get the trace exporter configured in settings.yml"""
+    return TraceExporter(get_settings().get_settings_config().get("tracing"))
+
+
+@asynccontextmanager
+async def trace_scope(
+    name: str,
+    label: Optional[str] = None,
+    exporter: Optional[TraceExporter] = None,
+    **attributes
+) -> AsyncIterator[Any]:
+    """
+    Trace the block, exporting the trace when it ends
+
+    Inside an active trace this only opens a span, so nested pipelines
+    become part of the enclosing trace.
+
+    Args:
+        name: Name of the root span
+        label: Name of the trace and its export file, defaults to ``name``
+        exporter: Optional exporter, defaults to the configured one
+        **attributes: Root span attributes
+
+    Yields:
+        The root span, or a no-op span if tracing is disabled
+    """
+    if _current_trace.get() is not None:
+        with span(name, **attributes) as current:
+            yield current
+        return
+
+    exporter = exporter or get_trace_exporter()
+    if not exporter.enabled:
+        yield NOOP_SPAN
+        return
+
+    trace = Trace(label or name)
+    token = _current_trace.set(trace)
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        _current_trace.reset(token)
+        path = await asyncio.to_thread(exporter.export, trace)
+        if path:
+            logger.info(f"Wrote trace of {trace.name} ({len(trace.spans)} spans) to {path}")
@@ -0,0 +1,155 @@
+"""
+Token usage accounting for LLM calls.
+
+Providers report the token counts of each call in the result's ``usage``
+field. The per-agent provider view records every result twice: into the
+usage accumulator of the agent execution currently running (see
+``track_usage``) and into process-wide counters per agent type.
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens")
+
+
+def extract_usage(response: Any) -> Optional[Dict[str, int]]:
+    """
+    Extract token counts from an OpenAI-compatible response
+
+    Args:
+        response: Chat completion response (or a chunk carrying usage)
+
+    Returns:
+        Token counts, or None if the response has no usage
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+
+    details = getattr(usage, "prompt_tokens_details", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+        "total_tokens": getattr(usage, "total_tokens", None) or prompt_tokens + completion_tokens,
+    }
+
+
+class UsageCounter:
+    """
+    Cumulative call, token and latency counts
+    """
+    def __init__(self):
+        self.calls = 0
+        self.cached_calls = 0  # Served by the response cache or a coalesced call
+        self.failed_calls = 0
+        self.elapsed_time = 0.0
+        self.tokens = {field: 0 for field in USAGE_FIELDS}
+
+    def add_result(self, result: Dict[str, Any]) -> None:
+        """
+        Count an LLM call result
+
+        Args:
+            result: Result returned by a provider
+        """
+        self.calls += 1
+        self.elapsed_time += result.get("elapsed_time") or 0.0
+        if not result.get("success", False):
+            self.failed_calls += 1
+
+        # Cache hits and coalesced followers did not spend any tokens
+        if result.get("cached") or result.get("coalesced"):
+            self.cached_calls += 1
+            return
+        for field, value in (result.get("usage") or {}).items():
+            if field in self.tokens:
+                self.tokens[field] += value or 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for API responses"""
+        return {
+            "calls": self.calls,
+            "cached_calls": self.cached_calls,
+            "failed_calls": self.failed_calls,
+            "elapsed_time": self.elapsed_time,
+            **self.tokens,
+        }
+
+
+# Counters of the enclosing ``track_usage`` blocks, innermost last
+_current_usage: ContextVar[Tuple[UsageCounter, ...]] = ContextVar("llm_usage", default=())
+_agent_usage: Dict[str, UsageCounter] = {}
+_agent_usage_lock = threading.Lock()
+
+
+@contextmanager
+def track_usage(counter: Optional[UsageCounter] = None) -> Iterator[UsageCounter]:
+    """
+    Collect the usage of LLM calls made inside the block
+
+    Blocks can be nested; a call counts towards every enclosing block.
+
+    Args:
+        counter: Optional counter to collect into, created if not provided
+
+    Yields:
+        Counter that receives every call made through an agent provider
+        view in the current context
+    """
+    if counter is None:
+        counter = UsageCounter()
+    token = _current_usage.set(_current_usage.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _current_usage.reset(token)
+
+
+def record_usage(agent_type: Optional[str], result: Dict[str, Any]) -> None:
+    """
+    Record an LLM call result for the current execution and the agent type
+
+    Args:
+        agent_type: Agent type that made the call
+        result: Result returned by a provider
+    """
+    for current in _current_usage.get():
+        current.add_result(result)
+
+    with _agent_usage_lock:
+        counter = _agent_usage.setdefault(agent_type or "unknown", UsageCounter())
+        counter.add_result(result)
+
+
+def get_usage_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get cumulative usage per agent type since process start
+
+    Returns:
+        Mapping of agent type to its counters
+    """
+    with _agent_usage_lock:
+        return {agent_type: counter.to_dict() for agent_type, counter in _agent_usage.items()}
+
+
+def sum_usage(*usages: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Add up usage dictionaries
+
+    Args:
+        *usages: Usage dictionaries, ``None`` entries are skipped
+
+    Returns:
+        Field-wise sum
+    """
+    total: Dict[str, Any] = {}
+    for usage in usages:
+        for field, value in (usage or {}).items():
+            if isinstance(value, (int, float)):
+                total[field] = total.get(field, 0) + value
+    return total
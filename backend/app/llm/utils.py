@@ -30,6 +30,12 @@ def extract_json_from_text(text: Union[str, Dict, List, Any]) -> Any:
         # If already a dict or list, return as is
         if isinstance(text, (dict, list)):
             return text
+        
+        # Schema-constrained responses are plain JSON; skip the regex passes
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
             
         # For text outputs, try to extract JSON
         # First, check for code blocks with ```json
@@ -76,12 +82,6 @@ def extract_json_from_text(text: Union[str, Dict, List, Any]) -> Any:
                 json_str = re.sub(r'//.*?$', '', json_str, flags=re.MULTILINE)  # Remove comments
                 return json.loads(json_str)
         
-        # If text is already valid JSON, parse it directly
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
-        
         logger.warning(f"Could not extract JSON from text: {text[:100]}...")
         return {}
     except Exception as e:
@@ -0,0 +1,64 @@
+from sqlalchemy import Column, String, JSON, ForeignKey, Text, Integer, Float, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+from backend.app.db.base import TimestampedBase
+
+class PipelineRun(TimestampedBase):
+    """
+    Model for storing a pipeline run
+
+    Records what a run was started with, so a failed run can be resumed
+    without the caller resending its input.
+    """
+    __tablename__ = "pipeline_runs"
+
+    # The run ID is the pipeline ID
+    id = Column(String(255), primary_key=True)
+
+    # Pipeline name or list of step configurations
+    pipeline_config = Column(JSON, nullable=True)
+    initial_input = Column(JSON, nullable=True)
+    system_prompt = Column(Text, nullable=True)
+
+    # Status information
+    status = Column(String(50), nullable=False, default="running")  # running, completed, failed
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=1, nullable=False)
+
+    step_outputs = relationship("PipelineStepOutput", back_populates="run",
+                                cascade="all, delete-orphan", order_by="PipelineStepOutput.created_at")
+
+    def __repr__(self):
+        return f"<PipelineRun id={self.id} status={self.status} attempts={self.attempts}>"
+
+
+class PipelineStepOutput(TimestampedBase):
+    """
+    Model for storing the output of a completed pipeline step
+
+    Outputs are keyed by a hash of the step's input, so a resumed run reuses
+    an output only if the step would receive exactly the same input.
+    """
+    __tablename__ = "pipeline_step_outputs"
+    __table_args__ = (
+        UniqueConstraint("run_id", "step_name", "input_hash", name="uq_pipeline_step_output"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String(255), ForeignKey("pipeline_runs.id"), nullable=False, index=True)
+    step_name = Column(String(255), nullable=False)
+    input_hash = Column(String(64), nullable=False)
+
+    # Agent response
+    agent_id = Column(String(255), nullable=False)
+    agent_name = Column(String(255), nullable=False)
+    text = Column(Text, nullable=False)
+    output_data = Column(JSON, nullable=False, default=dict)
+    response_metadata = Column(JSON, nullable=False, default=dict)
+    elapsed_time = Column(Float, nullable=False, default=0.0)
+
+    # Relationship
+    run = relationship("PipelineRun", back_populates="step_outputs")
+
+    def __repr__(self):
+        return f"<PipelineStepOutput run_id={self.run_id} step={self.step_name}>"
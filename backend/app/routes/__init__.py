@@ -9,6 +9,8 @@ from backend.app.routes import (
     agents,
     feedback,
     comparisons,
+    llm,
+    jobs,
 )
 
 # Create main API router
@@ -48,6 +50,14 @@ tag_descriptions = [
         "name": "comparisons",
         "description": "Operations for comparing different question generation strategies"
     },
+    {
+        "name": "llm",
+        "description": "Operations for inspecting the LLM provider layer"
+    },
+    {
+        "name": "jobs",
+        "description": "Operations for background generation jobs"
+    },
     {
         "name": "enhanced",
         "description": "Enhanced endpoints using OpenAI Agents SDK for sophisticated multi-agent workflows"
@@ -71,3 +81,5 @@ api_router.include_router(pipeline.router, prefix="/pipeline")
 api_router.include_router(agents.router, prefix="/agents")
 api_router.include_router(feedback.router, prefix="/feedback")
 api_router.include_router(comparisons.router, prefix="/comparisons")
+api_router.include_router(llm.router, prefix="/llm")
+api_router.include_router(jobs.router, prefix="/jobs")
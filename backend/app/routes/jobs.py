@@ -0,0 +1,107 @@
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
+import logging
+
+from backend.app.schemas.question import QuestionGenerationInput
+from backend.app.services.jobs import get_job_queue, COMPLETED
+from backend.app.services.question_service import GENERATE_QUESTIONS_JOB
+
+# Setup logger
+logger = logging.getLogger("app.routes.jobs")
+
+# Create router
+router = APIRouter(
+    tags=["jobs"]
+)
+
+# Models
+class JobResponse(BaseModel):
+    """Status of a background job"""
+    id: str
+    kind: str
+    status: str
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+
+async def _get_job(job_id: str) -> Dict[str, Any]:
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID {job_id} not found"
+        )
+    return job
+
+# Routes
+@router.post("/questions/generate", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_question_generation(input_data: QuestionGenerationInput):
+    """
+    Queue question generation as a background job
+
+    Returns at once with the job ID; poll ``/jobs/{job_id}`` for its status
+    and fetch the generated questions from ``/jobs/{job_id}/result``.
+    """
+    if not input_data.outline_id and not input_data.content:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either outline_id or content is required"
+        )
+    job = await get_job_queue().submit(GENERATE_QUESTIONS_JOB, input_data.model_dump())
+    return job
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_job_stats():
+    """
+    Get job queue counters
+
+    Counters cover jobs finished by this process since it started.
+    """
+    return await get_job_queue().get_stats()
+
+@router.get("/dead-letter", response_model=List[JobResponse])
+async def list_dead_letter_jobs(limit: int = 100):
+    """
+    List jobs that failed on every attempt, newest first
+    """
+    return await get_job_queue().dead_letters(limit)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Get the status of a job
+    """
+    return await _get_job(job_id)
+
+@router.get("/{job_id}/result", response_model=Dict[str, Any])
+async def get_job_result(job_id: str):
+    """
+    Get the result of a completed job
+    """
+    job = await _get_job(job_id)
+    if job["status"] != COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job {job_id} is {job['status']}, not completed"
+        )
+    return job["result"]
+
+@router.post("/{job_id}/retry", response_model=JobResponse)
+async def retry_job(job_id: str):
+    """
+    Queue a dead-lettered job again
+    """
+    job = await _get_job(job_id)
+    requeued = await get_job_queue().retry(job_id)
+    if requeued is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job {job_id} is {job['status']}, only dead-lettered jobs can be retried"
+        )
+    logger.info(f"Retrying job {job_id}")
+    return requeued
@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+import logging
+
+from backend.app.llm import get_llm_provider
+from backend.app.llm.usage import get_usage_stats
+
+# Setup logger
+logger = logging.getLogger("app.routes.llm")
+
+# Create router
+router = APIRouter(
+    tags=["llm"]
+)
+
+# Routes
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_llm_stats():
+    """
+    Get runtime counters for the LLM provider layer
+    
+    Includes response cache hits and misses when caching is enabled.
+    """
+    return get_llm_provider().get_stats()
+
+@router.get("/usage", response_model=Dict[str, Any])
+async def get_llm_usage():
+    """
+    Get cumulative LLM calls, tokens and latency per agent type
+    
+    Counters cover every call since the process started.
+    """
+    return get_usage_stats()
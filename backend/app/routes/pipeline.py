@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Any
+import json
 import logging
+import time
 
-from backend.app.agents import AgentFactory, execute_agent_pipeline
-from backend.app.agents.pipeline import PipelineStep
+from backend.app.agents import AgentFactory, AgentPipeline, PipelineCheckpointStore, execute_agent_pipeline, resume_pipeline
+from backend.app.agents.pipeline import get_speculation_stats
+from backend.app.config import get_settings
+from backend.app.core.cancellation import CLIENT_CLOSED_REQUEST, ClientDisconnected, cancel_on_disconnect
 from backend.app.db.session import get_db
+from backend.app.dependencies import admit_generation, too_many_requests
+from backend.app.services.admission import Overloaded, get_admission_controller
 from sqlalchemy.orm import Session
 
 # Setup logger
@@ -22,12 +30,17 @@ class PipelineStepConfig(BaseModel):
     description: Optional[str] = None
     system_prompt: Optional[str] = None
     params: Dict[str, Any] = Field(default_factory=dict)
+    depends_on: Optional[List[str]] = None  # Steps whose outputs this step takes; defaults to the previous step
+    when: Optional[Dict[str, Any]] = None  # Condition on upstream output_data; the step is skipped if it does not hold
+    timeout: Optional[float] = None  # Time budget for the step in seconds
+    speculate: Optional[Dict[str, Any]] = None  # Predicted inputs to start the step on early; see StepSpeculation
 
 class PipelineExecuteRequest(BaseModel):
     """Request to execute a pipeline"""
     steps: List[PipelineStepConfig]
     initial_prompt: str
     system_prompt: Optional[str] = None
+    run_id: Optional[str] = None  # Run ID to resume under; generated if not provided
 
 class PipelineStepResult(BaseModel):
     """Result of a pipeline step"""
@@ -43,43 +56,197 @@ class PipelineExecuteResponse(BaseModel):
     elapsed_time: float
     success: bool
     error: Optional[str] = None
+    timed_out: bool = False  # The deadline passed; final_output is the best partial result
     steps: List[PipelineStepResult]
     final_output: Optional[str] = None
     final_data: Optional[Dict[str, Any]] = None
 
+class PipelineRunResponse(BaseModel):
+    """Status of a checkpointed pipeline run"""
+    run_id: str
+    status: str
+    error: Optional[str] = None
+    attempts: int
+    completed_steps: List[str]
+
+def request_deadline() -> Optional[float]:
+    """Deadline for a pipeline started now, from `pipeline.timeout` in settings.yml"""
+    timeout = (get_settings().get_settings_config().get("pipeline") or {}).get("timeout")
+    return time.time() + timeout if timeout else None
+
 # Routes
 @router.get("/agent-types", response_model=List[str])
 async def get_available_agent_types():
     """Get list of available agent types for pipelines"""
     return AgentFactory.list_agent_types()
 
-@router.post("/execute", response_model=PipelineExecuteResponse)
+@router.get("/speculation", response_model=Dict[str, Any])
+async def get_pipeline_speculation_stats():
+    """
+    Get outcomes of speculatively started steps since the process started
+    
+    Compare `saved_time` (step latency saved by kept outputs) with
+    `wasted_usage` (tokens of discarded outputs) to judge speculation.
+    """
+    return get_speculation_stats()
+
+@router.post("/execute", response_model=PipelineExecuteResponse, dependencies=[Depends(admit_generation)])
 async def execute_pipeline(
     request: PipelineExecuteRequest,
+    http_request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Execute an agent pipeline
     
-    Executes a sequence of agents where the output of each agent is passed as
-    input to the next agent.
+    Executes a graph of agents where the output of each agent is passed as
+    input to the steps that depend on it (by default, the next step).
+    Independent steps run concurrently. Step outputs are checkpointed under
+    the returned `pipeline_id`, so a failed run can be resumed with
+    `/runs/{run_id}/resume`. The run is cancelled if the client
+    disconnects, and can be resumed the same way. Under load the request
+    waits for a generation slot, or is rejected with 429 and a Retry-After
+    header.
     """
     try:
         # Convert request to step configs
         step_configs = [step.dict() for step in request.steps]
         
         # Execute pipeline
-        result = await execute_agent_pipeline(
+        result = await cancel_on_disconnect(http_request, execute_agent_pipeline(
             step_configs=step_configs,
-            initial_prompt=request.initial_prompt,
-            system_prompt=request.system_prompt
-        )
+            initial_input=request.initial_prompt,
+            system_prompt=request.system_prompt,
+            pipeline_id=request.run_id,
+            checkpoints=PipelineCheckpointStore(),
+            deadline=request_deadline()
+        ))
         
         # Return result
         return result
+    except ClientDisconnected as e:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error executing pipeline: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error executing pipeline: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format an event as a server-sent events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/execute/stream")
+async def execute_pipeline_stream(request: PipelineExecuteRequest):
+    """
+    Execute an agent pipeline, streaming progress as server-sent events
+    
+    Emits `step_start` and `step_end` events at step boundaries, `token`
+    events with the final step's output as it is generated, and a closing
+    `result` (or `error`) event with the same payload as `/execute`.
+    The run is cancelled if the client disconnects, and admitted like
+    `/execute`.
+    """
+    try:
+        step_configs = [step.dict() for step in request.steps]
+        pipeline = AgentPipeline.from_config(
+            step_configs,
+            pipeline_id=request.run_id,
+            checkpoints=PipelineCheckpointStore()
+        )
+    except Exception as e:
+        logger.error(f"Error creating pipeline: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error creating pipeline: {str(e)}"
+        )
+    
+    # Hold the generation slot until the stream ends, not until the response starts
+    admission = get_admission_controller()
+    try:
+        await admission.acquire()
+    except Overloaded as e:
+        raise too_many_requests(e)
+    start_time = time.monotonic()
+    released = False
+    
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            admission.release(time.monotonic() - start_time)
+    
+    async def event_stream():
+        events = pipeline.execute_stream(
+            initial_input=request.initial_prompt,
+            system_prompt=request.system_prompt,
+            deadline=request_deadline()
+        )
+        try:
+            async for event, data in events:
+                yield format_sse(event, data)
+        finally:
+            # Stops the pipeline now when the response is cancelled on disconnect
+            await events.aclose()
+            release()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also runs if the client left before the stream started
+        background=BackgroundTask(release)
+    )
+
+@router.get("/runs/{run_id}", response_model=PipelineRunResponse)
+async def get_pipeline_run(run_id: str):
+    """Get the status and completed steps of a pipeline run"""
+    run = await PipelineCheckpointStore().get_run(run_id)
+    if run is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Pipeline run not found: {run_id}"
+        )
+    return run
+
+@router.get("/admission", response_model=Dict[str, Any])
+async def get_admission_stats():
+    """
+    Get admission control counters for this worker
+    
+    Includes in-flight generation requests, queue depth and rejections
+    (429 responses) since the process started.
+    """
+    return get_admission_controller().get_stats()
+
+@router.post("/runs/{run_id}/resume", response_model=PipelineExecuteResponse, dependencies=[Depends(admit_generation)])
+async def resume_pipeline_run(run_id: str, http_request: Request):
+    """
+    Resume a pipeline run from its first incomplete step
+    
+    Re-executes the run with its original steps and input. Steps that
+    completed in an earlier attempt return their stored output without
+    calling the LLM. The run is cancelled if the client disconnects.
+    """
+    try:
+        result = await cancel_on_disconnect(http_request, resume_pipeline(run_id, deadline=request_deadline()))
+    except ClientDisconnected as e:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Pipeline run not found: {run_id}"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error resuming pipeline run {run_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error resuming pipeline run: {str(e)}"
+        )
+    return result.to_dict()
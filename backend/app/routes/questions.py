@@ -1,5 +1,5 @@
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Request
 from sqlalchemy.orm import Session
 from datetime import datetime
 
@@ -18,7 +18,10 @@ from backend.app.schemas.question import (
 )
 from backend.app.services.question_service import QuestionService
 from backend.app.agents.factory import AgentFactory
+from backend.app.core.cancellation import CLIENT_CLOSED_REQUEST, ClientDisconnected, cancel_on_disconnect
 from backend.app.core.logging import get_logger
+from backend.app.dependencies import too_many_requests
+from backend.app.services.admission import Overloaded
 
 # Create router
 router = APIRouter(
@@ -121,27 +124,35 @@ def delete_question(
 @router.post("/generate", response_model=QuestionGenerationResult)
 async def generate_questions(
     input_data: QuestionGenerationInput,
+    http_request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Generate questions based on input data using the agent pipeline
     
     This endpoint uses the configured agent pipeline to generate questions
-    from an outline or specific input text.
+    from an outline or specific input text. Generation is cancelled if the
+    client disconnects. Under load each question's pipeline waits for a
+    generation slot; if none is admitted the request is rejected with 429
+    and a Retry-After header.
     """
     question_service = QuestionService(db)
     try:
         logger.info(f"Starting question generation with input: {input_data.content[:50]}...")
         logger.info(f"Using question type: {input_data.question_type}, complexity: {input_data.complexity}, count: {input_data.count}")
         
-        result = await question_service.generate_questions(
+        result = await cancel_on_disconnect(http_request, question_service.generate_questions(
             input_data.outline_id, 
             input_data.content,
             input_data.question_type,
             input_data.complexity,
             input_data.count
-        )
+        ))
         return result
+    except ClientDisconnected as e:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except Overloaded as e:
+        raise too_many_requests(e)
     except TypeError as e:
         # Specifically handle TypeError that contains NoneType and iterable to provide better diagnostics
         if "NoneType" in str(e) and "iterable" in str(e):
@@ -240,13 +251,19 @@ def get_question_stats(
 @router.post("/generate/preview", response_model=QuestionGenerationResult)
 async def generate_questions_preview(
     request: QuestionGenerationInput,
+    http_request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Generate questions without saving to database (preview mode)
     
+    Generation is cancelled if the client disconnects. Under load each
+    question's pipeline waits for a generation slot; if none is admitted
+    the request is rejected with 429 and a Retry-After header.
+    
     Args:
         request: Question generation input
+        http_request: HTTP request, watched for client disconnects
         
     Returns:
         Generated questions result
@@ -257,15 +274,19 @@ async def generate_questions_preview(
         logger.info(f"Using question type: {request.question_type}, complexity: {request.complexity}, count: {request.count}")
         
         # Generate questions but don't save to database
-        result = await question_service.generate_questions_preview(
+        result = await cancel_on_disconnect(http_request, question_service.generate_questions_preview(
             outline_id=request.outline_id,
             content=request.content,
             question_type=request.question_type,
             complexity=request.complexity,
             count=request.count
-        )
+        ))
         
         return result
+    except ClientDisconnected as e:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except Overloaded as e:
+        raise too_many_requests(e)
     except ValueError as e:
         logger.error(f"Error generating questions: {str(e)}")
         raise HTTPException(
@@ -0,0 +1,52 @@
+from typing import Dict, Any, Optional, List, Union
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+# Shared properties
+class PipelineRunBase(BaseModel):
+    """Base schema for pipeline runs"""
+    pipeline_config: Optional[Union[str, List[Dict[str, Any]]]] = Field(None, description="Pipeline name or step configurations")
+    initial_input: Optional[Union[str, Dict[str, Any]]] = Field(None, description="Initial input of the run")
+    system_prompt: Optional[str] = Field(None, description="System prompt for the first steps")
+
+
+# Properties to receive on run creation
+class PipelineRunCreate(PipelineRunBase):
+    """Schema for creating a pipeline run"""
+    id: str = Field(description="Run ID (the pipeline ID)")
+    status: str = Field("running", description="Run status")
+
+
+# Properties to receive on run update
+class PipelineRunUpdate(BaseModel):
+    """Schema for updating a pipeline run"""
+    status: Optional[str] = Field(None, description="Run status")
+    error: Optional[str] = Field(None, description="Error of the failed step")
+    attempts: Optional[int] = Field(None, description="Number of times the run was executed")
+
+
+# Completed step output
+class PipelineStepOutput(BaseModel):
+    """Schema for a stored step output"""
+    step_name: str
+    input_hash: str
+    agent_name: str
+    elapsed_time: float
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+# Properties to return to client
+class PipelineRun(PipelineRunBase):
+    """Schema for pipeline run responses"""
+    id: str
+    status: str
+    error: Optional[str]
+    attempts: int
+    step_outputs: List[PipelineStepOutput] = Field(default_factory=list)
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
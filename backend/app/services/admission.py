@@ -0,0 +1,181 @@
+"""
+Admission control for generation requests.
+
+Each worker process runs at most ``max_in_flight`` pipelines at once. A
+pipeline route holds one slot per request; question generation holds one
+per pipeline it fans out into, whether it runs for an HTTP request or a
+queued job. Pipelines beyond that wait in a FIFO queue of at most
+``max_queue`` entries for at most ``max_queue_time`` seconds. A pipeline is
+rejected at once when the queue is full or when the expected wait (queue
+position times the average pipeline duration, divided by the slots) exceeds
+the queue time, so under a burst some requests fail fast with a
+``Retry-After`` hint instead of every request missing its deadline.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from backend.app.config import get_settings
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when a request is not admitted"""
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded, time-limited wait queue
+    """
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize controller
+
+        Args:
+            config: Admission configuration (``admission`` in settings.yml)
+        """
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.max_in_flight = max(1, config.get("max_in_flight", 8))
+        self.max_queue = max(0, config.get("max_queue", 16))
+        self.max_queue_time = config.get("max_queue_time", 10.0)
+        self.duration_smoothing = config.get("duration_smoothing", 0.2)
+
+        self.in_flight = 0
+        self.avg_duration: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_wait = 0
+        self.timed_out = 0
+
+    def retry_after(self) -> int:
+        """
+        Seconds after which a rejected request is likely to be admitted
+
+        Returns:
+            Expected time for the queue ahead of a new request to drain, at least 1
+        """
+        if self.avg_duration is None:
+            return max(1, math.ceil(self.max_queue_time or 1))
+        return max(1, math.ceil((len(self._waiters) + 1) * self.avg_duration / self.max_in_flight))
+
+    async def acquire(self) -> None:
+        """
+        Take an in-flight slot, waiting in the queue if needed
+
+        Raises:
+            Overloaded: If the queue is full, the expected wait exceeds the
+                queue time, or no slot was freed within the queue time
+        """
+        if not self.enabled:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise self._reject(f"Too many generation requests ({self.in_flight} running, {len(self._waiters)} queued)")
+        expected_wait = (
+            (len(self._waiters) + 1) * self.avg_duration / self.max_in_flight
+            if self.avg_duration is not None else 0.0
+        )
+        if self.max_queue_time and expected_wait > self.max_queue_time:
+            self.rejected_wait += 1
+            raise self._reject(f"Expected queue time {expected_wait:.1f}s exceeds {self.max_queue_time}s")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            # The slot is handed over by release(), already counted in flight
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_queue_time or None)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # Handed a slot just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise self._reject(f"No generation slot freed within {self.max_queue_time}s")
+            raise
+        self.admitted += 1
+
+    def _reject(self, reason: str) -> Overloaded:
+        retry_after = self.retry_after()
+        logger.warning(f"Rejecting generation request: {reason} (retry after {retry_after}s)")
+        return Overloaded(reason, retry_after)
+
+    def release(self, duration: Optional[float] = None) -> None:
+        """
+        Free an in-flight slot, handing it to the oldest queued request
+
+        Args:
+            duration: Time the request held the slot, in seconds
+        """
+        if duration is not None:
+            if self.avg_duration is None:
+                self.avg_duration = duration
+            else:
+                self.avg_duration += self.duration_smoothing * (duration - self.avg_duration)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """
+        Hold an in-flight slot for the duration of the block
+
+        Raises:
+            Overloaded: If the request is not admitted
+        """
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get admission counters"""
+        return {
+            "enabled": self.enabled,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected_queue_full + self.rejected_wait + self.timed_out,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_expected_wait": self.rejected_wait,
+            "rejected_queue_timeout": self.timed_out,
+            "avg_duration": self.avg_duration,
+        }
+
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    """Get the admission controller configured in settings.yml"""
+    return AdmissionController(get_settings().get_settings_config().get("admission"))
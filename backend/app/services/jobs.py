@@ -0,0 +1,484 @@
+"""
+Background job queue for long-running generation work.
+
+Requests submit a job and get its ID back at once; a pool of asyncio workers
+runs the jobs, so HTTP latency no longer depends on LLM latency and
+generation concurrency is sized by the number of workers. Jobs are brokered
+through Redis, shared by every worker process, or through an in-process
+queue when Redis is not configured or unreachable at startup.
+
+A failed job is retried with exponential backoff up to ``max_attempts``
+times; after that it is moved to the dead-letter list, from which it can be
+inspected and queued again. Retries waiting out their backoff are kept by
+the broker, so they survive a restart of the workers. With Redis, a job
+taken by a worker stays in a processing list until its attempt ends; jobs
+left there by a crashed worker are queued again when the workers start.
+"""
+import asyncio
+import heapq
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.app.config import get_settings
+from backend.app.db.cache import get_redis, get_cache_key
+from backend.app.llm.deadline import deadline_scope
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# Async function running a job: receives the job payload and ID, returns its
+# result. The ID is the same on every attempt, so handlers can key resumable
+# work by it.
+JobHandler = Callable[[Dict[str, Any], str], Awaitable[Dict[str, Any]]]
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+DEAD = "dead"  # Failed on every attempt; kept in the dead-letter list
+
+# Atomically move the delayed jobs due by ARGV[1] to the queue, so each is
+# queued by exactly one worker process. Returns the number of jobs moved.
+PUSH_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, job_id in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('LPUSH', KEYS[2], job_id)
+end
+return #due
+"""
+
+
+class InMemoryJobBroker:
+    """
+    Job broker local to this process
+    """
+    name = "memory"
+
+    def __init__(self, max_jobs: int = 1000):
+        """
+        Initialize broker
+
+        Args:
+            max_jobs: Maximum number of job records kept; the oldest
+                finished jobs are dropped first
+        """
+        self.max_jobs = max_jobs
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dead: List[str] = []
+        self._delayed: List[Tuple[float, str]] = []  # Heap of (due time, job ID)
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["id"]] = job
+        self._jobs.move_to_end(job["id"])
+        if len(self._jobs) > self.max_jobs:
+            for job_id in [i for i, j in self._jobs.items() if j["status"] in (COMPLETED, DEAD)]:
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                del self._jobs[job_id]
+                if job_id in self._dead:
+                    self._dead.remove(job_id)
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def push(self, job_id: str) -> None:
+        self._queue.put_nowait(job_id)
+
+    async def pop(self, timeout: float) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def ack(self, job_id: str) -> None:
+        # Queued jobs do not outlive this process, so nothing tracks taken jobs
+        pass
+
+    async def unacked(self) -> List[str]:
+        return []
+
+    async def requeue(self, job_id: str) -> None:
+        await self.push(job_id)
+
+    async def schedule(self, job_id: str, due: float) -> None:
+        heapq.heappush(self._delayed, (due, job_id))
+
+    async def push_due(self) -> int:
+        now = time.time()
+        pushed = 0
+        while self._delayed and self._delayed[0][0] <= now:
+            _, job_id = heapq.heappop(self._delayed)
+            self._queue.put_nowait(job_id)
+            pushed += 1
+        return pushed
+
+    async def bury(self, job_id: str) -> None:
+        self._dead.append(job_id)
+
+    async def unbury(self, job_id: str) -> bool:
+        if job_id not in self._dead:
+            return False
+        self._dead.remove(job_id)
+        return True
+
+    async def dead_letters(self, limit: int) -> List[str]:
+        return list(reversed(self._dead))[:limit]
+
+    async def queue_length(self) -> int:
+        return self._queue.qsize()
+
+
+class RedisJobBroker:
+    """
+    Job broker shared by every worker process through Redis
+
+    Job IDs are queued in a Redis list; job records are JSON values that
+    expire ``ttl`` seconds after their last update. A popped job ID is moved
+    atomically to a processing list and stays there until acknowledged, and
+    delayed retries wait in a sorted set scored by their due time.
+    """
+    name = "redis"
+
+    def __init__(self, key_prefix: str = "jobs", ttl: int = 86400):
+        """
+        Initialize broker
+
+        Args:
+            key_prefix: Prefix of the Redis keys
+            ttl: Lifetime of job records in seconds
+        """
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.queue_key = get_cache_key(key_prefix, "queue")
+        self.dead_key = get_cache_key(key_prefix, "dead")
+        self.processing_key = get_cache_key(key_prefix, "processing")
+        self.delayed_key = get_cache_key(key_prefix, "delayed")
+
+    def _job_key(self, job_id: str) -> str:
+        return get_cache_key(self.key_prefix, "job", job_id)
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        await get_redis().set(self._job_key(job["id"]), json.dumps(job, default=str), ex=self.ttl)
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await get_redis().get(self._job_key(job_id))
+        return json.loads(raw) if raw else None
+
+    async def push(self, job_id: str) -> None:
+        await get_redis().lpush(self.queue_key, job_id)
+
+    async def pop(self, timeout: float) -> Optional[str]:
+        return await get_redis().blmove(
+            self.queue_key, self.processing_key, max(1, int(timeout)), src="RIGHT", dest="LEFT"
+        )
+
+    async def ack(self, job_id: str) -> None:
+        await get_redis().lrem(self.processing_key, 1, job_id)
+
+    async def unacked(self) -> List[str]:
+        return await get_redis().lrange(self.processing_key, 0, -1)
+
+    async def requeue(self, job_id: str) -> None:
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.lrem(self.processing_key, 1, job_id)
+            pipe.lpush(self.queue_key, job_id)
+            await pipe.execute()
+
+    async def schedule(self, job_id: str, due: float) -> None:
+        await get_redis().zadd(self.delayed_key, {job_id: due})
+
+    async def push_due(self) -> int:
+        return await get_redis().eval(PUSH_DUE_SCRIPT, 2, self.delayed_key, self.queue_key, time.time())
+
+    async def bury(self, job_id: str) -> None:
+        await get_redis().lpush(self.dead_key, job_id)
+
+    async def unbury(self, job_id: str) -> bool:
+        return await get_redis().lrem(self.dead_key, 1, job_id) > 0
+
+    async def dead_letters(self, limit: int) -> List[str]:
+        return await get_redis().lrange(self.dead_key, 0, limit - 1)
+
+    async def queue_length(self) -> int:
+        return await get_redis().llen(self.queue_key)
+
+
+class JobQueue:
+    """
+    Queue of background jobs run by a pool of asyncio workers
+    """
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize queue
+
+        Args:
+            config: Job configuration (``jobs`` in settings.yml)
+        """
+        config = config or {}
+        self.workers = max(1, config.get("workers", 2))
+        self.max_attempts = max(1, config.get("max_attempts", 3))
+        self.retry_delay = config.get("retry_delay", 5.0)
+        self.timeout = config.get("timeout")
+        self.stale_after = config.get("stale_after", 960.0)
+        self.use_redis = config.get("broker", "redis") == "redis"
+        self.broker = InMemoryJobBroker(config.get("max_jobs", 1000))
+        self._redis_broker = RedisJobBroker(config.get("key_prefix", "jobs"), config.get("ttl", 86400))
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.completed = 0
+        self.retried = 0
+        self.dead = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """
+        Register the handler of a job kind
+
+        Args:
+            kind: Job kind, e.g. ``generate_questions``
+            handler: Async function receiving the payload and job ID and
+                returning the result
+        """
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        """Choose the broker and start the workers"""
+        if self._tasks:
+            return
+        if self.use_redis:
+            try:
+                await get_redis().ping()
+                self.broker = self._redis_broker
+            except Exception as e:
+                logger.warning(f"Job queue falling back to the in-process broker, Redis is unavailable: {str(e)}")
+
+        await self._recover()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers ({self.broker.name} broker)")
+
+    async def stop(self) -> None:
+        """Stop the workers; running jobs are cancelled and queued again"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Stopped job workers")
+
+    async def _recover(self) -> None:
+        """Queue again the jobs a stopped worker took but did not finish"""
+        try:
+            job_ids = await self.broker.unacked()
+        except Exception as e:
+            logger.error(f"Could not list unfinished jobs: {str(e)}")
+            return
+
+        for job_id in job_ids:
+            job = await self.broker.load(job_id)
+            if job is None or job["status"] in (COMPLETED, DEAD):
+                await self.broker.ack(job_id)
+                continue
+            if job["status"] == RUNNING:
+                started_at = datetime.fromisoformat(job["started_at"])
+                if (datetime.utcnow() - started_at).total_seconds() < self.stale_after:
+                    # Probably still running in another worker process
+                    continue
+                if job["attempts"] >= job["max_attempts"]:
+                    # The crashed attempt was its last one
+                    await self.broker.ack(job_id)
+                    await self._failed(job, job["error"] or "Worker stopped during the attempt")
+                    continue
+            logger.warning(f"Requeueing job {job_id}, left {job['status']} by a stopped worker")
+            job["status"] = QUEUED
+            await self.broker.save(job)
+            await self.broker.requeue(job_id)
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a job
+
+        Args:
+            kind: Job kind
+            payload: JSON-serializable handler input
+
+        Returns:
+            The queued job
+
+        Raises:
+            ValueError: If no handler is registered for the kind
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "status": QUEUED,
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        await self.broker.save(job)
+        await self.broker.push(job["id"])
+        logger.info(f"Queued {kind} job {job['id']}")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            The job, or None if it does not exist (or has expired)
+        """
+        return await self.broker.load(job_id)
+
+    async def retry(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Queue a dead-lettered job again, with a fresh set of attempts
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            The queued job, or None if the job is not in the dead-letter list
+        """
+        job = await self.broker.load(job_id)
+        if job is None or not await self.broker.unbury(job_id):
+            return None
+        job.update({"status": QUEUED, "attempts": 0, "error": None, "finished_at": None})
+        await self.broker.save(job)
+        await self.broker.push(job_id)
+        logger.info(f"Requeued dead-lettered job {job_id}")
+        return job
+
+    async def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        List dead-lettered jobs, newest first
+
+        Args:
+            limit: Maximum number of jobs
+
+        Returns:
+            Dead-lettered jobs
+        """
+        jobs = [await self.broker.load(job_id) for job_id in await self.broker.dead_letters(limit)]
+        return [job for job in jobs if job is not None]
+
+    async def _worker(self, index: int) -> None:
+        """Run queued jobs one at a time until cancelled"""
+        while True:
+            try:
+                await self.broker.push_due()
+                job_id = await self.broker.pop(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} could not take a job: {str(e)}")
+                await asyncio.sleep(1.0)
+                continue
+            if job_id is None:
+                continue
+            try:
+                await self._run(job_id)
+            finally:
+                # After a retry is scheduled or the job requeued, so a crash
+                # in between leaves it in the processing list, not lost
+                try:
+                    await self.broker.ack(job_id)
+                except Exception as e:
+                    logger.error(f"Job worker {index} could not acknowledge job {job_id}: {str(e)}")
+
+    async def _run(self, job_id: str) -> None:
+        """Run one attempt of a job and record its outcome"""
+        job = await self.broker.load(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+
+        job.update({"status": RUNNING, "attempts": job["attempts"] + 1, "started_at": datetime.utcnow().isoformat()})
+        await self.broker.save(job)
+        start_time = time.time()
+
+        try:
+            handler = self._handlers[job["kind"]]
+            with deadline_scope(start_time + self.timeout if self.timeout else None):
+                result = await asyncio.wait_for(handler(job["payload"], job_id), self.timeout)
+        except asyncio.CancelledError:
+            # Shutting down: leave the job for another worker
+            job.update({"status": QUEUED, "attempts": job["attempts"] - 1})
+            await self._requeue(job)
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            await self._failed(job, error)
+            return
+
+        job.update({
+            "status": COMPLETED,
+            "result": result,
+            "error": None,
+            "finished_at": datetime.utcnow().isoformat(),
+        })
+        await self.broker.save(job)
+        self.completed += 1
+        logger.info(f"Job {job_id} completed in {time.time() - start_time:.2f}s")
+
+    async def _requeue(self, job: Dict[str, Any]) -> None:
+        await self.broker.save(job)
+        await self.broker.push(job["id"])
+
+    async def _failed(self, job: Dict[str, Any], error: str) -> None:
+        """Schedule a retry of a failed job, or dead-letter it after its last attempt"""
+        job["error"] = error
+        if job["attempts"] < job["max_attempts"]:
+            delay = self.retry_delay * (2 ** (job["attempts"] - 1))
+            logger.warning(
+                f"Job {job['id']} failed (attempt {job['attempts']}/{job['max_attempts']}), "
+                f"retrying in {delay:.1f}s: {error}"
+            )
+            job["status"] = QUEUED
+            await self.broker.save(job)
+            await self.broker.schedule(job["id"], time.time() + delay)
+            self.retried += 1
+            return
+
+        logger.error(f"Job {job['id']} failed after {job['attempts']} attempts, moving it to the dead-letter list: {error}")
+        job.update({"status": DEAD, "finished_at": datetime.utcnow().isoformat()})
+        await self.broker.save(job)
+        await self.broker.bury(job["id"])
+        self.dead += 1
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get queue counters"""
+        try:
+            queued = await self.broker.queue_length()
+        except Exception:
+            queued = None
+        return {
+            "broker": self.broker.name,
+            "workers": len(self._tasks),
+            "queued": queued,
+            "completed": self.completed,
+            "retried": self.retried,
+            "dead": self.dead,
+        }
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    """Get the job queue configured in settings.yml"""
+    return JobQueue(get_settings().get_settings_config().get("jobs"))
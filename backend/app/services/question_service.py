@@ -17,8 +17,14 @@ from backend.app.schemas.question import (
     QuestionOptionCreate
 )
 from backend.app.agents.factory import AgentFactory
-from backend.app.agents.pipeline import AgentPipeline
+from backend.app.agents.pipeline import PipelineResult, execute_pipeline_fan_out
+from backend.app.agents.checkpoints import PipelineCheckpointStore
+from backend.app.config import get_settings
+from backend.app.llm.usage import sum_usage
+from backend.app.llm.deadline import remaining_time
+from backend.app.db.session import SessionLocal
 from backend.app.db.cache import get_redis, cache_set, cache_get, cache_set_json, cache_get_json
+from backend.app.services.admission import get_admission_controller
 from backend.app.services.outlines import OutlineService
 from backend.app.core.outlines import Outline
 from backend.app.core.logging import get_logger
@@ -26,6 +32,9 @@ from backend.app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Job kind of background question generation
+GENERATE_QUESTIONS_JOB = "generate_questions"
+
 
 class QuestionService:
     """
@@ -55,13 +64,112 @@ class QuestionService:
         
         return question_crud.create_with_options(self.db, obj_in=obj_in)
     
+    @staticmethod
+    def _outline_sections(outline: Outline) -> List[str]:
+        """
+        Render each top-level outline section, with its subsections, as text
+        
+        Args:
+            outline: Outline to render
+            
+        Returns:
+            One text per section, or the whole outline if it has no sections
+        """
+        def render(node, depth: int = 0) -> List[str]:
+            parts = [f"{'#' * (depth + 1)} {node.title}"]
+            if node.content:
+                parts.append(node.content)
+            for child in node.children:
+                parts.extend(render(child, depth + 1))
+            return parts
+        
+        nodes = outline.root.children or [outline.root]
+        return ["\n\n".join(render(node)) for node in nodes]
+    
+    @staticmethod
+    def _pipeline_inputs(
+        content: str,
+        sections: List[str],
+        question_type: str,
+        complexity: str,
+        count: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the input of each pipeline instance
+        
+        Each instance generates one question. With outline sections, the
+        instances cycle through the sections so questions cover the outline.
+        
+        Args:
+            content: Full content
+            sections: Outline section texts, if generating from an outline
+            question_type: Type of questions to generate
+            complexity: Complexity level
+            count: Number of questions to generate
+            
+        Returns:
+            Initial input for each pipeline instance
+        """
+        return [
+            {
+                "content": sections[i % len(sections)] if sections else content,
+                "question_type": question_type,
+                "complexity": complexity,
+                "count": 1
+            }
+            for i in range(max(1, count))
+        ]
+    
+    async def _run_pipelines(
+        self,
+        inputs: List[Dict[str, Any]],
+        timeout: Optional[float] = None,
+        run_id: Optional[str] = None
+    ) -> List[PipelineResult]:
+        """
+        Run one question generation pipeline per input, concurrently
+        
+        Each pipeline takes a slot of the admission controller while it
+        runs, for HTTP requests and queued jobs alike.
+        
+        Args:
+            inputs: Initial input of each pipeline instance
+            timeout: Optional time budget in seconds, instead of ``pipeline.timeout``
+            run_id: Optional base run ID of the pipelines; running again with
+                the same ID resumes each branch from its checkpoints
+            
+        Returns:
+            Pipeline results in input order; failed instances have success False
+            
+        Raises:
+            Overloaded: If no pipeline was admitted
+        """
+        pipeline_config = get_settings().get_settings_config().get("pipeline") or {}
+        timeout = timeout or pipeline_config.get("timeout", 110.0)
+        
+        async def on_result(index: int, result: PipelineResult):
+            logger.info(f"Question pipeline {index + 1}/{len(inputs)} finished in {result.elapsed_time:.2f}s: success={result.success}")
+        
+        return await execute_pipeline_fan_out(
+            "question_generation",
+            inputs,
+            max_concurrency=pipeline_config.get("fan_out_concurrency", 4),
+            pipeline_id=run_id,
+            on_result=on_result,
+            checkpoints=PipelineCheckpointStore() if pipeline_config.get("checkpoints", True) else None,
+            deadline=time.time() + timeout if timeout else None,
+            admission=get_admission_controller()
+        )
+    
     async def generate_questions(
         self, 
         outline_id: Optional[int] = None,
         content: Optional[str] = None,
         question_type: str = "multiple-choice",
         complexity: str = "medium",
-        count: int = 3
+        count: int = 3,
+        timeout: Optional[float] = None,
+        run_id: Optional[str] = None
     ) -> QuestionGenerationResult:
         """
         Generate questions from input
@@ -72,18 +180,28 @@ class QuestionService:
             question_type: Type of questions to generate (multiple-choice, short-answer, etc.)
             complexity: Complexity level (low, medium, high)
             count: Number of questions to generate
+            timeout: Optional time budget of the pipelines in seconds, instead
+                of the request deadline ``pipeline.timeout``
+            run_id: Optional base run ID of the pipelines; calling again with
+                the same ID (and input) only re-executes the steps that failed
             
         Returns:
             Generated questions and metadata
+            
+        Raises:
+            ValueError: If no pipeline succeeded; the message lists the
+                failed run IDs
         """
         start_time = time.time()
         
-        # Get outline content if outline_id provided
+        # Get outline sections if outline_id provided
+        sections: List[str] = []
         if outline_id:
-            outline = self.db.query(Outline).filter(Outline.id == outline_id).first()
+            outline = self.outline_service.load_outline(str(outline_id))
             if not outline:
                 raise ValueError(f"Outline with ID {outline_id} not found")
-            content = outline.content
+            sections = self._outline_sections(outline)
+            content = "\n\n".join(sections)
         
         # Ensure we have content
         if not content:
@@ -91,185 +209,182 @@ class QuestionService:
         
         logger.info(f"Starting question generation pipeline with {count} {complexity} {question_type} questions")
         
-        # Build initial input
-        initial_input = {
-            "content": content,
-            "question_type": question_type,
-            "complexity": complexity,
-            "count": count
-        }
+        # One pipeline instance per question, each generating a single question
+        inputs = self._pipeline_inputs(content, sections, question_type, complexity, count)
         
-        # Create and execute pipeline
+        # Create and execute pipelines
         try:
-            logger.info("Creating question generation pipeline")
-            pipeline = AgentPipeline.from_config("question_generation")
+            logger.info(f"Executing {len(inputs)} question generation pipelines")
+            results = await self._run_pipelines(inputs, timeout=timeout, run_id=run_id)
             
-            logger.info("Executing question generation pipeline")
-            result = await pipeline.execute(initial_input)
+            succeeded = [r for r in results if r.success]
+            failed_branches = [{"pipeline_id": r.pipeline_id, "error": r.error} for r in results if not r.success]
+            logger.info(f"Pipeline execution completed: {len(succeeded)}/{len(results)} branches succeeded")
             
-            logger.info(f"Pipeline execution completed: success={result.success}")
-            
-            if not result.success:
-                logger.error(f"Pipeline error: {result.error}")
-                raise ValueError(f"Question generation pipeline failed: {result.error}")
+            if not succeeded:
+                failed_runs = ", ".join(r.pipeline_id for r in results)
+                logger.error(f"Pipeline error in runs {failed_runs}: {results[0].error}")
+                raise ValueError(f"Question generation pipeline failed (runs {failed_runs}): {results[0].error}")
             
             # Process generated questions
             generated_questions = []
             
-            # Extract questions from the response
-            if result.final_response and result.final_response.output_data:
-                # Explicit log for the entire output data
-                logger.info(f"Final response output data raw: {str(result.final_response.output_data)[:500]}")
-                
-                logger.info(f"Got final response output data keys: {result.final_response.output_data.keys()}")
-                logger.info(f"Final response output data type: {type(result.final_response.output_data)}")
-                logger.info(f"Final response output data: {json.dumps(result.final_response.output_data, indent=2)}")
-                
-                # If we have a questions key, use that
-                if "questions" in result.final_response.output_data:
-                    questions_data = result.final_response.output_data.get("questions", [])
-                    logger.info(f"Found questions key in output data with {len(questions_data)} items")
-                else:
-                    # If we don't have a questions key, use the output data as a single question
-                    logger.warning("No questions key in output data, creating from main output data")
-                    questions_data = [{
-                        "text": result.final_response.output_data.get("text", ""),
-                        "options": result.final_response.output_data.get("options", []),
-                        "explanation": result.final_response.output_data.get("explanation", ""),
-                        "references": result.final_response.output_data.get("references", []),
-                        "cognitive_complexity": result.final_response.output_data.get("metadata", {}).get("cognitiveComplexity", "Medium"),
-                        "blooms_taxonomy_level": result.final_response.output_data.get("metadata", {}).get("bloomsLevel", "Application"),
-                        "surgically_appropriate": result.final_response.output_data.get("metadata", {}).get("surgicallyAppropriate", False),
-                        "metadata": result.final_response.output_data.get("metadata", {})
-                    }]
-                
-                # Check if questions_data is None to avoid 'NoneType' is not iterable error
-                if questions_data is None:
-                    questions_data = []
-                    logger.warning("Final response contained None instead of questions list")
-                
-                # Filter out any None items in the questions_data list
-                questions_data = [q for q in questions_data if q is not None]
-                logger.info(f"Extracted {len(questions_data)} questions from pipeline output")
-                
-                # Log each extracted question for debugging
-                for idx, q in enumerate(questions_data):
-                    logger.info(f"Question {idx+1}: {json.dumps(q, indent=2)}")
-                
-                # If no valid questions were found, try to create one from the output_data itself
-                if not questions_data and result.final_response.output_data:
-                    logger.warning("No questions found in output, attempting to create from main output data")
-                    # Extract basic fields from the output data
-                    question_text = result.final_response.output_data.get("text", "")
-                    options = result.final_response.output_data.get("options", [])
-                    explanation = result.final_response.output_data.get("explanation", "")
-                    references = result.final_response.output_data.get("references", [])
+            # Extract questions from each successful branch
+            for result in succeeded:
+                # Extract questions from the response
+                if result.final_response and result.final_response.output_data:
+                    # Explicit log for the entire output data
+                    logger.info(f"Final response output data raw: {str(result.final_response.output_data)[:500]}")
                     
-                    logger.info(f"Direct text field: {question_text[:100]}...")
-                    logger.info(f"Direct options field: {json.dumps(options, indent=2)}")
+                    logger.info(f"Got final response output data keys: {result.final_response.output_data.keys()}")
+                    logger.info(f"Final response output data type: {type(result.final_response.output_data)}")
+                    logger.info(f"Final response output data: {json.dumps(result.final_response.output_data, indent=2)}")
                     
-                    if question_text:
+                    # If we have a questions key, use that
+                    if "questions" in result.final_response.output_data:
+                        questions_data = result.final_response.output_data.get("questions", [])
+                        logger.info(f"Found questions key in output data with {len(questions_data)} items")
+                    else:
+                        # If we don't have a questions key, use the output data as a single question
+                        logger.warning("No questions key in output data, creating from main output data")
                         questions_data = [{
-                            "text": question_text,
-                            "options": options,
-                            "explanation": explanation,
-                            "references": references
+                            "text": result.final_response.output_data.get("text", ""),
+                            "options": result.final_response.output_data.get("options", []),
+                            "explanation": result.final_response.output_data.get("explanation", ""),
+                            "references": result.final_response.output_data.get("references", []),
+                            "cognitive_complexity": result.final_response.output_data.get("metadata", {}).get("cognitiveComplexity", "Medium"),
+                            "blooms_taxonomy_level": result.final_response.output_data.get("metadata", {}).get("bloomsLevel", "Application"),
+                            "surgically_appropriate": result.final_response.output_data.get("metadata", {}).get("surgicallyAppropriate", False),
+                            "metadata": result.final_response.output_data.get("metadata", {})
                         }]
-                        logger.info("Created a single question from main output data")
-                
-                for question_data in questions_data:
-                    # Log the question data being processed
-                    logger.info(f"Processing question data: {json.dumps(question_data, indent=2)}")
                     
-                    # Check if options have the correct format
-                    options = question_data.get("options", [])
-                    formatted_options = []
+                    # Check if questions_data is None to avoid 'NoneType' is not iterable error
+                    if questions_data is None:
+                        questions_data = []
+                        logger.warning("Final response contained None instead of questions list")
                     
-                    for i, opt in enumerate(options):
-                        logger.info(f"Processing option: {json.dumps(opt)}")
-                        
-                        # Check if option is in correct format with 'text' and 'isCorrect' keys
-                        is_correct = False
-                        option_text = ""
-                        
-                        if isinstance(opt, dict):
-                            if "text" in opt:
-                                option_text = opt["text"]
-                            elif "option" in opt:
-                                option_text = opt["option"]
-                            
-                            if "isCorrect" in opt:
-                                is_correct = opt["isCorrect"]
-                            elif "is_correct" in opt:
-                                is_correct = opt["is_correct"]
-                            elif "correct" in opt:
-                                is_correct = opt["correct"]
-                        elif isinstance(opt, str):
-                            option_text = opt
-                            is_correct = False  # Default
-                        
-                        if option_text:
-                            formatted_options.append({
-                                "text": option_text,
-                                "is_correct": is_correct,
-                                "position": i
-                            })
+                    # Filter out any None items in the questions_data list
+                    questions_data = [q for q in questions_data if q is not None]
+                    logger.info(f"Extracted {len(questions_data)} questions from pipeline output")
+                    
+                    # Log each extracted question for debugging
+                    for idx, q in enumerate(questions_data):
+                        logger.info(f"Question {idx+1}: {json.dumps(q, indent=2)}")
                     
-                    # Convert to QuestionCreate schema
-                    try:
-                        # Extract cognitive complexity, blooms level, and surgical appropriateness
-                        cognitive_complexity = question_data.get("cognitive_complexity")
-                        if not cognitive_complexity and "metadata" in question_data:
-                            cognitive_complexity = question_data["metadata"].get("cognitiveComplexity")
+                    # If no valid questions were found, try to create one from the output_data itself
+                    if not questions_data and result.final_response.output_data:
+                        logger.warning("No questions found in output, attempting to create from main output data")
+                        # Extract basic fields from the output data
+                        question_text = result.final_response.output_data.get("text", "")
+                        options = result.final_response.output_data.get("options", [])
+                        explanation = result.final_response.output_data.get("explanation", "")
+                        references = result.final_response.output_data.get("references", [])
                         
-                        blooms_taxonomy_level = question_data.get("blooms_taxonomy_level")
-                        if not blooms_taxonomy_level and "metadata" in question_data:
-                            blooms_taxonomy_level = question_data["metadata"].get("bloomsLevel")
+                        logger.info(f"Direct text field: {question_text[:100]}...")
+                        logger.info(f"Direct options field: {json.dumps(options, indent=2)}")
                         
-                        surgically_appropriate = question_data.get("surgically_appropriate")
-                        if surgically_appropriate is None and "metadata" in question_data:
-                            surgically_appropriate = question_data["metadata"].get("surgicallyAppropriate")
+                        if question_text:
+                            questions_data = [{
+                                "text": question_text,
+                                "options": options,
+                                "explanation": explanation,
+                                "references": references
+                            }]
+                            logger.info("Created a single question from main output data")
+                    
+                    for question_data in questions_data:
+                        # Log the question data being processed
+                        logger.info(f"Processing question data: {json.dumps(question_data, indent=2)}")
                         
-                        # Create the question object
-                        question_create = QuestionCreate(
-                            text=question_data.get("text", ""),
-                            explanation=question_data.get("explanation", ""),
-                            domain=question_data.get("domain", "general"),
-                            cognitive_complexity=cognitive_complexity,
-                            blooms_taxonomy_level=blooms_taxonomy_level,
-                            surgically_appropriate=surgically_appropriate,
-                            options=[
-                                QuestionOptionCreate(**opt) for opt in formatted_options
-                            ]
-                        )
+                        # Check if options have the correct format
+                        options = question_data.get("options", [])
+                        formatted_options = []
                         
-                        # Log formatted question data
-                        logger.info(f"Formatted question: {question_create.text[:50]}...")
-                        logger.info(f"Number of options: {len(question_create.options)}")
+                        for i, opt in enumerate(options):
+                            logger.info(f"Processing option: {json.dumps(opt)}")
+                            
+                            # Check if option is in correct format with 'text' and 'isCorrect' keys
+                            is_correct = False
+                            option_text = ""
+                            
+                            if isinstance(opt, dict):
+                                if "text" in opt:
+                                    option_text = opt["text"]
+                                elif "option" in opt:
+                                    option_text = opt["option"]
+                                
+                                if "isCorrect" in opt:
+                                    is_correct = opt["isCorrect"]
+                                elif "is_correct" in opt:
+                                    is_correct = opt["is_correct"]
+                                elif "correct" in opt:
+                                    is_correct = opt["correct"]
+                            elif isinstance(opt, str):
+                                option_text = opt
+                                is_correct = False  # Default
+                            
+                            if option_text:
+                                formatted_options.append({
+                                    "text": option_text,
+                                    "is_correct": is_correct,
+                                    "position": i
+                                })
                         
-                        # Create the question in DB
-                        question = self.create_question(question_create)
-                        generated_questions.append(question)
-                        logger.info(f"Successfully created question ID: {question.id}")
-                    except Exception as e:
-                        logger.error(f"Error creating question: {str(e)}", exc_info=True)
-            else:
-                logger.warning("No final response or output data from pipeline")
-                logger.info(f"Result object attributes: {dir(result)}")
-                logger.info(f"Result success: {result.success}")
-                if hasattr(result, 'steps') and result.steps:
-                    last_step = result.steps[-1]
-                    logger.info(f"Last step: {last_step[0]}, success: {last_step[1].success}")
-                    if hasattr(last_step[1], 'text'):
-                        logger.info(f"Last step text: {last_step[1].text[:200]}...")
-                    if hasattr(last_step[1], 'output_data'):
-                        logger.info(f"Last step output_data keys: {last_step[1].output_data.keys() if last_step[1].output_data else None}")
-                if result.final_response:
-                    logger.info(f"Final response text: {result.final_response.text[:200]}...")
-                    logger.info(f"Final response success: {result.final_response.success}")
-                    logger.info(f"Final response has output_data: {hasattr(result.final_response, 'output_data')}")
-                    if hasattr(result.final_response, 'output_data'):
-                        logger.info(f"Final response output_data is None: {result.final_response.output_data is None}")
+                        # Convert to QuestionCreate schema
+                        try:
+                            # Extract cognitive complexity, blooms level, and surgical appropriateness
+                            cognitive_complexity = question_data.get("cognitive_complexity")
+                            if not cognitive_complexity and "metadata" in question_data:
+                                cognitive_complexity = question_data["metadata"].get("cognitiveComplexity")
+                            
+                            blooms_taxonomy_level = question_data.get("blooms_taxonomy_level")
+                            if not blooms_taxonomy_level and "metadata" in question_data:
+                                blooms_taxonomy_level = question_data["metadata"].get("bloomsLevel")
+                            
+                            surgically_appropriate = question_data.get("surgically_appropriate")
+                            if surgically_appropriate is None and "metadata" in question_data:
+                                surgically_appropriate = question_data["metadata"].get("surgicallyAppropriate")
+                            
+                            # Create the question object
+                            question_create = QuestionCreate(
+                                text=question_data.get("text", ""),
+                                explanation=question_data.get("explanation", ""),
+                                domain=question_data.get("domain", "general"),
+                                cognitive_complexity=cognitive_complexity,
+                                blooms_taxonomy_level=blooms_taxonomy_level,
+                                surgically_appropriate=surgically_appropriate,
+                                options=[
+                                    QuestionOptionCreate(**opt) for opt in formatted_options
+                                ]
+                            )
+                            
+                            # Log formatted question data
+                            logger.info(f"Formatted question: {question_create.text[:50]}...")
+                            logger.info(f"Number of options: {len(question_create.options)}")
+                            
+                            # Create the question in DB
+                            question = self.create_question(question_create)
+                            generated_questions.append(question)
+                            logger.info(f"Successfully created question ID: {question.id}")
+                        except Exception as e:
+                            logger.error(f"Error creating question: {str(e)}", exc_info=True)
+                else:
+                    logger.warning("No final response or output data from pipeline")
+                    logger.info(f"Result object attributes: {dir(result)}")
+                    logger.info(f"Result success: {result.success}")
+                    if hasattr(result, 'steps') and result.steps:
+                        last_step = result.steps[-1]
+                        logger.info(f"Last step: {last_step[0]}, success: {last_step[1].success}")
+                        if hasattr(last_step[1], 'text'):
+                            logger.info(f"Last step text: {last_step[1].text[:200]}...")
+                        if hasattr(last_step[1], 'output_data'):
+                            logger.info(f"Last step output_data keys: {last_step[1].output_data.keys() if last_step[1].output_data else None}")
+                    if result.final_response:
+                        logger.info(f"Final response text: {result.final_response.text[:200]}...")
+                        logger.info(f"Final response success: {result.final_response.success}")
+                        logger.info(f"Final response has output_data: {hasattr(result.final_response, 'output_data')}")
+                        if hasattr(result.final_response, 'output_data'):
+                            logger.info(f"Final response output_data is None: {result.final_response.output_data is None}")
             
             # Calculate processing time
             processing_time = time.time() - start_time
@@ -280,8 +395,12 @@ class QuestionService:
             result = QuestionGenerationResult(
                 questions=generated_questions,
                 metadata={
-                    "pipeline_id": result.pipeline_id,
-                    "generated_at": datetime.utcnow().isoformat()
+                    "pipeline_id": results[0].pipeline_id,
+                    "pipeline_ids": [r.pipeline_id for r in results],
+                    "failed_branches": failed_branches,
+                    "generated_at": datetime.utcnow().isoformat(),
+                    "usage": sum_usage(*(r.usage for r in results)),
+                    "step_usage": [r.step_usage for r in results]
                 },
                 processing_time=processing_time
             )
@@ -366,12 +485,14 @@ class QuestionService:
         """
         start_time = time.time()
         
-        # Get outline content if outline_id provided
+        # Get outline sections if outline_id provided
+        sections: List[str] = []
         if outline_id:
-            outline = self.db.query(Outline).filter(Outline.id == outline_id).first()
+            outline = self.outline_service.load_outline(str(outline_id))
             if not outline:
                 raise ValueError(f"Outline with ID {outline_id} not found")
-            content = outline.content
+            sections = self._outline_sections(outline)
+            content = "\n\n".join(sections)
         
         # Ensure we have content
         if not content:
@@ -379,92 +500,91 @@ class QuestionService:
         
         logger.info(f"Starting preview question generation pipeline with {count} {complexity} {question_type} questions")
         
-        # Build initial input
-        initial_input = {
-            "content": content,
-            "question_type": question_type,
-            "complexity": complexity,
-            "count": count
-        }
+        # One pipeline instance per question, each generating a single question
+        inputs = self._pipeline_inputs(content, sections, question_type, complexity, count)
         
-        # Create and execute pipeline
+        # Create and execute pipelines
         try:
-            logger.info("Creating preview question generation pipeline")
-            pipeline = AgentPipeline.from_config("question_generation")
+            logger.info(f"Executing {len(inputs)} preview question generation pipelines")
+            results = await self._run_pipelines(inputs)
             
-            logger.info("Executing preview question generation pipeline")
-            result = await pipeline.execute(initial_input)
+            succeeded = [r for r in results if r.success]
+            failed_branches = [{"pipeline_id": r.pipeline_id, "error": r.error} for r in results if not r.success]
+            logger.info(f"Pipeline execution completed: {len(succeeded)}/{len(results)} branches succeeded")
             
-            logger.info(f"Pipeline execution completed: success={result.success}")
+            if not succeeded:
+                logger.error(f"Pipeline error: {results[0].error}")
+                raise ValueError(f"Question generation pipeline failed: {results[0].error}")
             
-            if not result.success:
-                logger.error(f"Pipeline error: {result.error}")
-                raise ValueError(f"Question generation pipeline failed: {result.error}")
-            
-            # Process generated questions - but don't save to database
+            # Process generated questions
             generated_questions = []
             
-            # Extract questions from the response
-            if result.final_response and result.final_response.output_data:
-                logger.info(f"Got final response output data keys: {result.final_response.output_data.keys()}")
-                logger.info(f"Final response output data: {json.dumps(result.final_response.output_data, indent=2)}")
-                
-                questions_data = result.final_response.output_data.get("questions", [])
-                
-                # Return the raw questions data directly without storing in DB
-                logger.info(f"Returning {len(questions_data)} questions directly (preview mode)")
-                
-                # Convert to response format - skipping database storage
-                for question_data in questions_data:
-                    # Process the options to ensure correct format
-                    options = question_data.get("options", [])
+            # Extract questions from each successful branch
+            for result in succeeded:
+                # Extract questions from the response
+                if result.final_response and result.final_response.output_data:
+                    logger.info(f"Got final response output data keys: {result.final_response.output_data.keys()}")
+                    logger.info(f"Final response output data: {json.dumps(result.final_response.output_data, indent=2)}")
                     
-                    # Create a direct response object
-                    question_response = {
-                        "id": str(uuid.uuid4()),  # Generate a temporary ID
-                        "text": question_data.get("text", ""),
-                        "explanation": question_data.get("explanation", ""),
-                        "options": options,
-                        "created_at": datetime.utcnow().isoformat(),
-                        "updated_at": datetime.utcnow().isoformat(),
-                        "metadata": question_data.get("metadata", {})
-                    }
-                    
-                    generated_questions.append(question_response)
-                
-                # If no valid questions were found, try to create one from the output_data itself
-                if not generated_questions and result.final_response.output_data:
-                    logger.warning("No questions found in output, attempting to create from main output data")
-                    
-                    # Extract basic fields from the output data
-                    question_text = result.final_response.output_data.get("text", "")
-                    options = result.final_response.output_data.get("options", [])
-                    explanation = result.final_response.output_data.get("explanation", "")
-                    references = result.final_response.output_data.get("references", [])
+                    questions_data = result.final_response.output_data.get("questions", [])
                     
-                    logger.info(f"Direct text field: {question_text[:100]}...")
-                    logger.info(f"Direct options field: {json.dumps(options, indent=2)}")
+                    # Return the raw questions data directly without storing in DB
+                    logger.info(f"Returning {len(questions_data)} questions directly (preview mode)")
                     
-                    if question_text:
+                    # Convert to response format - skipping database storage
+                    branch_questions = []
+                    for question_data in questions_data:
+                        # Process the options to ensure correct format
+                        options = question_data.get("options", [])
+                        
+                        # Create a direct response object
                         question_response = {
                             "id": str(uuid.uuid4()),  # Generate a temporary ID
-                            "text": question_text,
-                            "explanation": explanation,
+                            "text": question_data.get("text", ""),
+                            "explanation": question_data.get("explanation", ""),
                             "options": options,
                             "created_at": datetime.utcnow().isoformat(),
                             "updated_at": datetime.utcnow().isoformat(),
-                            "metadata": result.final_response.output_data.get("metadata", {})
+                            "metadata": question_data.get("metadata", {})
                         }
                         
-                        generated_questions.append(question_response)
-                        logger.info("Created a single question from main output data (preview mode)")
-            else:
-                logger.warning("No final response or output data from pipeline")
-                if result.final_response:
-                    logger.info(f"Final response text: {result.final_response.text[:200]}...")
-                    logger.info(f"Final response success: {result.final_response.success}")
+                        branch_questions.append(question_response)
+                    
+                    # If this branch found no valid questions, try to create one from its output_data itself
+                    if not branch_questions and result.final_response.output_data:
+                        logger.warning("No questions found in output, attempting to create from main output data")
+                        
+                        # Extract basic fields from the output data
+                        question_text = result.final_response.output_data.get("text", "")
+                        options = result.final_response.output_data.get("options", [])
+                        explanation = result.final_response.output_data.get("explanation", "")
+                        references = result.final_response.output_data.get("references", [])
+                        
+                        logger.info(f"Direct text field: {question_text[:100]}...")
+                        logger.info(f"Direct options field: {json.dumps(options, indent=2)}")
+                        
+                        if question_text:
+                            question_response = {
+                                "id": str(uuid.uuid4()),  # Generate a temporary ID
+                                "text": question_text,
+                                "explanation": explanation,
+                                "options": options,
+                                "created_at": datetime.utcnow().isoformat(),
+                                "updated_at": datetime.utcnow().isoformat(),
+                                "metadata": result.final_response.output_data.get("metadata", {})
+                            }
+                            
+                            branch_questions.append(question_response)
+                            logger.info("Created a single question from main output data (preview mode)")
+                    
+                    generated_questions.extend(branch_questions)
                 else:
-                    logger.warning("Final response is None")
+                    logger.warning("No final response or output data from pipeline")
+                    if result.final_response:
+                        logger.info(f"Final response text: {result.final_response.text[:200]}...")
+                        logger.info(f"Final response success: {result.final_response.success}")
+                    else:
+                        logger.warning("Final response is None")
             
             # Calculate processing time
             processing_time = time.time() - start_time
@@ -475,8 +595,12 @@ class QuestionService:
             return QuestionGenerationResult(
                 questions=generated_questions,
                 metadata={
-                    "pipeline_id": result.pipeline_id,
-                    "generated_at": datetime.utcnow().isoformat()
+                    "pipeline_id": results[0].pipeline_id,
+                    "pipeline_ids": [r.pipeline_id for r in results],
+                    "failed_branches": failed_branches,
+                    "generated_at": datetime.utcnow().isoformat(),
+                    "usage": sum_usage(*(r.usage for r in results)),
+                    "step_usage": [r.step_usage for r in results]
                 },
                 processing_time=processing_time
             )
@@ -715,4 +839,35 @@ class QuestionService:
             status=job_data.get("status", "unknown"),
             message=job_data.get("message", ""),
             results=results
-        ) 
\ No newline at end of file
+        )
+
+
+async def generate_questions_job(payload: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+    """
+    Run a queued question generation job
+
+    The pipelines run under the job ID, so a retried job resumes them from
+    the checkpoints of its failed attempt.
+
+    Args:
+        payload: QuestionGenerationInput fields
+        job_id: Job ID
+
+    Returns:
+        The generation result as JSON
+    """
+    db = SessionLocal()
+    try:
+        result = await QuestionService(db).generate_questions(
+            outline_id=payload.get("outline_id"),
+            content=payload.get("content"),
+            question_type=payload.get("question_type", "multiple-choice"),
+            complexity=payload.get("complexity", "medium"),
+            count=payload.get("count", 3),
+            # The job timeout replaces the HTTP request deadline
+            timeout=remaining_time(),
+            run_id=f"job-{job_id}"
+        )
+        return result.model_dump(mode="json")
+    finally:
+        db.close()
@@ -12,6 +12,9 @@ from typing import Dict, List
 from backend.app.core.logging import configure_logging
 from backend.app.config import get_settings, Settings
 from backend.app.agents.factory import AgentFactory
+from backend.app.agents.state import get_state_store
+from backend.app.services.jobs import get_job_queue
+from backend.app.services.question_service import GENERATE_QUESTIONS_JOB, generate_questions_job
 from backend.app.routes import api_router, tag_descriptions
 
 # Initialize settings
@@ -103,6 +106,11 @@ async def startup_event():
     # Initialize agent factory on startup
     AgentFactory.initialize()
     logger.info("Agent factory initialized")
+    
+    # Start background job workers
+    job_queue = get_job_queue()
+    job_queue.register(GENERATE_QUESTIONS_JOB, generate_questions_job)
+    await job_queue.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -112,6 +120,12 @@ async def shutdown_event():
     # Stop configuration hot-reloading
     settings.stop_hot_reload()
     logger.info("Configuration hot-reloading stopped")
+    
+    # Stop background job workers
+    await get_job_queue().stop()
+    
+    # Write agent states still buffered
+    await get_state_store().close()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
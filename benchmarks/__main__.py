@@ -0,0 +1,92 @@
+"""
+Run the benchmarks from the repository root:
+
+    python -m benchmarks --scenarios pipeline,generate --concurrency 1,4,16
+    python -m benchmarks --compare benchmarks/results/<earlier run>.json
+
+Results are written to ``benchmarks/results``; with ``--compare`` the exit
+status is 1 when a metric regressed by more than ``--threshold``.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the pipeline engine against a simulated LLM backend")
+    parser.add_argument("--scenarios", default="pipeline,generate,batch", help="Comma-separated scenarios: pipeline, generate, batch")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Median simulated LLM latency; 0 for none")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal latency spread; 0 for a fixed latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of LLM calls that fail")
+    parser.add_argument("--error-type", default="server", help="Error type of failed calls, e.g. server or rate_limit")
+    parser.add_argument("--questions", type=int, default=3, help="Questions per generate request")
+    parser.add_argument("--batch-size", type=int, default=10, help="Items per batch request")
+    parser.add_argument("--overhead-runs", type=int, default=20, help="Zero-latency runs measuring per-step overhead")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report the tracemalloc peak (slows every run down)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed of the simulated backend")
+    parser.add_argument("--database-url", default=None, help="Database to use; defaults to a temporary SQLite file")
+    parser.add_argument("--output-dir", default=os.path.join("benchmarks", "results"), help="Directory of the result files")
+    parser.add_argument("--compare", default=None, help="Result file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Show application logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    # The database engine is created on import, so point it at the benchmark
+    # database before importing the application
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    elif "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmarks.db')}"
+
+    from backend.app.core.logging import configure_logging
+    from benchmarks.harness import compare_results, format_report, run_benchmarks, write_results
+
+    configure_logging(log_level="INFO" if args.verbose else "WARNING")
+    if not args.verbose:
+        # Agents log every call, and the engine echoes SQL in debug mode;
+        # keep the output to the report
+        logging.disable(logging.WARNING)
+
+    options = {
+        "scenarios": [name.strip() for name in args.scenarios.split(",") if name.strip()],
+        "concurrency": [int(level) for level in args.concurrency.split(",")],
+        "requests": args.requests,
+        "latency_ms": args.latency_ms,
+        "latency_sigma": args.latency_sigma,
+        "error_rate": args.error_rate,
+        "error_type": args.error_type,
+        "questions": args.questions,
+        "batch_size": args.batch_size,
+        "overhead_runs": args.overhead_runs,
+        "trace_memory": args.trace_memory,
+        "seed": args.seed,
+    }
+    results = asyncio.run(run_benchmarks(options))
+    path = write_results(results, args.output_dir)
+    print(format_report(results))
+    print(f"\nResults written to {path}")
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    rows = compare_results(baseline, results, args.threshold)
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({args.compare}):")
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"   {row['scenario']:<9} {row['metric']:<24} {row['baseline']:>10.2f} -> {row['current']:>10.2f} ({row['change']:+.1%}) {flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,496 @@
+"""
+Benchmark harness for the pipeline engine and question services.
+
+Each scenario drives one entry point against a simulated LLM backend (see
+``benchmarks.simulated``) wrapped in the production retry and circuit
+breaker layers. For every concurrency level, a closed loop of that many
+workers sends ``requests`` requests, and the harness reports throughput,
+latency percentiles and the memory high-water mark. Framework overhead
+per agent step is measured separately, by running the question pipeline
+one request at a time against a zero-latency backend.
+
+Results are plain JSON tagged with the git commit, so runs on different
+commits can be compared with ``compare_results``.
+"""
+import asyncio
+import json
+import logging
+import math
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from backend.app.agents import factory as agent_factory
+from backend.app.agents.factory import AgentFactory
+from backend.app.agents.pipeline import AgentPipeline
+from backend.app.config import get_settings
+from backend.app.db.base import Base
+from backend.app.db.cache import check_redis_connection
+from backend.app.db.session import SessionLocal, engine
+from backend.app.llm.provider import LLMProvider, _wrap_backend
+from backend.app.schemas.question import BatchQuestionItem, BatchQuestionRequest
+from benchmarks.simulated import SAMPLE_QUESTION, SimulatedLLMProvider
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ("pipeline", "generate", "batch")
+PIPELINE_NAME = "question_generation"
+TOPIC = "Surgical management of early-stage non-small cell lung cancer"
+
+# Sends one request; returns whether it succeeded
+ScenarioRequest = Callable[[int], Awaitable[bool]]
+
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    "scenarios": list(SCENARIOS),
+    "concurrency": [1, 2, 4, 8, 16],
+    "requests": 32,  # Per concurrency level
+    "latency_ms": 500.0,  # Median simulated LLM latency
+    "latency_sigma": 0.5,  # Log-normal spread; 0 for a fixed latency
+    "error_rate": 0.0,
+    "error_type": "server",
+    "questions": 3,  # Questions per generate request
+    "batch_size": 10,  # Items per batch request
+    "overhead_runs": 20,
+    "trace_memory": False,
+    "seed": None,
+}
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """
+    Get a percentile with linear interpolation between ranks
+
+    Args:
+        values: Sample
+        p: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or None for an empty sample
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Optional[float]]:
+    """Summarize latencies in milliseconds"""
+    ms = [s * 1000 for s in seconds]
+    return {
+        "mean": sum(ms) / len(ms) if ms else None,
+        "p50": percentile(ms, 50),
+        "p95": percentile(ms, 95),
+        "p99": percentile(ms, 99),
+        "max": max(ms) if ms else None,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Get the resident memory high-water mark of the process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def latency_config(latency_ms: float, sigma: float) -> Dict[str, Any]:
+    """
+    Build the ``LatencyModel`` configuration of the simulated backend
+
+    Args:
+        latency_ms: Median latency in milliseconds
+        sigma: Log-normal spread; 0 for a fixed latency
+
+    Returns:
+        Latency configuration
+    """
+    if latency_ms <= 0:
+        return {"distribution": "none"}
+    if sigma <= 0:
+        return {"distribution": "fixed", "value": latency_ms / 1000}
+    return {"distribution": "lognormal", "mu": math.log(latency_ms / 1000), "sigma": sigma}
+
+
+def build_provider(options: Dict[str, Any], latency_ms: Optional[float] = None) -> SimulatedLLMProvider:
+    """Create the simulated backend described by the benchmark options"""
+    return SimulatedLLMProvider(
+        latency=latency_config(
+            options["latency_ms"] if latency_ms is None else latency_ms,
+            options["latency_sigma"]
+        ),
+        error_rate=options["error_rate"],
+        error_type=options["error_type"],
+        seed=options["seed"]
+    )
+
+
+@contextmanager
+def use_provider(simulated: SimulatedLLMProvider) -> Iterator[LLMProvider]:
+    """
+    Make agents created by the factory call the simulated backend
+
+    The backend gets the per-backend layers of settings.yml (retries and
+    circuit breaking), as ``get_llm_provider`` would give a real one.
+
+    Yields:
+        The wrapped provider
+    """
+    provider = _wrap_backend(simulated, get_settings().get_llm_config())
+    original = agent_factory.get_llm_provider
+    agent_factory.get_llm_provider = lambda: provider
+    # Pooled agents hold on to the provider they were created with
+    AgentFactory._pools.clear()
+    try:
+        yield provider
+    finally:
+        agent_factory.get_llm_provider = original
+        AgentFactory._pools.clear()
+
+
+def create_tables() -> None:
+    """Create the tables used by the scenarios in the configured database"""
+    # Register every model with the declarative base
+    import backend.app.models  # noqa: F401
+    import backend.app.models.agent_state  # noqa: F401
+    import backend.app.models.pipeline_run  # noqa: F401
+    Base.metadata.create_all(engine)
+
+
+def pipeline_input(index: int) -> Dict[str, Any]:
+    # Distinct inputs, so identical calls are not coalesced or cached
+    return {
+        "content": f"{TOPIC} (request {index})",
+        "question_type": "multiple-choice",
+        "complexity": "high",
+        "count": 1,
+    }
+
+
+def pipeline_scenario(options: Dict[str, Any]) -> ScenarioRequest:
+    """One question pipeline run per request"""
+    async def request(index: int) -> bool:
+        pipeline = AgentPipeline.from_config(PIPELINE_NAME, persistent=False)
+        result = await pipeline.execute(pipeline_input(index))
+        return result.success
+    return request
+
+
+def generate_scenario(options: Dict[str, Any]) -> ScenarioRequest:
+    """One ``QuestionService.generate_questions`` call per request"""
+    from backend.app.services.question_service import QuestionService
+
+    async def request(index: int) -> bool:
+        db = SessionLocal()
+        try:
+            await QuestionService(db).generate_questions(
+                content=pipeline_input(index)["content"],
+                question_type="multiple-choice",
+                complexity="high",
+                count=options["questions"]
+            )
+            return True
+        finally:
+            db.close()
+    return request
+
+
+def batch_scenario(options: Dict[str, Any]) -> ScenarioRequest:
+    """One ``QuestionService.process_batch_job`` call per request"""
+    from backend.app.services.question_service import QuestionService
+
+    def item(index: int, position: int) -> BatchQuestionItem:
+        return BatchQuestionItem(operation="create", data={
+            "text": f"{SAMPLE_QUESTION['text']} (request {index}, item {position})",
+            "explanation": SAMPLE_QUESTION["explanation"],
+            "domain": "thoracic",
+            "options": [
+                {"text": option["text"], "is_correct": option["isCorrect"], "position": i}
+                for i, option in enumerate(SAMPLE_QUESTION["options"])
+            ],
+        })
+
+    async def request(index: int) -> bool:
+        batch = BatchQuestionRequest(items=[item(index, i) for i in range(options["batch_size"])])
+        db = SessionLocal()
+        try:
+            await QuestionService(db).process_batch_job(str(uuid.uuid4()), batch)
+            return True
+        finally:
+            db.close()
+    return request
+
+
+_SCENARIO_FACTORIES: Dict[str, Callable[[Dict[str, Any]], ScenarioRequest]] = {
+    "pipeline": pipeline_scenario,
+    "generate": generate_scenario,
+    "batch": batch_scenario,
+}
+
+
+async def run_level(request: ScenarioRequest, requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Send requests from a closed loop of workers
+
+    Args:
+        request: Scenario request
+        requests: Total number of requests
+        concurrency: Number of workers, each sending its next request when
+            the previous one finishes
+
+    Returns:
+        Throughput, latency percentiles, errors and memory high-water marks
+    """
+    indexes = iter(range(requests))
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in indexes:
+            start_time = time.perf_counter()
+            try:
+                success = await request(index)
+            except Exception as e:
+                logger.warning(f"Benchmark request {index} failed: {str(e)}")
+                success = False
+            latencies.append(time.perf_counter() - start_time)
+            if not success:
+                errors += 1
+
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "wall_time": wall_time,
+        "throughput": requests / wall_time if wall_time > 0 else None,
+        "latency_ms": latency_summary(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_traced_mb": tracemalloc.get_traced_memory()[1] / (1024 * 1024) if tracemalloc.is_tracing() else None,
+    }
+
+
+async def measure_overhead(options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Measure the time the pipeline engine adds to each agent step
+
+    Runs the question pipeline one request at a time against a zero-latency
+    backend, so all of the time is spent in pipeline, agent, provider
+    wrapper and checkpoint code.
+
+    Returns:
+        Per-step and per-run overhead in milliseconds
+    """
+    runs = options["overhead_runs"]
+    per_step: List[float] = []
+    per_run: List[float] = []
+    with use_provider(build_provider({**options, "error_rate": 0.0}, latency_ms=0)):
+        # The first run builds the plan and fills the agent pool
+        await AgentPipeline.from_config(PIPELINE_NAME, persistent=False).execute(pipeline_input(-1))
+        for index in range(runs):
+            pipeline = AgentPipeline.from_config(PIPELINE_NAME, persistent=False)
+            start_time = time.perf_counter()
+            result = await pipeline.execute(pipeline_input(index))
+            elapsed = time.perf_counter() - start_time
+            steps = result.usage.get("calls") or len(result.steps)
+            per_run.append(elapsed)
+            per_step.append(elapsed / steps)
+
+    return {
+        "runs": runs,
+        "per_step_ms": latency_summary(per_step),
+        "per_run_ms": latency_summary(per_run),
+    }
+
+
+async def run_scenario(name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one scenario at every concurrency level
+
+    Args:
+        name: Scenario name, one of ``SCENARIOS``
+        options: Benchmark options
+
+    Returns:
+        Scenario results; ``skipped`` says why a scenario could not run
+    """
+    if name == "batch" and not await check_redis_connection():
+        return {"skipped": "Redis is unreachable; batch jobs store their progress in Redis"}
+
+    request = _SCENARIO_FACTORIES[name](options)
+    levels = []
+    simulated = build_provider(options)
+    with use_provider(simulated):
+        # Warm up plans, pools and connections outside the measurement
+        await request(-1)
+        for concurrency in options["concurrency"]:
+            level = await run_level(request, options["requests"], concurrency)
+            levels.append(level)
+            logger.info(
+                f"{name} x{concurrency}: {level['throughput']:.2f} req/s, "
+                f"p95 {level['latency_ms']['p95']:.0f} ms"
+            )
+
+    result: Dict[str, Any] = {"levels": levels, "backend": simulated.get_stats()["simulated"]}
+    if name == "pipeline":
+        result["overhead"] = await measure_overhead(options)
+    return result
+
+
+def git_revision() -> Dict[str, Any]:
+    """Get the current commit and whether the working tree has changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+async def run_benchmarks(options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run the selected scenarios
+
+    Args:
+        options: Benchmark options, see ``DEFAULT_OPTIONS``
+
+    Returns:
+        JSON-serializable results with run metadata
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    unknown = [name for name in options["scenarios"] if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown benchmark scenarios: {unknown}")
+
+    create_tables()
+    if options["trace_memory"]:
+        tracemalloc.start()
+    try:
+        scenarios = {}
+        for name in options["scenarios"]:
+            scenarios[name] = await run_scenario(name, options)
+    finally:
+        if options["trace_memory"]:
+            tracemalloc.stop()
+
+    return {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": options,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def write_results(results: Dict[str, Any], directory: str) -> Path:
+    """
+    Store results as ``{timestamp}-{commit}.json``
+
+    Args:
+        results: Results of ``run_benchmarks``
+        directory: Output directory, created if missing
+
+    Returns:
+        Path of the written file
+    """
+    meta = results["meta"]
+    stamp = datetime.fromisoformat(meta["timestamp"]).strftime("%Y%m%d-%H%M%S")
+    commit = (meta.get("commit") or "nogit") + ("-dirty" if meta.get("dirty") else "")
+    path = Path(directory) / f"{stamp}-{commit}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, default=str))
+    return path
+
+
+def format_report(results: Dict[str, Any]) -> str:
+    """Format results as text tables, one per scenario"""
+    lines = []
+    for name, scenario in results["scenarios"].items():
+        lines.append(f"== {name}")
+        if "skipped" in scenario:
+            lines.append(f"   skipped: {scenario['skipped']}")
+            continue
+        lines.append(f"   {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'rss MiB':>8}")
+        for level in scenario["levels"]:
+            latency = level["latency_ms"]
+            lines.append(
+                f"   {level['concurrency']:>5} {level['throughput']:>9.2f} {latency['p50']:>9.1f} "
+                f"{latency['p95']:>9.1f} {latency['p99']:>9.1f} {level['errors']:>7} {level['peak_rss_mb']:>8.1f}"
+            )
+        if "overhead" in scenario:
+            per_step = scenario["overhead"]["per_step_ms"]
+            lines.append(f"   overhead per agent step: p50 {per_step['p50']:.2f} ms, p95 {per_step['p95']:.2f} ms")
+    return "\n".join(lines)
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Compare two benchmark runs
+
+    Throughput is compared per scenario and concurrency level, p95 latency
+    likewise, and the p50 overhead per agent step of the pipeline scenario.
+
+    Args:
+        baseline: Results of the reference run
+        current: Results of the new run
+        threshold: Relative change counted as a regression, e.g. 0.1 for 10%
+
+    Returns:
+        One row per compared metric, with ``change`` (relative to the
+        baseline) and ``regression``
+    """
+    rows = []
+
+    def add(scenario: str, metric: str, before: Optional[float], after: Optional[float], higher_is_better: bool):
+        if not before or after is None:
+            return
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        rows.append({
+            "scenario": scenario,
+            "metric": metric,
+            "baseline": before,
+            "current": after,
+            "change": change,
+            "regression": worse > threshold,
+        })
+
+    for name, scenario in current["scenarios"].items():
+        reference = baseline["scenarios"].get(name) or {}
+        reference_levels = {level["concurrency"]: level for level in reference.get("levels", [])}
+        for level in scenario.get("levels", []):
+            before = reference_levels.get(level["concurrency"])
+            if before is None:
+                continue
+            tag = f"x{level['concurrency']}"
+            add(name, f"throughput {tag}", before["throughput"], level["throughput"], higher_is_better=True)
+            add(name, f"p95 {tag}", before["latency_ms"]["p95"], level["latency_ms"]["p95"], higher_is_better=False)
+        if "overhead" in scenario and "overhead" in reference:
+            add(
+                name, "overhead per step p50",
+                reference["overhead"]["per_step_ms"]["p50"], scenario["overhead"]["per_step_ms"]["p50"],
+                higher_is_better=False
+            )
+    return rows
@@ -0,0 +1,159 @@
+"""
+Simulated LLM backend for benchmarks.
+
+Answers every call after a latency drawn from a ``LatencyModel`` (see
+``backend.app.llm.replay``) and fails a configurable share of calls with
+retryable errors, so the retry and circuit-breaker layers see realistic
+traffic. Calls with a ``response_schema`` get a minimal valid instance of
+the schema; other calls get a multiple-choice question that passes
+review, verification and validation, so question pipelines run end to end.
+"""
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.app.llm.errors import LLMErrorType
+from backend.app.llm.provider import LLMProvider
+from backend.app.llm.replay import LatencyModel
+
+# Output of agents without an output schema; one object satisfies all of them
+SAMPLE_QUESTION: Dict[str, Any] = {
+    "text": "A 62-year-old man has a 3 cm peripheral adenocarcinoma of the right upper lobe. What is the most appropriate operation?",
+    "options": [
+        {"text": "Right upper lobectomy with mediastinal lymph node dissection", "isCorrect": True},
+        {"text": "Wedge resection without nodal sampling", "isCorrect": False},
+        {"text": "Right pneumonectomy", "isCorrect": False},
+    ],
+    "explanation": "Lobectomy with systematic nodal assessment is the standard of care for operable stage I disease.",
+    "references": [],
+    "metadata": {"cognitiveComplexity": "High", "bloomsLevel": "Application", "surgicallyAppropriate": True},
+    "issues": [],
+    "approved": True,
+    "surgicallyAppropriate": True,
+}
+
+
+def example_for_schema(schema: Dict[str, Any]) -> Any:
+    """
+    Build a minimal value that validates against a JSON schema
+
+    Args:
+        schema: JSON schema
+
+    Returns:
+        Value with every property set and the minimum number of array items
+    """
+    if "enum" in schema:
+        return schema["enum"][0]
+    schema_type = schema.get("type", "object")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+
+    if schema_type == "object":
+        return {name: example_for_schema(prop) for name, prop in (schema.get("properties") or {}).items()}
+    if schema_type == "array":
+        item = example_for_schema(schema.get("items") or {"type": "string"})
+        return [item] * max(1, schema.get("minItems", 1))
+    if schema_type == "string":
+        return "simulated"
+    if schema_type == "boolean":
+        return True
+    if schema_type == "integer":
+        return 1
+    if schema_type == "number":
+        return 1.0
+    return None
+
+
+class SimulatedLLMProvider(LLMProvider):
+    """
+    LLM provider answering with canned output after a simulated latency
+    """
+    metered = False
+
+    def __init__(
+        self,
+        latency: Optional[Dict[str, Any]] = None,
+        error_rate: float = 0.0,
+        error_type: str = LLMErrorType.SERVER.value,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize simulated provider
+
+        Args:
+            latency: Latency configuration of a ``LatencyModel``
+                (``distribution`` none, fixed or lognormal, and its parameters)
+            error_rate: Share of calls that fail
+            error_type: Error type of failed calls, e.g. ``server`` or ``rate_limit``
+            seed: Optional random seed for reproducible runs
+        """
+        self.model = "simulated"
+        self.latency = LatencyModel(latency or {"distribution": "none"}, seed=seed)
+        self.error_rate = error_rate
+        self.error_type = error_type
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Answer after a simulated latency, failing ``error_rate`` of calls"""
+        start_time = time.time()
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency.sample())
+        finally:
+            self.in_flight -= 1
+
+        if self.random.random() < self.error_rate:
+            self.failures += 1
+            return {
+                "text": "Error: simulated failure",
+                "model": self.model,
+                "elapsed_time": time.time() - start_time,
+                "error": f"Simulated {self.error_type} error",
+                "error_type": self.error_type,
+                "retryable": True,
+                "success": False,
+            }
+
+        schema = kwargs.get("response_schema")
+        text = json.dumps(example_for_schema(schema) if schema else SAMPLE_QUESTION)
+        on_token = kwargs.get("on_token")
+        if on_token is not None:
+            await on_token(text)
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(text) // 4
+        return {
+            "text": text,
+            "model": self.model,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cached_tokens": 0,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+            "elapsed_time": time.time() - start_time,
+            "success": True,
+        }
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """Answer without calling any tools"""
+        return await self.generate(prompt, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get call counters"""
+        return {
+            "simulated": {
+                "calls": self.calls,
+                "failures": self.failures,
+                "max_in_flight": self.max_in_flight,
+            }
+        }
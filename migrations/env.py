@@ -20,6 +20,7 @@ from backend.app.db.base import Base
 from backend.app.models.question import Question, QuestionOptions
 from backend.app.models.comparison import ComparisonResult, UserFeedback
 from backend.app.models.agent_state import AgentState, AgentStateCheckpoint
+from backend.app.models.pipeline_run import PipelineRun, PipelineStepOutput
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -0,0 +1,55 @@
+"""Add pipeline run tables
+
+Revision ID: 3c3c3c3c3c3c
+Revises: 2b2b2b2b2b2b
+Create Date: 2024-01-15 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3c3c3c3c3c3c'
+down_revision = '2b2b2b2b2b2b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create pipeline_runs table
+    op.create_table('pipeline_runs',
+        sa.Column('id', sa.String(length=255), primary_key=True),
+        sa.Column('pipeline_config', sa.JSON(), nullable=True),
+        sa.Column('initial_input', sa.JSON(), nullable=True),
+        sa.Column('system_prompt', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=False, default='running'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, default=1),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Create pipeline_step_outputs table
+    op.create_table('pipeline_step_outputs',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('run_id', sa.String(length=255), nullable=False, index=True),
+        sa.Column('step_name', sa.String(length=255), nullable=False),
+        sa.Column('input_hash', sa.String(length=64), nullable=False),
+        sa.Column('agent_id', sa.String(length=255), nullable=False),
+        sa.Column('agent_name', sa.String(length=255), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('output_data', sa.JSON(), nullable=False),
+        sa.Column('response_metadata', sa.JSON(), nullable=False),
+        sa.Column('elapsed_time', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['run_id'], ['pipeline_runs.id'], ),
+        sa.UniqueConstraint('run_id', 'step_name', 'input_hash', name='uq_pipeline_step_output'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('pipeline_step_outputs')
+    op.drop_table('pipeline_runs')
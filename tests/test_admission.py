@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from backend.app.services.admission import AdmissionController, Overloaded
+
+
+def test_requests_beyond_the_limit_queue_and_take_freed_slots_in_order():
+    controller = AdmissionController({"max_in_flight": 1, "max_queue": 2, "max_queue_time": 1.0})
+    order = []
+
+    async def request(name: str, duration: float):
+        async with controller.admit():
+            order.append(name)
+            await asyncio.sleep(duration)
+
+    async def run():
+        first = asyncio.ensure_future(request("first", 0.05))
+        await asyncio.sleep(0)
+        queued = [asyncio.ensure_future(request(name, 0.01)) for name in ("second", "third")]
+        await asyncio.sleep(0)
+        stats = controller.get_stats()
+        await asyncio.gather(first, *queued)
+        return stats
+
+    stats = asyncio.run(run())
+    assert order == ["first", "second", "third"]
+    assert stats["in_flight"] == 1 and stats["queue_depth"] == 2
+    final = controller.get_stats()
+    assert final["in_flight"] == 0 and final["queue_depth"] == 0
+    assert final["admitted"] == 3 and final["rejected"] == 0
+
+
+def test_full_queue_rejects_at_once_with_retry_after():
+    controller = AdmissionController({"max_in_flight": 1, "max_queue": 0, "max_queue_time": 5.0})
+
+    async def run():
+        await controller.acquire()
+        with pytest.raises(Overloaded) as rejected:
+            await controller.acquire()
+        controller.release(2.0)
+        return rejected.value
+
+    error = asyncio.run(run())
+    assert error.retry_after == 5
+    assert controller.get_stats()["rejected_queue_full"] == 1
+    # With a measured duration the hint is the time for the queue to drain
+    assert controller.retry_after() == 2
+
+
+def test_queued_request_times_out_and_expected_waits_are_shed():
+    controller = AdmissionController({"max_in_flight": 1, "max_queue": 4, "max_queue_time": 0.05})
+
+    async def run():
+        await controller.acquire()
+        with pytest.raises(Overloaded):
+            await controller.acquire()
+        controller.release(1.0)
+        await controller.acquire()
+        # A request now expects to wait 1s, longer than the queue time
+        with pytest.raises(Overloaded):
+            await controller.acquire()
+        controller.release(1.0)
+
+    asyncio.run(run())
+    stats = controller.get_stats()
+    assert stats["rejected_queue_timeout"] == 1 and stats["rejected_expected_wait"] == 1
+    assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
@@ -0,0 +1,140 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.agents import pipeline as pipeline_module
+from backend.app.agents import state as state_module
+from backend.app.agents.base import AgentContext, AgentRequest
+from backend.app.agents.pipeline import AgentPipeline, PipelineStep
+from backend.app.agents.state import WriteBehindStateStore
+from backend.app.agents.stateful import StatefulLLMAgent
+from backend.app.db.base import Base
+from backend.app.llm.provider import LLMProvider
+from backend.app.models.agent_state import AgentState, AgentStateCheckpoint
+
+
+class EchoProvider(LLMProvider):
+    def __init__(self):
+        self.model = "fake-model"
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        return {"text": prompt, "model": self.model, "success": True}
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self.generate(prompt, **kwargs)
+
+
+def make_store(monkeypatch, **config) -> tuple:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[AgentState.__table__, AgentStateCheckpoint.__table__])
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(conn))
+    session_factory = sessionmaker(bind=engine)
+    store = WriteBehindStateStore({"flush_interval": None, **config}, session_factory=session_factory)
+    monkeypatch.setattr(state_module, "get_state_store", lambda: store)
+    monkeypatch.setattr(pipeline_module, "get_state_store", lambda: store)
+    return store, session_factory, commits
+
+
+def make_agent(name: str) -> StatefulLLMAgent:
+    return StatefulLLMAgent(
+        agent_id=f"{name}-agent", name=name, description="", instructions="", llm_provider=EchoProvider()
+    )
+
+
+def request(run_id: str) -> AgentRequest:
+    return AgentRequest(prompt="hi", context=AgentContext(request_id="r", trace_id=run_id))
+
+
+def test_buffered_states_are_readable_and_written_with_their_history(monkeypatch):
+    store, session_factory, commits = make_store(monkeypatch)
+    agent = make_agent("writer")
+
+    async def run():
+        for version in range(3):
+            await agent.save_state(request("run-1"), {"version": version})
+        buffered = await agent.load_state(request("run-1"))
+        written_early = commits[:]
+        flushed = await store.flush("run-1")
+        return buffered, written_early, flushed, await agent.load_state(request("run-1"))
+
+    buffered, written_early, flushed, loaded = asyncio.run(run())
+    assert buffered == {"version": 2}
+    assert written_early == [] and flushed == 1 and len(commits) == 1
+    assert loaded == {"version": 2}
+    with session_factory() as db:
+        db_state = db.query(AgentState).one()
+        assert db_state.agent_id == "writer-agent" and db_state.pipeline_id == "run-1"
+        assert db_state.state_data == {"version": 2} and db_state.version == 3
+        assert [c.state_data for c in db_state.checkpoints] == [{"version": 0}, {"version": 1}]
+    assert store.get_stats()["pending"] == 0
+
+
+def test_pipeline_flushes_the_states_of_its_run_in_one_transaction(monkeypatch):
+    store, session_factory, commits = make_store(monkeypatch)
+    steps = []
+    for name in ("first", "second", "third"):
+        step = PipelineStep(agent_type="llm", name=name)
+        step.agent = make_agent(name)
+        steps.append(step)
+    pipeline = AgentPipeline(steps, pipeline_id="run-2", persistent=True)
+
+    result = asyncio.run(pipeline.execute("hello"))
+    assert result.success
+    assert len(commits) == 1
+    with session_factory() as db:
+        assert sorted(s.agent_id for s in db.query(AgentState).all()) == ["first-agent", "second-agent", "third-agent"]
+    assert store.get_stats()["written"] == 3
+
+
+def test_write_through_commits_every_save(monkeypatch):
+    store, _, commits = make_store(monkeypatch, mode="write_through")
+    agent = make_agent("eager")
+
+    async def run():
+        await agent.save_state(request("run-3"), {"n": 1})
+        await agent.save_state(request("run-3"), {"n": 2})
+
+    asyncio.run(run())
+    assert len(commits) == 2 and store.get_stats()["pending"] == 0
+
+
+def test_failed_flush_keeps_states_buffered(monkeypatch):
+    store, session_factory, _ = make_store(monkeypatch)
+    agent = make_agent("retry")
+    healthy_factory = store.session_factory
+
+    def broken_session():
+        raise RuntimeError("database is locked")
+
+    async def run():
+        await agent.save_state(request("run-4"), {"n": 1})
+        store.session_factory = broken_session
+        failed = await store.flush()
+        store.session_factory = healthy_factory
+        return failed, await store.flush()
+
+    failed, written = asyncio.run(run())
+    assert failed == 0 and written == 1
+    assert store.get_stats()["errors"] == 1
+    with session_factory() as db:
+        assert db.query(AgentState).one().state_data == {"n": 1}
+
+
+def test_state_saved_by_two_runs_is_written_when_either_flushes(monkeypatch):
+    store, session_factory, _ = make_store(monkeypatch)
+    agent = make_agent("shared")
+
+    async def run():
+        await agent.save_state(request("run-a"), {"run": "a"})
+        await agent.save_state(request("run-b"), {"run": "b"})
+        return await store.flush("run-b"), await store.flush("run-a")
+
+    assert asyncio.run(run()) == (1, 0)
+    with session_factory() as db:
+        db_state = db.query(AgentState).one()
+        assert db_state.pipeline_id == "run-a" and db_state.state_data == {"run": "b"}
+        assert [c.state_data for c in db_state.checkpoints] == [{"run": "a"}]
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.app.agents.base import ToolDefinition
+from backend.app.agents.tools import ToolRegistry, run_tool_loop
+from backend.app.llm.provider import LLMProvider, OpenAIProvider
+
+
+class ToolCallingProvider(LLMProvider):
+    """Fake provider that calls the lookup tool for each city until it has the results"""
+    def __init__(self, cities: List[str]):
+        self.model = "fake"
+        self.cities = cities
+        self.calls: List[Dict[str, Any]] = []
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self.calls.append({"tools": None, **kwargs})
+        return {"text": "plain answer", "model": self.model, "success": True}
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        self.calls.append({"tools": tools, **kwargs})
+        results = [m for m in kwargs.get("tool_messages", []) if m["role"] == "tool"]
+        if results or kwargs.get("tool_choice") == "none":
+            return {"text": " ".join(m["content"] for m in results), "model": self.model, "success": True}
+        return {
+            "text": "",
+            "model": self.model,
+            "tool_calls": [
+                {"id": f"call_{i}", "function": {"name": "lookup", "arguments": json.dumps({"city": city})}}
+                for i, city in enumerate(self.cities)
+            ],
+            "success": True,
+        }
+
+
+LOOKUP = ToolDefinition(
+    name="lookup",
+    description="Look up a city",
+    parameters={"city": {"type": "string"}},
+    required_parameters=["city"],
+)
+
+
+def make_registry() -> ToolRegistry:
+    registry = ToolRegistry()
+
+    @registry.register("lookup")
+    def lookup(city: str) -> Dict[str, Any]:
+        # Blocking implementation; runs in a worker thread
+        time.sleep(0.1)
+        if city == "nowhere":
+            raise ValueError("unknown city")
+        return {"city": city}
+
+    return registry
+
+
+def test_tool_calls_of_one_turn_run_concurrently():
+    provider = ToolCallingProvider(["paris", "rome", "oslo"])
+    start = time.monotonic()
+    result = asyncio.run(run_tool_loop(provider, "q", [LOOKUP], registry=make_registry()))
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.25
+    assert result["success"] and result["tool_rounds"] == 1
+    assert [r["output"] for r in result["tool_results"]] == [{"city": c} for c in ("paris", "rome", "oslo")]
+    assert len(provider.calls) == 2
+    messages = provider.calls[1]["tool_messages"]
+    assert messages[0]["role"] == "assistant" and len(messages[0]["tool_calls"]) == 3
+    assert [m["tool_call_id"] for m in messages[1:]] == ["call_0", "call_1", "call_2"]
+
+
+def test_tool_errors_are_returned_to_the_model():
+    provider = ToolCallingProvider(["nowhere"])
+    result = asyncio.run(run_tool_loop(provider, "q", [LOOKUP], registry=make_registry()))
+    assert result["tool_results"][0]["error"] == "unknown city"
+    assert json.loads(provider.calls[1]["tool_messages"][1]["content"]) == {"error": "unknown city"}
+
+
+def test_max_rounds_forces_final_answer_and_missing_tools_skip_the_loop():
+    provider = ToolCallingProvider(["paris"])
+    result = asyncio.run(run_tool_loop(provider, "q", [LOOKUP], max_rounds=0, registry=make_registry()))
+    assert result["success"] and result["tool_rounds"] == 0
+    assert provider.calls[0]["tool_choice"] == "none"
+
+    provider = ToolCallingProvider(["paris"])
+    result = asyncio.run(run_tool_loop(provider, "q", [LOOKUP], registry=ToolRegistry()))
+    assert result["text"] == "plain answer"
+    assert provider.calls[0]["tools"] is None
+
+
+def test_openai_request_appends_tool_messages():
+    provider = OpenAIProvider({"openai_api_key": "test"})
+    tool_messages = [{"role": "tool", "tool_call_id": "call_0", "content": "{}"}]
+    request = provider.describe_request("q", system_prompt="s", tool_messages=tool_messages)
+    assert [m["role"] for m in request["messages"]] == ["system", "user", "tool"]
+    assert "tool_messages" not in request
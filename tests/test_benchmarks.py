@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from backend.app.agents.factory import AgentFactory
+from benchmarks.harness import (
+    DEFAULT_OPTIONS, compare_results, percentile, run_level, use_provider, pipeline_scenario, build_provider
+)
+from benchmarks.simulated import SimulatedLLMProvider, example_for_schema
+
+
+def test_percentile_interpolates_between_ranks():
+    values = [4.0, 1.0, 3.0, 2.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 95) is None
+
+
+def test_simulated_provider_fails_the_configured_share_of_calls():
+    async def run(provider: SimulatedLLMProvider):
+        return [await provider.generate("prompt") for _ in range(200)]
+
+    provider = SimulatedLLMProvider(error_rate=0.25, error_type="rate_limit", seed=7)
+    results = asyncio.run(run(provider))
+    failures = [r for r in results if not r["success"]]
+    assert 30 < len(failures) < 70
+    assert all(r["error_type"] == "rate_limit" and r["retryable"] for r in failures)
+    assert provider.get_stats()["simulated"]["failures"] == len(failures)
+
+    schema = {"type": "object", "properties": {"items": {"type": "array", "items": {"type": "string"}, "minItems": 2}}}
+    assert example_for_schema(schema) == {"items": ["simulated", "simulated"]}
+
+
+def test_pipeline_scenario_runs_against_the_simulated_backend():
+    options = {**DEFAULT_OPTIONS, "latency_ms": 0}
+    simulated = build_provider(options)
+
+    async def run():
+        with use_provider(simulated):
+            return await run_level(pipeline_scenario(options), requests=4, concurrency=2)
+
+    level = asyncio.run(run())
+    assert level["errors"] == 0 and level["requests"] == 4
+    assert level["throughput"] > 0 and level["latency_ms"]["p50"] <= level["latency_ms"]["max"]
+    assert simulated.calls >= 4
+    # Agents pooled with the simulated backend do not outlive the benchmark
+    assert not AgentFactory._pools
+    json.dumps(level)
+
+
+def test_compare_flags_regressions_beyond_the_threshold():
+    def results(throughput: float, p95: float):
+        return {"scenarios": {"pipeline": {"levels": [
+            {"concurrency": 4, "throughput": throughput, "latency_ms": {"p95": p95}}
+        ]}}}
+
+    rows = compare_results(results(10.0, 100.0), results(9.5, 130.0), threshold=0.1)
+    by_metric = {row["metric"]: row for row in rows}
+    assert not by_metric["throughput x4"]["regression"]
+    assert by_metric["p95 x4"]["regression"]
+    assert round(by_metric["p95 x4"]["change"], 2) == 0.3
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.agents.base import LLMAgent
+from backend.app.agents.checkpoints import PipelineCheckpointStore
+from backend.app.agents.pipeline import PipelineStep, execute_pipeline_fan_out
+from backend.app.core.cancellation import ClientDisconnected, cancel_on_disconnect
+from backend.app.db.base import Base
+from backend.app.llm.provider import LLMProvider
+from backend.app.models.pipeline_run import PipelineRun, PipelineStepOutput
+
+
+class FakeRequest:
+    """Request stand-in whose client disconnects after a number of checks"""
+    method = "POST"
+
+    class url:
+        path = "/api/questions/generate/preview"
+
+    def __init__(self, connected_checks: int):
+        self.connected_checks = connected_checks
+
+    async def is_disconnected(self) -> bool:
+        self.connected_checks -= 1
+        return self.connected_checks < 0
+
+
+def test_work_is_cancelled_when_the_client_disconnects():
+    cleaned_up = []
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        finally:
+            cleaned_up.append(True)
+
+    async def run():
+        with pytest.raises(ClientDisconnected):
+            await cancel_on_disconnect(FakeRequest(connected_checks=2), work(), poll_interval=0.01)
+
+    asyncio.run(run())
+    # Cleanup finished before the handler saw the disconnect
+    assert cleaned_up == [True]
+
+
+def test_result_is_returned_while_the_client_is_connected():
+    async def work():
+        await asyncio.sleep(0.02)
+        return "questions"
+
+    result = asyncio.run(cancel_on_disconnect(FakeRequest(connected_checks=100), work(), poll_interval=0.01))
+    assert result == "questions"
+
+
+def test_fan_out_branches_finish_cleanup_before_the_disconnect_is_raised(monkeypatch):
+    class BlockingProvider(LLMProvider):
+        model = "fake-model"
+
+        async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+            await asyncio.sleep(5)
+            return {"text": prompt, "model": self.model, "success": True}
+
+        async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+            return await self.generate(prompt, **kwargs)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[PipelineRun.__table__, PipelineStepOutput.__table__])
+    store = PipelineCheckpointStore(sessionmaker(bind=engine))
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    monkeypatch.setattr(PipelineStep, "get_agent", lambda self, state_id=None: LLMAgent(
+        agent_id=self.name, name=self.name, description="", instructions="", llm_provider=BlockingProvider()
+    ))
+    config = [{"agent_type": "llm", "name": "only", "use_state": False}]
+
+    async def run():
+        work = execute_pipeline_fan_out(
+            config, ["a", "b"], pipeline_id="fan", persistent=False, checkpoints=store
+        )
+        with pytest.raises(ClientDisconnected):
+            await cancel_on_disconnect(FakeRequest(connected_checks=2), work, poll_interval=0.01)
+        return [await store.get_run(f"fan-{i}") for i in range(2)]
+
+    runs = asyncio.run(run())
+    assert [(run["status"], run["error"]) for run in runs] == [("failed", "Cancelled")] * 2
@@ -0,0 +1,200 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from backend.app.services.jobs import COMPLETED, DEAD, QUEUED, RUNNING, InMemoryJobBroker, JobQueue
+
+
+def make_queue(**config) -> JobQueue:
+    return JobQueue({"broker": "memory", "retry_delay": 0, **config})
+
+
+async def wait_for_status(queue: JobQueue, job_id: str, status: str) -> Dict[str, Any]:
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is {job['status']}, expected {status}")
+
+
+def test_failed_job_is_retried_until_it_completes():
+    calls = []
+
+    async def flaky(payload: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError("provider overloaded")
+        return {"echo": payload["text"]}
+
+    async def run():
+        queue = make_queue(workers=1)
+        queue.register("echo", flaky)
+        await queue.start()
+        job = await queue.submit("echo", {"text": "hi"})
+        try:
+            return await wait_for_status(queue, job["id"], COMPLETED), await queue.get_stats()
+        finally:
+            await queue.stop()
+
+    job, stats = asyncio.run(run())
+    assert job["result"] == {"echo": "hi"}
+    assert job["attempts"] == 2 and job["error"] is None
+    assert stats["retried"] == 1 and stats["completed"] == 1
+
+
+def test_exhausted_job_is_dead_lettered_and_can_be_retried():
+    fail = [True]
+
+    async def handler(payload: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        if fail[0]:
+            raise ValueError("bad outline")
+        return {"ok": True}
+
+    async def run():
+        queue = make_queue(workers=1, max_attempts=2)
+        queue.register("generate", handler)
+        await queue.start()
+        try:
+            job = await queue.submit("generate", {})
+            dead = await wait_for_status(queue, job["id"], DEAD)
+            letters = await queue.dead_letters()
+
+            fail[0] = False
+            requeued = await queue.retry(job["id"])
+            done = await wait_for_status(queue, job["id"], COMPLETED)
+            return dead, letters, requeued, done, await queue.dead_letters(), await queue.retry(job["id"])
+        finally:
+            await queue.stop()
+
+    dead, letters, requeued, done, letters_after, retry_again = asyncio.run(run())
+    assert dead["attempts"] == 2 and dead["error"] == "bad outline"
+    assert [job["id"] for job in letters] == [dead["id"]]
+    assert requeued["attempts"] == 0
+    assert done["result"] == {"ok": True} and done["attempts"] == 1
+    assert letters_after == []
+    # Only dead-lettered jobs can be retried
+    assert retry_again is None
+
+
+def test_workers_run_jobs_concurrently():
+    running = []
+    peak = []
+
+    async def slow(payload: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        running.append(payload["n"])
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.remove(payload["n"])
+        return {"n": payload["n"]}
+
+    async def run():
+        queue = make_queue(workers=3)
+        queue.register("slow", slow)
+        await queue.start()
+        try:
+            jobs = [await queue.submit("slow", {"n": n}) for n in range(6)]
+            return [await wait_for_status(queue, job["id"], COMPLETED) for job in jobs]
+        finally:
+            await queue.stop()
+
+    jobs = asyncio.run(run())
+    assert [job["result"]["n"] for job in jobs] == list(range(6))
+    assert max(peak) == 3
+
+
+def test_submit_rejects_unknown_kinds():
+    async def run():
+        await make_queue().submit("missing", {})
+
+    try:
+        asyncio.run(run())
+    except ValueError as e:
+        assert "missing" in str(e)
+    else:
+        raise AssertionError("Expected ValueError")
+
+
+def test_retry_in_backoff_survives_a_restart_of_the_workers():
+    calls = []
+
+    async def flaky(payload: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        calls.append(job_id)
+        if len(calls) == 1:
+            raise RuntimeError("provider overloaded")
+        return {"ok": True}
+
+    async def run():
+        queue = make_queue(workers=1, retry_delay=0.2)
+        queue.register("echo", flaky)
+        await queue.start()
+        job = await queue.submit("echo", {})
+        await wait_for_status(queue, job["id"], QUEUED)
+        while not calls:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+        await queue.start()
+        try:
+            return await wait_for_status(queue, job["id"], COMPLETED)
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(run())
+    assert job["attempts"] == 2 and calls == [job["id"], job["id"]]
+
+
+class ProcessingBroker(InMemoryJobBroker):
+    """In-process broker keeping taken jobs until acknowledged, like the Redis broker"""
+    def __init__(self):
+        super().__init__()
+        self.processing: List[str] = []
+
+    async def pop(self, timeout: float) -> Optional[str]:
+        job_id = await super().pop(timeout)
+        if job_id is not None:
+            self.processing.append(job_id)
+        return job_id
+
+    async def ack(self, job_id: str) -> None:
+        if job_id in self.processing:
+            self.processing.remove(job_id)
+
+    async def unacked(self) -> List[str]:
+        return list(self.processing)
+
+    async def requeue(self, job_id: str) -> None:
+        await self.ack(job_id)
+        await self.push(job_id)
+
+
+def test_jobs_left_running_by_a_crashed_worker_are_requeued_at_startup():
+    async def handler(payload: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        return {"n": payload["n"]}
+
+    async def crashed_job(queue: JobQueue, n: int, started: datetime) -> Dict[str, Any]:
+        job = await queue.submit("generate", {"n": n})
+        await queue.broker.pop(timeout=1.0)
+        job.update({"status": RUNNING, "attempts": 1, "started_at": started.isoformat()})
+        await queue.broker.save(job)
+        return job
+
+    async def run():
+        queue = make_queue(workers=1, stale_after=60)
+        queue.broker = ProcessingBroker()
+        queue.register("generate", handler)
+        stale = await crashed_job(queue, 1, datetime.utcnow() - timedelta(seconds=120))
+        live = await crashed_job(queue, 2, datetime.utcnow())
+
+        await queue.start()
+        try:
+            done = await wait_for_status(queue, stale["id"], COMPLETED)
+            return done, await queue.get(live["id"]), list(queue.broker.processing)
+        finally:
+            await queue.stop()
+
+    done, live, processing = asyncio.run(run())
+    assert done["result"] == {"n": 1} and done["attempts"] == 2
+    # A recently started job may still be running in another process
+    assert live["status"] == RUNNING
+    assert processing == [live["id"]]
@@ -0,0 +1,122 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from backend.app.llm.provider import LLMProvider, AgentLLMProvider
+from backend.app.llm.cache import CachedLLMProvider, LLMResponseCache
+from backend.app.llm.coalescing import CoalescingLLMProvider
+
+
+class CountingProvider(LLMProvider):
+    """Fake provider that counts calls instead of hitting an API"""
+    def __init__(self, delay: float = 0.0):
+        self.model = "fake-model"
+        self.calls = 0
+        self.delay = delay
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"text": f"answer to {prompt}", "model": self.model, "success": True}
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        return {"text": "", "model": self.model, "tool_calls": [], "success": True}
+
+
+def make_cached(**config):
+    inner = CountingProvider()
+    return inner, CachedLLMProvider(inner, {"redis": False, **config})
+
+
+def test_identical_requests_hit_cache():
+    inner, provider = make_cached()
+
+    async def run():
+        first = await provider.generate("hello", system_prompt="sys", temperature=0.0)
+        second = await provider.generate("hello", system_prompt="sys", temperature=0.0)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert inner.calls == 1
+    assert second["text"] == first["text"]
+    assert second["cached"] is True
+    stats = provider.get_stats()["cache"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_different_requests_miss_cache():
+    inner, provider = make_cached()
+
+    async def run():
+        await provider.generate("hello", temperature=0.0)
+        await provider.generate("hello", system_prompt="other", temperature=0.0)
+
+    asyncio.run(run())
+    assert inner.calls == 2
+
+
+def test_agent_opt_out_and_temperature_bypass_cache():
+    inner, provider = make_cached(max_temperature=0.0)
+    opted_out = AgentLLMProvider(provider, agent_type="final_formatter", cache=False)
+
+    async def run():
+        await opted_out.generate("hello", temperature=0.0)
+        await opted_out.generate("hello", temperature=0.0)
+        await provider.generate("hello", temperature=0.7)
+        await provider.generate("hello", temperature=0.7)
+
+    asyncio.run(run())
+    assert inner.calls == 4
+    assert provider.get_stats()["cache"]["bypassed"] == 4
+
+
+def test_lru_eviction():
+    cache = LLMResponseCache(max_entries=2, ttl=60)
+    cache.set("a", {"text": "a"})
+    cache.set("b", {"text": "b"})
+    cache.get("a")
+    cache.set("c", {"text": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"text": "a"}
+    assert cache.evictions == 1
+
+
+def test_ttl_expiry():
+    cache = LLMResponseCache(max_entries=2, ttl=-1)
+    cache.set("a", {"text": "a"})
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+
+def test_concurrent_identical_requests_are_coalesced():
+    inner = CountingProvider(delay=0.05)
+    provider = CoalescingLLMProvider(inner)
+
+    async def run():
+        return await asyncio.gather(
+            provider.generate("hello", temperature=0.0),
+            provider.generate("hello", temperature=0.0),
+            provider.generate("hello", temperature=0.0),
+            provider.generate("other", temperature=0.0),
+        )
+
+    results = asyncio.run(run())
+    assert inner.calls == 2
+    assert results[0]["text"] == results[1]["text"] == results[2]["text"]
+    assert sum(1 for r in results if r.get("coalesced")) == 2
+    stats = provider.get_stats()["coalescing"]
+    assert stats == {"leaders": 2, "coalesced": 2, "in_flight": 0}
+
+
+def test_sequential_requests_are_not_coalesced():
+    inner = CountingProvider()
+    provider = CoalescingLLMProvider(inner)
+
+    async def run():
+        await provider.generate("hello")
+        await provider.generate("hello")
+        await provider.generate("hello", coalesce=False)
+
+    asyncio.run(run())
+    assert inner.calls == 3
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from backend.app.llm.hedging import HedgedLLMProvider, percentile
+from backend.app.llm.provider import LLMProvider
+
+
+class SlowFirstProvider(LLMProvider):
+    """Fake provider whose calls take scripted durations"""
+    def __init__(self, delays: List[float]):
+        self.model = "fake-model"
+        self.delays = list(delays)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        delay = self.delays[self.calls] if self.calls < len(self.delays) else 0.0
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"text": f"took {delay}", "model": self.model, "success": True}
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self.generate(prompt, **kwargs)
+
+
+def test_percentile_nearest_rank():
+    values = [float(x) for x in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile([3.0], 99) == 3.0
+
+
+def test_slow_call_is_hedged_and_loser_cancelled():
+    inner = SlowFirstProvider([0.01] * 5 + [1.0, 0.01])
+    provider = HedgedLLMProvider(inner, {"min_samples": 5, "budget": 1.0})
+
+    async def run():
+        for _ in range(5):
+            await provider.generate("warmup", agent_type="formatter")
+        result = await provider.generate("slow", agent_type="formatter")
+        await asyncio.sleep(0)
+        return result
+
+    result = asyncio.run(run())
+    assert result["hedged"] is True
+    assert result["text"] == "took 0.01"
+    assert inner.cancelled == 1
+    stats = provider.get_stats()["hedging"]
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def test_hedge_budget_is_enforced():
+    inner = SlowFirstProvider([0.01] * 5 + [0.2])
+    provider = HedgedLLMProvider(inner, {"min_samples": 5, "budget": 0.05})
+
+    async def run():
+        for _ in range(5):
+            await provider.generate("warmup")
+        return await provider.generate("slow")
+
+    result = asyncio.run(run())
+    assert "hedged" not in result
+    assert inner.calls == 6
+    assert provider.get_stats()["hedging"]["budget_exhausted"] == 1
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.app.llm.deadline import deadline_scope
+from backend.app.llm.local import LocalLLMProvider
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible server answering with the prompt's length"""
+    requests = []
+    delay = 0.0
+
+    def do_POST(self):
+        time.sleep(StandInHandler.delay)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StandInHandler.requests.append((self.path, body))
+        usage = {"prompt_tokens": 4, "completion_tokens": 2, "total_tokens": 6}
+
+        if self.path.endswith("/chat/completions"):
+            content = body["messages"][-1]["content"]
+            payload = {
+                "id": "chat", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"echo {content}"}}],
+                "usage": usage,
+            }
+        else:
+            payload = {
+                "id": "cmpl", "object": "text_completion", "created": 0, "model": body["model"],
+                "choices": [{"index": i, "finish_reason": "stop", "text": f"echo {p}", "logprobs": None}
+                            for i, p in enumerate(body["prompt"])],
+                "usage": usage,
+            }
+
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StandInHandler.requests = []
+    StandInHandler.delay = 0.0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/v1"
+    httpd.shutdown()
+
+
+def test_chat_completion_against_local_server(server):
+    provider = LocalLLMProvider({"base_url": server, "model": "cogito:32b"})
+    result = asyncio.run(provider.generate("hello", system_prompt="sys"))
+    assert result["success"] is True
+    assert result["text"] == "echo hello"
+    assert result["usage"]["total_tokens"] == 6
+    assert StandInHandler.requests[0][0].endswith("/chat/completions")
+
+
+def test_concurrent_prompts_are_micro_batched(server):
+    provider = LocalLLMProvider({
+        "base_url": server,
+        "model": "cogito:32b",
+        "batching": {"enabled": True, "max_batch_size": 3, "window_ms": 50},
+    })
+
+    async def run():
+        return await asyncio.gather(*(provider.generate(f"q{i}") for i in range(3)))
+
+    results = asyncio.run(run())
+    assert [r["text"] for r in results] == ["echo q0", "echo q1", "echo q2"]
+    assert len(StandInHandler.requests) == 1
+    path, body = StandInHandler.requests[0]
+    assert path.endswith("/completions") and body["prompt"] == ["q0", "q1", "q2"]
+    assert provider.get_stats()["local"]["avg_batch_size"] == 3
+
+
+def test_batched_prompts_stop_at_the_request_deadline(server):
+    StandInHandler.delay = 1.0
+    provider = LocalLLMProvider({
+        "base_url": server,
+        "model": "cogito:32b",
+        "batching": {"enabled": True, "max_batch_size": 2, "window_ms": 10},
+    })
+
+    async def run():
+        with deadline_scope(time.time() + 0.2):
+            start = time.time()
+            results = await asyncio.gather(provider.generate("q0"), provider.generate("q1"))
+            return results, time.time() - start
+
+    results, elapsed = asyncio.run(run())
+    assert elapsed < 0.8
+    assert not any(r["success"] for r in results)
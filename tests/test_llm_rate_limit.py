@@ -0,0 +1,58 @@
+import asyncio
+
+from backend.app.llm.rate_limit import AdaptiveConcurrencyLimiter, SharedTokenBucket, TokenBucket
+
+
+def test_token_bucket_reports_wait_when_empty():
+    bucket = TokenBucket(capacity=2, refill_per_second=1)
+    assert bucket.try_take(1) == 0.0
+    assert bucket.try_take(1) == 0.0
+    wait = bucket.try_take(1)
+    assert 0.9 < wait <= 1.0
+
+
+def test_shared_bucket_falls_back_to_local_without_redis():
+    bucket = SharedTokenBucket("test:rpm", capacity=5, refill_per_second=100, use_redis=False)
+
+    async def run():
+        for _ in range(6):
+            await bucket.acquire(1)
+
+    asyncio.run(run())
+    assert bucket.waits == 1
+
+
+def test_aimd_grows_on_success_and_halves_on_rate_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial=4, min_limit=1, max_limit=8)
+
+    async def run():
+        for _ in range(8):
+            await limiter.acquire()
+            await limiter.release(0.1)
+        grown = limiter.limit
+        await limiter.acquire()
+        await limiter.release(0.1, rate_limited=True)
+        return grown
+
+    grown = asyncio.run(run())
+    assert grown > 4
+    assert limiter.limit == grown * 0.5
+    assert limiter.decreases == 1
+
+
+def test_aimd_limits_concurrency():
+    limiter = AdaptiveConcurrencyLimiter(initial=2, max_limit=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        await limiter.acquire()
+        peak = max(peak, limiter.in_flight)
+        await asyncio.sleep(0.01)
+        await limiter.release(0.01)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
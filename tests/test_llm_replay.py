@@ -0,0 +1,61 @@
+import asyncio
+
+from backend.app.llm.provider import AgentLLMProvider
+from backend.app.llm.replay import LatencyModel, ReplayProvider
+
+from tests.test_llm_cache import CountingProvider
+
+
+def replay_config(tmp_path, **config):
+    return {"cassette_dir": str(tmp_path), "cassette": "test", **config}
+
+
+def test_record_then_replay_without_target(tmp_path):
+    target = CountingProvider()
+    recorder = ReplayProvider(replay_config(tmp_path, mode="record"), target)
+
+    async def record():
+        await recorder.generate("hello", system_prompt="sys", temperature=0.0)
+        await recorder.generate("other", temperature=0.0)
+
+    asyncio.run(record())
+    assert target.calls == 2
+    assert recorder.get_stats()["replay"]["recorded"] == 2
+
+    player = ReplayProvider(replay_config(tmp_path, latency={"distribution": "none"}))
+
+    async def replay():
+        hit = await player.generate("hello", system_prompt="sys", temperature=0.0)
+        miss = await player.generate("unknown", temperature=0.0)
+        return hit, miss
+
+    hit, miss = asyncio.run(replay())
+    assert hit["success"] and hit["replayed"]
+    assert hit["text"] == "answer to hello"
+    assert miss["success"] is False
+    assert player.get_stats()["replay"]["missing"] == 1
+
+
+def test_replay_falls_back_to_same_agent(tmp_path):
+    recorder = AgentLLMProvider(
+        ReplayProvider(replay_config(tmp_path, mode="record"), CountingProvider()),
+        agent_type="question_generator"
+    )
+    asyncio.run(recorder.generate("recorded prompt"))
+
+    player = AgentLLMProvider(
+        ReplayProvider(replay_config(tmp_path, on_missing="agent", latency={"distribution": "none"})),
+        agent_type="question_generator"
+    )
+    result = asyncio.run(player.generate("a different prompt"))
+    assert result["text"] == "answer to recorded prompt"
+
+
+def test_latency_distributions():
+    assert LatencyModel({"distribution": "fixed", "value": 0.5, "scale": 2}).sample() == 1.0
+    assert LatencyModel({"distribution": "recorded"}).sample(0.25) == 0.25
+
+    mu, sigma = LatencyModel.fit_lognormal([1.0, 1.0, 1.0])
+    assert mu == 0.0 and sigma == 0.0
+    model = LatencyModel({"distribution": "lognormal"}, recorded=[0.5, 1.0, 2.0], seed=1)
+    assert all(x > 0 for x in (model.sample() for _ in range(10)))
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from backend.app.llm.deadline import DeadlineExceeded, deadline_scope
+from backend.app.llm.errors import LLMErrorType, describe_error, parse_duration, parse_retry_after
+from backend.app.llm.provider import LLMProvider
+from backend.app.llm.resilience import CircuitBreakerLLMProvider, RetryingLLMProvider
+
+
+class FakeAPIError(Exception):
+    """Exception shaped like the OpenAI SDK's APIStatusError"""
+    def __init__(self, status_code: int, headers: Optional[Dict[str, str]] = None, code: Optional[str] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+        self.code = code
+
+
+class ScriptedProvider(LLMProvider):
+    """Fake provider returning scripted results"""
+    def __init__(self, results: List[Dict[str, Any]]):
+        self.model = "fake-model"
+        self.results = list(results)
+        self.calls = 0
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        result = self.results[min(self.calls, len(self.results) - 1)]
+        self.calls += 1
+        return result
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self.generate(prompt, **kwargs)
+
+
+OK = {"text": "ok", "success": True}
+
+
+def failure(error: Exception) -> Dict[str, Any]:
+    return {"text": "Error", **describe_error(error), "success": False}
+
+
+def test_error_classification_and_retry_after():
+    rate_limited = describe_error(FakeAPIError(429, {"retry-after": "2"}))
+    assert rate_limited["error_type"] == LLMErrorType.RATE_LIMIT.value
+    assert rate_limited["retryable"] is True
+    assert rate_limited["retry_after"] == 2.0
+
+    reset = describe_error(FakeAPIError(429, {"x-ratelimit-reset-tokens": "1m30s"}))
+    assert reset["retry_after"] == 90.0
+
+    overflow = describe_error(FakeAPIError(400, code="context_length_exceeded"))
+    assert overflow["error_type"] == LLMErrorType.CONTEXT_LENGTH.value
+    assert overflow["retryable"] is False
+
+    auth = describe_error(FakeAPIError(401))
+    assert auth["error_type"] == LLMErrorType.AUTHENTICATION.value and not auth["retryable"]
+
+    assert describe_error(FakeAPIError(503))["retryable"] is True
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("soon") is None
+    assert parse_retry_after({"retry-after-ms": "1500"}) == 1.5
+
+
+def test_retries_only_retryable_errors():
+    transient = failure(FakeAPIError(429, {"retry-after": "0"}))
+    inner = ScriptedProvider([transient, transient, OK])
+    provider = RetryingLLMProvider(inner, {"max_attempts": 3})
+    assert asyncio.run(provider.generate("hi"))["success"] is True
+    assert inner.calls == 3
+
+    inner = ScriptedProvider([failure(FakeAPIError(401)), OK])
+    provider = RetryingLLMProvider(inner, {"max_attempts": 3})
+    assert asyncio.run(provider.generate("hi"))["success"] is False
+    assert inner.calls == 1
+
+
+def test_gives_up_when_retry_after_is_too_long():
+    inner = ScriptedProvider([failure(FakeAPIError(429, {"retry-after": "600"})), OK])
+    provider = RetryingLLMProvider(inner, {"max_attempts": 3, "max_retry_after": 60})
+    assert asyncio.run(provider.generate("hi"))["success"] is False
+    assert inner.calls == 1
+
+
+def test_does_not_retry_past_the_deadline():
+    inner = ScriptedProvider([failure(FakeAPIError(429, {"retry-after": "5"})), OK])
+    provider = RetryingLLMProvider(inner, {"max_attempts": 3})
+
+    async def run():
+        with deadline_scope(time.time() + 1):
+            return await provider.generate("hi")
+
+    assert asyncio.run(run())["success"] is False
+    assert inner.calls == 1
+
+    expired = describe_error(DeadlineExceeded("passed"))
+    assert expired["error_type"] == LLMErrorType.DEADLINE.value
+    assert expired["retryable"] is False
+
+
+def test_circuit_opens_and_fails_fast_then_probes():
+    down = failure(FakeAPIError(503))
+    inner = ScriptedProvider([down, down, OK])
+    provider = CircuitBreakerLLMProvider(inner, {"failure_threshold": 2, "reset_timeout": 0.05})
+
+    async def run():
+        await provider.generate("a")
+        await provider.generate("b")
+        rejected = await provider.generate("c")
+        await asyncio.sleep(0.06)
+        probe = await provider.generate("d")
+        return rejected, probe
+
+    rejected, probe = asyncio.run(run())
+    assert rejected["error_type"] == LLMErrorType.CIRCUIT_OPEN.value
+    assert inner.calls == 3
+    assert probe["success"] is True
+    stats = provider.get_stats()["circuit_breaker"]
+    assert stats["state"] == "closed" and stats["opens"] == 1 and stats["rejected"] == 1
+
+
+def test_request_errors_do_not_open_circuit():
+    bad_request = failure(FakeAPIError(400))
+    provider = CircuitBreakerLLMProvider(ScriptedProvider([bad_request]), {"failure_threshold": 1})
+
+    async def run():
+        for _ in range(3):
+            await provider.generate("a")
+
+    asyncio.run(run())
+    assert provider.get_stats()["circuit_breaker"]["state"] == "closed"
@@ -0,0 +1,71 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from backend.app.llm.provider import LLMProvider, AgentLLMProvider
+from backend.app.llm.router import RouterLLMProvider
+
+
+class BackendProvider(LLMProvider):
+    """Fake backend that can fail or stall"""
+    def __init__(self, model: str, fail: bool = False, delay: float = 0.0):
+        self.model = model
+        self.fail = fail
+        self.delay = delay
+        self.models: List[str] = []
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        await asyncio.sleep(self.delay)
+        self.models.append(kwargs.get("model") or self.model)
+        if self.fail:
+            return {"text": "Error: down", "model": self.model, "error": "down", "success": False}
+        return {"text": f"{self.model}: {prompt}", "model": self.model, "success": True}
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self.generate(prompt, **kwargs)
+
+
+def make_router(**backends):
+    return RouterLLMProvider(backends, {
+        "default": "main",
+        "fallbacks": {"mini": ["main"]},
+        "timeout": 0.05,
+    })
+
+
+def test_routes_by_route_option_and_model():
+    main, mini = BackendProvider("gpt-4o"), BackendProvider("gpt-4o-mini")
+    router = make_router(main=main, mini=mini)
+
+    async def run():
+        routed = await AgentLLMProvider(router, route="mini").generate("a")
+        by_model = await router.generate("b", model="gpt-4o-mini")
+        default = await router.generate("c")
+        override = await router.generate("d", model="gpt-4.1")
+        return routed, by_model, default, override
+
+    routed, by_model, default, override = asyncio.run(run())
+    assert routed["backend"] == by_model["backend"] == "mini"
+    assert default["backend"] == override["backend"] == "main"
+    assert main.models == ["gpt-4o", "gpt-4.1"]
+
+
+def test_falls_back_on_error_and_timeout():
+    main = BackendProvider("gpt-4o")
+    router = make_router(main=main, mini=BackendProvider("gpt-4o-mini", fail=True))
+    result = asyncio.run(router.generate("a", route="mini"))
+    assert result["success"] and result["backend"] == "main"
+    assert result["fallback_from"] == "mini"
+
+    router = make_router(main=main, mini=BackendProvider("gpt-4o-mini", delay=1.0))
+    result = asyncio.run(router.generate("a", route="mini"))
+    assert result["backend"] == "main"
+    stats = router.get_stats()["router"]["backends"]
+    assert stats["mini"]["timeouts"] == 1
+    assert stats["main"]["fallbacks"] == 1
+
+
+def test_no_fallback_for_default_backend():
+    router = make_router(main=BackendProvider("gpt-4o", fail=True), mini=BackendProvider("gpt-4o-mini"))
+    result = asyncio.run(router.generate("a"))
+    assert result["success"] is False
+    assert result["backend"] == "main"
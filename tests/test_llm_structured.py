@@ -0,0 +1,87 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from backend.app.llm.provider import LLMProvider, AgentLLMProvider, OpenAIProvider
+from backend.app.llm.structured import compile_schema
+
+SCHEMA = {
+    "title": "question",
+    "type": "object",
+    "properties": {
+        "text": {"type": "string"},
+        "options": {
+            "type": "array",
+            "minItems": 2,
+            "maxItems": 2,
+            "items": {
+                "type": "object",
+                "properties": {"text": {"type": "string"}, "isCorrect": {"type": "boolean"}},
+                "required": ["text", "isCorrect"],
+                "additionalProperties": False,
+            },
+        },
+        "level": {"type": "string", "enum": ["High", "Low"]},
+    },
+    "required": ["text", "options", "level"],
+    "additionalProperties": False,
+}
+
+VALID = {
+    "text": "Which?",
+    "options": [{"text": "A", "isCorrect": True}, {"text": "B", "isCorrect": False}],
+    "level": "High",
+}
+
+
+class FixedProvider(LLMProvider):
+    """Fake provider answering with a fixed text"""
+    def __init__(self, text: str):
+        self.text = text
+        self.calls: List[Dict[str, Any]] = []
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        self.calls.append(kwargs)
+        return {"text": self.text, "model": "fake", "success": True}
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self.generate(prompt, **kwargs)
+
+
+def test_validator_reports_schema_errors():
+    validator = compile_schema(SCHEMA)
+    assert validator is compile_schema(dict(SCHEMA))
+    assert validator.validate(VALID) == []
+
+    invalid = {**VALID, "options": VALID["options"][:1], "level": "Medium", "extra": 1}
+    errors = validator.validate(invalid)
+    assert any("at least 2 items" in e for e in errors)
+    assert any("'Medium'" in e for e in errors)
+    assert any("unexpected property 'extra'" in e for e in errors)
+    assert "$.text: expected string, got int" in validator.validate({**VALID, "text": 1})
+
+
+def test_openai_request_uses_json_schema_response_format():
+    provider = OpenAIProvider({"openai_api_key": "test", "model": "gpt-4o"})
+    request = provider.describe_request("q", response_schema=SCHEMA)
+    response_format = request["response_format"]
+    assert "response_schema" not in request
+    assert response_format["type"] == "json_schema"
+    assert response_format["json_schema"]["name"] == "question"
+    assert response_format["json_schema"]["strict"] is True
+    assert "title" not in response_format["json_schema"]["schema"]
+
+
+def test_agent_view_returns_parsed_output():
+    inner = FixedProvider(json.dumps(VALID))
+    agent = AgentLLMProvider(inner, agent_type="final_formatter", response_schema=SCHEMA)
+    result = asyncio.run(agent.generate("q"))
+    assert result["parsed"] == VALID
+    assert inner.calls[0]["response_schema"] is SCHEMA
+
+    result = asyncio.run(AgentLLMProvider(FixedProvider("not json"), response_schema=SCHEMA).generate("q"))
+    assert result["parsed"] is None
+    assert result["schema_errors"][0].startswith("$: invalid JSON")
+
+    # Agents without a schema are unaffected
+    assert "parsed" not in asyncio.run(AgentLLMProvider(FixedProvider("text")).generate("q"))
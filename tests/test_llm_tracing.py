@@ -0,0 +1,98 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from backend.app.agents.base import LLMAgent
+from backend.app.agents.pipeline import AgentPipeline, PipelineStep
+from backend.app.llm import tracing
+from backend.app.llm.provider import AgentLLMProvider, LLMProvider
+from backend.app.llm.tracing import TraceExporter, span, trace_scope
+
+
+class UsageProvider(LLMProvider):
+    """Fake provider echoing the prompt with token usage"""
+    def __init__(self):
+        self.model = "fake-model"
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        await asyncio.sleep(0.01)
+        usage = {"prompt_tokens": 10, "completion_tokens": 5, "cached_tokens": 0, "total_tokens": 15}
+        return {"text": prompt, "model": self.model, "usage": usage, "success": True}
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self.generate(prompt, **kwargs)
+
+
+def make_pipeline(names: List[str]) -> AgentPipeline:
+    steps = []
+    for name in names:
+        step = PipelineStep(agent_type="llm", name=name, use_state=False)
+        step.agent = LLMAgent(
+            agent_id=f"{name}-agent",
+            name=name,
+            description="",
+            instructions="",
+            llm_provider=AgentLLMProvider(UsageProvider(), agent_type=name)
+        )
+        steps.append(step)
+    return AgentPipeline(steps, pipeline_id="traced", persistent=False)
+
+
+def test_spans_are_noops_outside_a_trace():
+    with span("llm.generate", model="m") as current:
+        current.set_attribute("prompt_tokens", 3)
+    assert tracing.get_current_trace() is None
+
+
+def test_pipeline_trace_exports_nested_chrome_events(monkeypatch, tmp_path):
+    exporter = TraceExporter({"enabled": True, "format": "chrome", "directory": str(tmp_path)})
+    monkeypatch.setattr(tracing, "get_trace_exporter", lambda: exporter)
+
+    result = asyncio.run(make_pipeline(["first", "second"]).execute("hello"))
+    assert result.success
+
+    [path] = list(tmp_path.iterdir())
+    assert path.name.startswith("traced.")
+    events = [e for e in json.loads(path.read_text())["traceEvents"] if e["ph"] == "X"]
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for event in events:
+        by_name.setdefault(event["name"], []).append(event)
+
+    [pipeline] = by_name["pipeline"]
+    assert pipeline["args"]["success"] is True
+    assert [e["args"]["step"] for e in by_name["step.run"]] == ["first", "second"]
+    calls = by_name["llm.generate"]
+    assert [e["args"]["agent_type"] for e in calls] == ["first", "second"]
+    assert calls[0]["args"]["prompt_tokens"] == 10 and calls[0]["args"]["model"] == "fake-model"
+    assert calls[0]["args"]["cache_hit"] is False
+    # Children lie within their parents
+    for event in by_name["step.run"] + calls:
+        assert pipeline["ts"] <= event["ts"] and event["ts"] + event["dur"] <= pipeline["ts"] + pipeline["dur"]
+
+
+def test_otlp_export_links_parents():
+    exporter = TraceExporter({"enabled": True, "format": "otlp"})
+    traces = []
+    exporter.export = traces.append
+
+    async def run():
+        async with trace_scope("request", exporter=exporter, route="/execute"):
+            with span("step.run", step="first"):
+                with span("llm.generate"):
+                    pass
+            try:
+                with span("state.save"):
+                    raise RuntimeError("db down")
+            except RuntimeError:
+                pass
+
+    asyncio.run(run())
+
+    [trace] = traces
+    spans = {s["name"]: s for s in trace.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    assert "parentSpanId" not in spans["request"]
+    assert spans["step.run"]["parentSpanId"] == spans["request"]["spanId"]
+    assert spans["llm.generate"]["parentSpanId"] == spans["step.run"]["spanId"]
+    assert spans["state.save"]["status"] == {"code": 2, "message": "db down"}
+    assert spans["request"]["attributes"] == [{"key": "route", "value": {"stringValue": "/execute"}}]
+    assert len({s["traceId"] for s in spans.values()}) == 1
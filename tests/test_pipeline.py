@@ -0,0 +1,556 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.agents.base import AbstractAgent, AgentRequest, AgentResponse, LLMAgent
+from backend.app.agents.checkpoints import PipelineCheckpointStore
+from backend.app.agents.conditions import StepCondition
+from backend.app.agents.factory import AgentFactory
+from backend.app.agents.pipeline import (
+    AgentPipeline, PipelineStep, _compile_plan, execute_pipeline_fan_out, get_speculation_stats, resume_pipeline
+)
+from backend.app.db.base import Base
+from backend.app.models.pipeline_run import PipelineRun, PipelineStepOutput
+from backend.app.llm.provider import LLMProvider, AgentLLMProvider
+from backend.app.llm.usage import get_usage_stats
+from backend.app.services.admission import AdmissionController, Overloaded
+
+
+class EchoProvider(LLMProvider):
+    """Fake provider that streams the prompt back word by word"""
+    def __init__(self):
+        self.model = "fake-model"
+        self.calls = 0
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        on_token = kwargs.pop("on_token", None)
+        if on_token is not None:
+            return await self._generate_from_stream(on_token, prompt, system_prompt=system_prompt, **kwargs)
+        self.calls += 1
+        return {"text": prompt, "model": self.model, "success": True}
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        self.calls += 1
+        for word in prompt.split(" "):
+            yield word + " "
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self.generate(prompt, **kwargs)
+
+
+def make_pipeline(provider: LLMProvider, names: List[str]) -> AgentPipeline:
+    steps = []
+    for name in names:
+        step = PipelineStep(agent_type="llm", name=name, use_state=False)
+        step.agent = LLMAgent(
+            agent_id=f"{name}-agent",
+            name=name,
+            description="",
+            instructions="",
+            llm_provider=provider
+        )
+        steps.append(step)
+    return AgentPipeline(steps, persistent=False)
+
+
+def test_pipeline_runs_steps_in_order():
+    provider = EchoProvider()
+    pipeline = make_pipeline(provider, ["first", "second", "third"])
+
+    result = asyncio.run(pipeline.execute("hello pipeline"))
+
+    assert result.success
+    assert [name for name, _ in result.steps] == ["first", "second", "third"]
+    assert result.final_response.text == "hello pipeline"
+    assert provider.calls == 3
+
+
+def test_execute_stream_emits_step_boundaries_and_final_tokens():
+    provider = EchoProvider()
+    pipeline = make_pipeline(provider, ["first", "second"])
+
+    async def collect():
+        return [event async for event in pipeline.execute_stream("streamed words here")]
+
+    events = asyncio.run(collect())
+    names = [name for name, _ in events]
+
+    assert names[:3] == ["step_start", "step_end", "step_start"]
+    assert names[-2:] == ["step_end", "result"]
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert "".join(tokens) == "streamed words here "
+    assert all(data["step"] == "second" for name, data in events if name == "token")
+    assert events[-1][1]["success"] is True
+
+
+def test_pipeline_reports_token_usage_per_step():
+    class UsageProvider(EchoProvider):
+        async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+            result = await super().generate(prompt, system_prompt=system_prompt, **kwargs)
+            usage = {"prompt_tokens": 10, "completion_tokens": 5, "cached_tokens": 2, "total_tokens": 15}
+            return {**result, "usage": usage, "elapsed_time": 0.5}
+
+    provider = UsageProvider()
+    pipeline = make_pipeline(provider, ["first", "second"])
+    for step in pipeline.steps:
+        step.agent.llm_provider = AgentLLMProvider(provider, agent_type=f"usage_{step.name}")
+
+    result = asyncio.run(pipeline.execute("count my tokens")).to_dict()
+
+    assert [step["usage"]["total_tokens"] for step in result["steps"]] == [15, 15]
+    assert result["usage"]["prompt_tokens"] == 20
+    assert result["usage"]["cached_tokens"] == 4
+    assert result["usage"]["calls"] == 2
+    assert get_usage_stats()["usage_first"]["completion_tokens"] == 5
+
+
+def test_independent_steps_run_concurrently_and_merge_into_dependents():
+    class SlowProvider(EchoProvider):
+        async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+            await asyncio.sleep(0.1)
+            return await super().generate(prompt, system_prompt=system_prompt, **kwargs)
+
+    provider = SlowProvider()
+    pipeline = make_pipeline(provider, ["format", "review", "validate", "final"])
+    pipeline.steps[2].depends_on = ["format"]
+    pipeline.steps[3].depends_on = ["review", "validate"]
+    pipeline.dependencies = pipeline._resolve_dependencies(pipeline.steps)
+
+    async def run():
+        start = asyncio.get_running_loop().time()
+        result = await pipeline.execute("question")
+        return result, asyncio.get_running_loop().time() - start
+
+    result, elapsed = asyncio.run(run())
+
+    assert result.success
+    # Critical path is three steps, not four
+    assert elapsed < 0.38
+    assert [name for name, _ in result.steps][0] == "format"
+    assert set(name for name, _ in result.steps[1:3]) == {"review", "validate"}
+    assert result.final_response.text == "## review\n\nquestion\n\n## validate\n\nquestion"
+
+
+def test_from_config_expands_parallel_groups(monkeypatch):
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    pipeline = AgentPipeline.from_config([
+        {"agent_type": "llm", "name": "format"},
+        {"parallel": [{"agent_type": "llm", "name": "review"}, {"agent_type": "llm", "name": "validate"}]},
+        {"agent_type": "llm", "name": "improve", "depends_on": ["review"]},
+        {"agent_type": "llm", "name": "final"},
+        {"agent_type": "llm", "name": "summary", "depends_on": ["final", "validate"]},
+    ], persistent=False)
+
+    assert pipeline.dependencies == [[], [0], [0], [1], [3], [4, 2]]
+
+    try:
+        AgentPipeline.from_config([{"agent_type": "llm", "name": "a", "depends_on": ["b"]}], persistent=False)
+    except ValueError as e:
+        assert "must be defined before it" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_fan_out_runs_branches_concurrently_and_isolates_failures(monkeypatch):
+    class BranchProvider(EchoProvider):
+        async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+            await asyncio.sleep(0.1)
+            if prompt == "fail":
+                return {"text": "Error: boom", "model": self.model, "error": "boom", "success": False}
+            return await super().generate(prompt, system_prompt=system_prompt, **kwargs)
+
+    provider = BranchProvider()
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    monkeypatch.setattr(PipelineStep, "get_agent", lambda self, state_id=None: LLMAgent(
+        agent_id=self.name, name=self.name, description="", instructions="", llm_provider=provider
+    ))
+    config = [{"agent_type": "llm", "name": "generate", "use_state": False}]
+    finished = []
+
+    async def on_result(index, result):
+        finished.append(index)
+
+    async def run():
+        start = asyncio.get_running_loop().time()
+        results = await execute_pipeline_fan_out(
+            config, ["a", "fail", "c", "d"], max_concurrency=4, persistent=False, on_result=on_result
+        )
+        return results, asyncio.get_running_loop().time() - start
+
+    results, elapsed = asyncio.run(run())
+
+    assert elapsed < 0.3
+    assert sorted(finished) == [0, 1, 2, 3]
+    assert [r.success for r in results] == [True, False, True, True]
+    assert [r.final_response.text for r in results if r.success] == ["a", "c", "d"]
+    assert results[1].error == "boom"
+
+
+def test_fan_out_admits_each_branch_and_rejects_when_none_is_admitted(monkeypatch):
+    provider = EchoProvider()
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    monkeypatch.setattr(PipelineStep, "get_agent", lambda self, state_id=None: LLMAgent(
+        agent_id=self.name, name=self.name, description="", instructions="", llm_provider=provider
+    ))
+    config = [{"agent_type": "llm", "name": "generate", "use_state": False}]
+    admission = AdmissionController({"max_in_flight": 1, "max_queue": 0})
+
+    async def run():
+        results = await execute_pipeline_fan_out(config, ["a", "b"], persistent=False, admission=admission)
+        stats = admission.get_stats()
+        # With the only slot taken elsewhere no branch is admitted
+        await admission.acquire()
+        with pytest.raises(Overloaded):
+            await execute_pipeline_fan_out(config, ["c"], persistent=False, admission=admission)
+        return results, stats
+
+    results, stats = asyncio.run(run())
+    assert [r.success for r in results] == [True, False]
+    assert "Too many generation requests" in results[1].error
+    assert stats["admitted"] == 1 and stats["rejected_queue_full"] == 1 and stats["in_flight"] == 0
+    assert provider.calls == 1
+
+
+def test_resumed_run_only_executes_incomplete_steps(monkeypatch):
+    class FlakyProvider(EchoProvider):
+        async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+            if self.calls == 2 and not getattr(self, "failed", False):
+                self.failed = True
+                return {"text": "Error: boom", "model": self.model, "error": "boom", "success": False}
+            return await super().generate(prompt, system_prompt=system_prompt, **kwargs)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[PipelineRun.__table__, PipelineStepOutput.__table__])
+    store = PipelineCheckpointStore(sessionmaker(bind=engine))
+
+    provider = FlakyProvider()
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    monkeypatch.setattr(PipelineStep, "get_agent", lambda self, state_id=None: LLMAgent(
+        agent_id=self.name, name=self.name, description="", instructions="", llm_provider=provider
+    ))
+    config = [{"agent_type": "llm", "name": name, "use_state": False} for name in ("one", "two", "three")]
+    pipeline = AgentPipeline.from_config(config, pipeline_id="run-1", persistent=False, checkpoints=store)
+
+    result = asyncio.run(pipeline.execute("resume me"))
+    assert not result.success
+    run = asyncio.run(store.get_run("run-1"))
+    assert run["status"] == "failed" and run["completed_steps"] == ["one", "two"]
+
+    result = asyncio.run(resume_pipeline("run-1", checkpoints=store))
+    assert result.success
+    assert result.final_response.text == "resume me"
+    # Only the failed step calls the LLM again
+    assert provider.calls == 3
+    assert [response.metadata.get("resumed", False) for _, response in result.steps] == [True, True, False]
+    run = asyncio.run(store.get_run("run-1"))
+    assert run["status"] == "completed" and run["attempts"] == 2
+
+
+class ScriptedAgent(AbstractAgent):
+    """Fake agent returning scripted output_data, one entry per call (the last one repeats)"""
+    def __init__(self, name: str, outputs: List[Dict[str, Any]]):
+        super().__init__(agent_id=name, name=name, description="", instructions="", llm_provider=EchoProvider())
+        self.outputs = outputs
+        self.prompts: List[str] = []
+
+    async def execute(self, request: AgentRequest) -> AgentResponse:
+        request = request.with_context()
+        self.prompts.append(request.prompt)
+        return AgentResponse(
+            text=f"{self.name}:{len(self.prompts)}",
+            request_id=request.context.request_id,
+            agent_id=self.agent_id,
+            agent_name=self.name,
+            elapsed_time=0.0,
+            output_data=self.outputs[min(len(self.prompts), len(self.outputs)) - 1],
+        )
+
+
+IMPROVE_VERIFY = [
+    {"agent_type": "llm", "name": "format", "use_state": False},
+    {"agent_type": "llm", "name": "review", "use_state": False},
+    {"loop": {
+        "name": "improvement_loop",
+        "depends_on": ["format", "review"],
+        "max_iterations": 2,
+        "until": {"step": "verify", "path": "approved", "equals": True},
+        "steps": [
+            {"agent_type": "llm", "name": "improve", "use_state": False, "when": {"any": [
+                {"step": "review", "path": "issues", "empty": False},
+                {"step": "verify", "path": "approved", "equals": False},
+            ]}},
+            {"agent_type": "llm", "name": "verify", "use_state": False},
+        ],
+    }},
+    {"agent_type": "llm", "name": "final", "use_state": False},
+]
+
+
+def run_improve_verify(monkeypatch, issues: List[str], approvals: List[bool]):
+    agents = {
+        "format": ScriptedAgent("format", [{}]),
+        "review": ScriptedAgent("review", [{"issues": issues}]),
+        "improve": ScriptedAgent("improve", [{}]),
+        "verify": ScriptedAgent("verify", [{"approved": approved} for approved in approvals]),
+        "final": ScriptedAgent("final", [{}]),
+    }
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    monkeypatch.setattr(PipelineStep, "get_agent", lambda self, state_id=None: agents[self.name])
+    pipeline = AgentPipeline.from_config(IMPROVE_VERIFY, persistent=False)
+    return asyncio.run(pipeline.execute("topic")), agents
+
+
+def test_condition_skips_step_and_passes_its_input_on(monkeypatch):
+    result, agents = run_improve_verify(monkeypatch, issues=[], approvals=[True])
+
+    assert result.success
+    assert agents["improve"].prompts == []
+    # The skipped improvement forwards the formatted question to verification
+    assert agents["verify"].prompts == ["format:1"]
+    assert agents["final"].prompts == ["verify:1"]
+    loop = dict(result.steps)["improvement_loop"]
+    assert loop.metadata["iterations"] == [{"iteration": 1, "steps": [
+        {"step": "improve", "success": True, "skipped": True},
+        {"step": "verify", "success": True, "skipped": False},
+    ]}]
+
+
+def test_loop_repeats_until_condition_holds_or_limit(monkeypatch):
+    result, agents = run_improve_verify(monkeypatch, issues=["ambiguous"], approvals=[False, True])
+
+    assert result.success
+    assert agents["improve"].prompts[0] == "## format\n\nformat:1\n\n## review\n\nreview:1"
+    assert agents["improve"].prompts[1] == "## improve\n\nimprove:1\n\n## verify\n\nverify:1"
+    assert len(dict(result.steps)["improvement_loop"].metadata["iterations"]) == 2
+    assert agents["final"].prompts == ["verify:2"]
+
+    result, agents = run_improve_verify(monkeypatch, issues=[], approvals=[False])
+    assert result.success
+    assert len(agents["verify"].prompts) == 2
+    assert len(agents["improve"].prompts) == 1
+
+
+SPECULATIVE = IMPROVE_VERIFY[:-1] + [{
+    "agent_type": "llm",
+    "name": "final",
+    "use_state": False,
+    "speculate": {
+        "inputs": ["format"],
+        "unchanged": ["improve"],
+        "confirm": {"step": "verify", "path": "approved", "equals": True},
+    },
+}]
+
+
+def run_speculative(monkeypatch, issues: List[str], speculative: bool = True):
+    agents = {
+        "format": ScriptedAgent("format", [{}]),
+        "review": ScriptedAgent("review", [{"issues": issues}]),
+        "improve": ScriptedAgent("improve", [{}]),
+        "verify": ScriptedAgent("verify", [{"approved": True}]),
+        "final": ScriptedAgent("final", [{"formatted": True}]),
+    }
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    monkeypatch.setattr(PipelineStep, "get_agent", lambda self, state_id=None: agents[self.name])
+    pipeline = AgentPipeline.from_config(SPECULATIVE, persistent=False, speculative=speculative)
+    return asyncio.run(pipeline.execute("topic")), agents
+
+
+def test_speculative_step_output_is_kept_when_gates_pass_unchanged(monkeypatch):
+    before = get_speculation_stats()
+    result, agents = run_speculative(monkeypatch, issues=[])
+
+    assert result.success
+    # Started on the formatted question, and not run again
+    assert agents["final"].prompts == ["format:1"]
+    assert result.final_response.text == "final:1"
+    assert result.final_response.metadata["speculation"]["hit"] is True
+    stats = get_speculation_stats()
+    assert stats["hits"] == before["hits"] + 1 and stats["started"] == before["started"] + 1
+
+
+def test_speculative_step_reruns_when_a_gate_changes_its_input(monkeypatch):
+    before = get_speculation_stats()
+    result, agents = run_speculative(monkeypatch, issues=["ambiguous"])
+
+    assert result.success
+    assert agents["final"].prompts == ["format:1", "verify:1"]
+    assert result.final_response.text == "final:2"
+    assert result.final_response.metadata["speculation"]["hit"] is False
+    assert get_speculation_stats()["misses"] == before["misses"] + 1
+
+    # Without speculation the step only runs on its real input
+    result, agents = run_speculative(monkeypatch, issues=[], speculative=False)
+    assert agents["final"].prompts == ["verify:1"]
+    assert "speculation" not in result.final_response.metadata
+
+
+def test_speculation_must_predict_from_upstream_steps(monkeypatch):
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    config = IMPROVE_VERIFY[:-1] + [{"agent_type": "llm", "name": "final", "speculate": {
+        "inputs": ["verify"], "unchanged": ["improve"],
+    }}]
+    try:
+        AgentPipeline.from_config(config, persistent=False)
+    except ValueError as e:
+        assert "must be upstream of it" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_conditions_must_refer_to_upstream_steps(monkeypatch):
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    try:
+        AgentPipeline.from_config([
+            {"parallel": [
+                {"agent_type": "llm", "name": "a"},
+                {"agent_type": "llm", "name": "b", "when": {"step": "a", "path": "ok", "equals": True}},
+            ]},
+        ], persistent=False)
+    except ValueError as e:
+        assert "must be upstream of it" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+    condition = StepCondition({"all": [
+        {"step": "review", "path": "issues.0.severity", "in": ["high", "critical"]},
+        {"not": {"step": "review", "path": "score", "gte": 8}},
+    ]})
+    assert condition.steps == {"review"}
+    assert condition.evaluate({"review": {"issues": [{"severity": "high"}], "score": 5}})
+    assert not condition.evaluate({"review": {"issues": [], "score": 5}})
+    assert not condition.evaluate({})
+
+
+
+class StallingProvider(EchoProvider):
+    """Fake provider that answers every call after the first only after a long wait"""
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        if self.calls:
+            await asyncio.sleep(5)
+        return await super().generate(prompt, system_prompt=system_prompt, **kwargs)
+
+
+def test_deadline_returns_best_partial_result():
+    provider = StallingProvider()
+    pipeline = make_pipeline(provider, ["first", "second", "third"])
+
+    async def run():
+        start = time.time()
+        result = await pipeline.execute("question", deadline=start + 0.2)
+        return result, time.time() - start
+
+    result, elapsed = asyncio.run(run())
+
+    assert elapsed < 1
+    assert result.timed_out
+    assert not result.success
+    assert "1/3 steps" in result.error
+    assert result.final_response.text == "question"
+    assert result.to_dict()["timed_out"]
+
+
+def test_step_timeout_fails_only_that_step():
+    provider = StallingProvider()
+    pipeline = make_pipeline(provider, ["first", "second"])
+    pipeline.steps[1].timeout = 0.1
+
+    result = asyncio.run(pipeline.execute("question"))
+
+    assert not result.success
+    assert not result.timed_out
+    name, response = result.steps[-1]
+    assert name == "second"
+    assert response.metadata["timed_out"]
+
+
+def test_agents_and_plans_are_reused_across_pipelines(monkeypatch):
+    class SlowProvider(EchoProvider):
+        async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+            await asyncio.sleep(0.01)
+            return await super().generate(prompt, system_prompt=system_prompt, **kwargs)
+
+    llm = SlowProvider()
+    created = []
+
+    def create_agent(agent_type, agent_id=None, provider=None, model=None):
+        agent = LLMAgent(agent_id=f"{agent_type}-{len(created)}", name=agent_type, description="",
+                         instructions="", llm_provider=llm)
+        created.append(agent)
+        return agent
+
+    monkeypatch.setattr(AgentFactory, "create_agent", create_agent)
+    monkeypatch.setattr(AgentFactory, "get_agent_config", lambda agent_type: {})
+    monkeypatch.setattr(AgentFactory, "_pools", {})
+    config = [{"agent_type": name, "name": name, "use_state": False} for name in ("pooled_a", "pooled_b")]
+    _compile_plan.cache_clear()
+
+    async def run():
+        for _ in range(3):
+            result = await AgentPipeline.from_config(config, persistent=False).execute("hello")
+            assert result.success
+        # Concurrent executions never share an agent
+        return await execute_pipeline_fan_out(config, ["x", "y", "z"], max_concurrency=3, persistent=False)
+
+    results = asyncio.run(run())
+
+    assert all(result.success for result in results)
+    assert _compile_plan.cache_info().misses == 1
+    # One agent per step for the sequential runs, plus two more per step for the concurrent branches
+    assert len(created) == 6
+    assert AgentFactory.get_pool_stats() == {"pooled_a": 3, "pooled_b": 3}
+
+    # A reused instance stores its state under the run that acquired it
+    agent = AgentFactory.acquire_agent("pooled_a", state_id="run-x:pooled_a")
+    assert agent in created and agent.state_id == "run-x:pooled_a"
+    AgentFactory.release_agent(agent)
+    assert agent.state_id == agent.agent_id
+
+
+def test_cancelled_pipeline_stops_its_steps_and_records_the_run(monkeypatch):
+    class BlockingProvider(EchoProvider):
+        def __init__(self):
+            super().__init__()
+            self.started = asyncio.Event()
+            self.cancelled = False
+
+        async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+            if self.calls:
+                self.started.set()
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    self.cancelled = True
+                    raise
+            return await super().generate(prompt, system_prompt=system_prompt, **kwargs)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[PipelineRun.__table__, PipelineStepOutput.__table__])
+    store = PipelineCheckpointStore(sessionmaker(bind=engine))
+
+    provider = BlockingProvider()
+    pipeline = make_pipeline(provider, ["first", "second", "third"])
+    pipeline.pipeline_id = "run-cancelled"
+    pipeline.checkpoints = store
+
+    async def run():
+        task = asyncio.ensure_future(pipeline.execute("abandoned"))
+        await provider.started.wait()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(run())
+    # The in-flight call was cancelled before the cancellation reached the caller
+    assert provider.cancelled and provider.calls == 1
+    run = asyncio.run(store.get_run("run-cancelled"))
+    assert run["status"] == "failed" and run["error"] == "Cancelled"
+    assert run["completed_steps"] == ["first"]
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.agents.base import AgentResponse, LLMAgent
+from backend.app.agents.checkpoints import PipelineCheckpointStore
+from backend.app.agents.pipeline import PipelineResult, PipelineStep
+from backend.app.config.settings import Settings
+from backend.app.db.base import Base
+from backend.app.llm.provider import LLMProvider
+from backend.app.models.pipeline_run import PipelineRun, PipelineStepOutput
+from backend.app.services import question_service
+from backend.app.services.question_service import QuestionService
+
+
+def branch_result(index: int, output_data: dict) -> PipelineResult:
+    result = PipelineResult(f"branch-{index}")
+    result.complete(AgentResponse(
+        text="", request_id="r", agent_id="formatter", agent_name="formatter",
+        elapsed_time=0.0, output_data=output_data, success=True
+    ))
+    return result
+
+
+def test_preview_falls_back_to_the_output_of_each_branch_without_questions(monkeypatch):
+    results = [
+        branch_result(0, {"questions": [{"text": "From the list", "options": []}]}),
+        branch_result(1, {"text": "From the output", "options": []}),
+    ]
+
+    async def run_pipelines(self, inputs: List[dict], timeout: Optional[float] = None) -> List[PipelineResult]:
+        return results
+
+    monkeypatch.setattr(QuestionService, "_run_pipelines", run_pipelines)
+    result = asyncio.run(QuestionService(db=None).generate_questions_preview(content="Some content", count=2))
+
+    assert [question.text for question in result.questions] == ["From the list", "From the output"]
+
+
+class FlakyProvider(LLMProvider):
+    """Fake provider echoing the prompt, failing its third call once"""
+    def __init__(self):
+        self.model = "fake-model"
+        self.calls = 0
+        self.failed = False
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        if self.calls == 2 and not self.failed:
+            self.failed = True
+            return {"text": "Error: boom", "model": self.model, "error": "boom", "success": False}
+        self.calls += 1
+        return {"text": prompt, "model": self.model, "success": True}
+
+    async def generate_stream(self, prompt: str, **kwargs):
+        yield prompt
+
+    async def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        return await self.generate(prompt, **kwargs)
+
+
+def test_generating_again_with_the_same_run_id_resumes_the_failed_step(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[PipelineRun.__table__, PipelineStepOutput.__table__])
+    store = PipelineCheckpointStore(sessionmaker(bind=engine))
+    monkeypatch.setattr(question_service, "PipelineCheckpointStore", lambda: store)
+
+    provider = FlakyProvider()
+    config = [{"agent_type": "llm", "name": name, "use_state": False} for name in ("one", "two", "three")]
+    monkeypatch.setattr(Settings, "get_pipeline_config", lambda self, name: config)
+    monkeypatch.setattr(PipelineStep, "check_agent_type", lambda self: None)
+    monkeypatch.setattr(PipelineStep, "get_agent", lambda self, state_id=None: LLMAgent(
+        agent_id=self.name, name=self.name, description="", instructions="", llm_provider=provider
+    ))
+    service = QuestionService(db=None)
+
+    with pytest.raises(ValueError, match="job-1-0"):
+        asyncio.run(service.generate_questions(content="Some content", count=1, run_id="job-1"))
+    assert provider.calls == 2
+
+    result = asyncio.run(service.generate_questions(content="Some content", count=1, run_id="job-1"))
+    assert result.metadata["pipeline_ids"] == ["job-1-0"]
+    assert result.metadata["failed_branches"] == []
+    # Only the failed step calls the LLM again
+    assert provider.calls == 3